@@ -7,6 +7,7 @@ from polar.benefit.schemas import BenefitID
 from polar.benefit.service.benefit import benefit as benefit_service
 from polar.exceptions import PolarRequestValidationError, ResourceNotFound
 from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.rate_limit import RateLimit, RateLimiter
 from polar.kit.sorting import Sorting, SortingGetter
 from polar.models import AdvertisementCampaign as AdvertisementCampaignModel
 from polar.models.benefit import BenefitAds
@@ -107,6 +108,9 @@ async def get(
     "/{id}/view",
     summary="Track View",
     status_code=204,
+    dependencies=[
+        Depends(RateLimiter("advertisement_view", RateLimit(limit=100, period=60)))
+    ],
     responses={
         204: {"description": "The view was successfully tracked."},
         404: AdvertisementCampaignNotFound,
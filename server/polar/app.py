@@ -17,6 +17,7 @@ from polar.kit.db.postgres import (
     AsyncEngine,
     AsyncSessionMaker,
     Engine,
+    ReadReplica,
     SyncSessionMaker,
     create_async_sessionmaker,
     create_sync_sessionmaker,
@@ -26,19 +27,29 @@ from polar.logfire import (
     instrument_fastapi,
     instrument_httpx,
     instrument_sqlalchemy,
+    instrument_sqlalchemy_pool,
 )
 from polar.logging import Logger
 from polar.logging import configure as configure_logging
 from polar.middlewares import (
+    DatabaseAdmissionControlMiddleware,
     FlushEnqueuedWorkerJobsMiddleware,
     LogCorrelationIdMiddleware,
     PathRewriteMiddleware,
+    PublishAuthCacheInvalidationsMiddleware,
+    PublishProductSnapshotInvalidationsMiddleware,
+    QueryStatsMiddleware,
     SandboxResponseHeaderMiddleware,
 )
 from polar.oauth2.endpoints.well_known import router as well_known_router
 from polar.oauth2.exception_handlers import OAuth2Error, oauth2_error_exception_handler
 from polar.openapi import OPENAPI_PARAMETERS, APITag, set_openapi_generator
-from polar.postgres import create_async_engine, create_sync_engine
+from polar.postgres import (
+    create_async_engine,
+    create_async_read_engine,
+    create_read_replica,
+    create_sync_engine,
+)
 from polar.posthog import configure_posthog
 from polar.redis import Redis, create_redis
 from polar.sentry import configure_sentry
@@ -88,6 +99,8 @@ def generate_unique_openapi_id(route: APIRoute) -> str:
 class State(TypedDict):
     async_engine: AsyncEngine
     async_sessionmaker: AsyncSessionMaker
+    async_read_engine: AsyncEngine | None
+    read_replica: ReadReplica
     sync_engine: Engine
     sync_sessionmaker: SyncSessionMaker
     arq_pool: ArqRedis
@@ -104,6 +117,13 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
             async_engine = create_async_engine("app")
             async_sessionmaker = create_async_sessionmaker(async_engine)
             instrument_sqlalchemy(async_engine.sync_engine)
+            instrument_sqlalchemy_pool(async_engine, "app")
+
+            async_read_engine = create_async_read_engine("app")
+            if async_read_engine is not None:
+                instrument_sqlalchemy(async_read_engine.sync_engine)
+                instrument_sqlalchemy_pool(async_read_engine, "app.read")
+            read_replica = create_read_replica(async_sessionmaker, async_read_engine)
 
             sync_engine = create_sync_engine("app")
             sync_sessionmaker = create_sync_sessionmaker(sync_engine)
@@ -123,6 +143,8 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
             yield {
                 "async_engine": async_engine,
                 "async_sessionmaker": async_sessionmaker,
+                "async_read_engine": async_read_engine,
+                "read_replica": read_replica,
                 "sync_engine": sync_engine,
                 "sync_sessionmaker": sync_sessionmaker,
                 "arq_pool": arq_pool,
@@ -131,6 +153,8 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
             }
 
             await async_engine.dispose()
+            if async_read_engine is not None:
+                await async_read_engine.dispose()
             sync_engine.dispose()
             if ip_geolocation_client is not None:
                 ip_geolocation_client.close()
@@ -148,6 +172,14 @@ def create_app() -> FastAPI:
 
     app.add_middleware(PathRewriteMiddleware, pattern=r"^/api/v1", replacement="/v1")
     app.add_middleware(FlushEnqueuedWorkerJobsMiddleware)
+    app.add_middleware(PublishAuthCacheInvalidationsMiddleware)
+    app.add_middleware(PublishProductSnapshotInvalidationsMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+    if settings.DATABASE_ADMISSION_MAX_EXPECTED_WAIT_SECONDS is not None:
+        app.add_middleware(
+            DatabaseAdmissionControlMiddleware,
+            max_expected_wait=settings.DATABASE_ADMISSION_MAX_EXPECTED_WAIT_SECONDS,
+        )
     app.add_middleware(LogCorrelationIdMiddleware)
     if settings.is_sandbox():
         app.add_middleware(SandboxResponseHeaderMiddleware)
@@ -7,12 +7,15 @@ from pydantic import UUID4
 
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound
+from polar.export.schemas import ArticlesExportParameters, Export
+from polar.export.service import export as export_service
 from polar.kit.pagination import ListResource, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models.article import ArticleVisibility
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import AsyncSession, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
@@ -67,16 +70,20 @@ async def list(
         pagination=pagination,
     )
 
+    can_write_articles = await authz.can_many(
+        auth_subject.subject, AccessType.write, [art for art, _ in results]
+    )
+
     return ListResource.from_paginated_results(
         [
             ArticleSchema.from_db(
                 art,
-                include_admin_fields=await authz.can(
-                    auth_subject.subject, AccessType.write, art
-                ),
+                include_admin_fields=can_write_article,
                 is_paid_subscriber=is_paid_subscriber,
             )
-            for art, is_paid_subscriber in results
+            for (art, is_paid_subscriber), can_write_article in zip(
+                results, can_write_articles
+            )
         ],
         count,
         pagination,
@@ -103,6 +110,37 @@ async def export(
     )
 
 
+@router.post(
+    "/export",
+    summary="Create Articles Export",
+    response_model=Export,
+    status_code=202,
+)
+async def create_export(
+    auth_subject: auth.ArticlesWrite,
+    organization_id: UUID4 = Query(),
+    session: AsyncSession = Depends(get_db_session),
+    authz: Authz = Depends(Authz.authz),
+    redis: Redis = Depends(get_redis),
+) -> Export:
+    """
+    Export organization articles as a ZIP file in the background.
+
+    Poll the returned export until it succeeds to get its download URL.
+    """
+    await article_service.get_exportable_organization(
+        session, organization_id, auth_subject, authz
+    )
+    job = await export_service.create(
+        redis,
+        auth_subject,
+        ArticlesExportParameters(organization_id=organization_id),
+        filename="articles.zip",
+        mime_type="application/zip",
+    )
+    return export_service.to_schema(job)
+
+
 @router.get(
     "/{id}",
     summary="Get Article",
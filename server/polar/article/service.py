@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import re
 import tempfile
 import uuid
@@ -466,13 +467,13 @@ class ArticleService(ResourceServiceReader[Article]):
         res = await session.execute(statement)
         return res.scalars().unique().one_or_none()
 
-    async def export(
+    async def get_exportable_organization(
         self,
         session: AsyncSession,
         organization_id: UUID,
         auth_subject: AuthSubject[User | Organization],
         authz: Authz,
-    ) -> str:
+    ) -> Organization:
         organization = await organization_service.get_by_id(
             session, auth_subject, organization_id
         )
@@ -480,6 +481,18 @@ class ArticleService(ResourceServiceReader[Article]):
             auth_subject.subject, AccessType.write, organization
         ):
             raise ResourceNotFound()
+        return organization
+
+    async def export(
+        self,
+        session: AsyncSession,
+        organization_id: UUID,
+        auth_subject: AuthSubject[User | Organization],
+        authz: Authz,
+    ) -> str:
+        organization = await self.get_exportable_organization(
+            session, organization_id, auth_subject, authz
+        )
 
         statement = self._get_readable_articles_statement(auth_subject).where(
             Article.organization_id == organization.id
@@ -487,44 +500,51 @@ class ArticleService(ResourceServiceReader[Article]):
         results = await session.stream(statement)
 
         zip_file = tempfile.NamedTemporaryFile(delete=False, delete_on_close=False)
-        async with httpx.AsyncClient() as client:
-            with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as archive:
-                async for result in results.unique():
-                    article, _ = result._tuple()
-                    frontmatter_dict = {
-                        "title": article.title,
-                        "slug": article.slug,
-                        "created_at": article.created_at.isoformat(),
-                    }
-                    if article.og_description is not None:
-                        frontmatter_dict["og_description"] = article.og_description
-                    if article.og_image_url is not None:
-                        image_filename = article.og_image_url.split("/")[-1]
-                        async with client.stream("GET", article.og_image_url) as stream:
-                            stream.raise_for_status()
-                            archive.writestr(
-                                f"articles/{article.slug}/{image_filename}",
-                                await stream.aread(),
-                            )
-                        frontmatter_dict["og_image_url"] = f"./{image_filename}"
-
-                    # Find images hosted on Vercel and download them
-                    body = article.body
-                    pattern = r"(https://7vk6rcnylug0u6hg\.public\.blob\.vercel-storage\.com/(.+))\)$"
-                    for match in re.finditer(pattern, body, re.MULTILINE):
-                        async with client.stream("GET", match.group(1)) as stream:
-                            stream.raise_for_status()
-                            archive.writestr(
-                                f"articles/{article.slug}/{match.group(2)}",
-                                await stream.aread(),
-                            )
-                        body = body.replace(match.group(0), f"./{match.group(2)})")
-
-                    frontmatter = f"""---\n{"\n".join(f"{k}: {v}" for k, v in frontmatter_dict.items())}\n---\n\n"""
-                    content = f"{frontmatter}{body}"
-                    archive.writestr(
-                        f"articles/{article.slug}/{article.slug}.md", content
-                    )
+        try:
+            async with httpx.AsyncClient() as client:
+                with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as archive:
+                    async for result in results.unique():
+                        article, _ = result._tuple()
+                        frontmatter_dict = {
+                            "title": article.title,
+                            "slug": article.slug,
+                            "created_at": article.created_at.isoformat(),
+                        }
+                        if article.og_description is not None:
+                            frontmatter_dict["og_description"] = article.og_description
+                        if article.og_image_url is not None:
+                            image_filename = article.og_image_url.split("/")[-1]
+                            async with client.stream(
+                                "GET", article.og_image_url
+                            ) as stream:
+                                stream.raise_for_status()
+                                archive.writestr(
+                                    f"articles/{article.slug}/{image_filename}",
+                                    await stream.aread(),
+                                )
+                            frontmatter_dict["og_image_url"] = f"./{image_filename}"
+
+                        # Find images hosted on Vercel and download them
+                        body = article.body
+                        pattern = r"(https://7vk6rcnylug0u6hg\.public\.blob\.vercel-storage\.com/(.+))\)$"
+                        for match in re.finditer(pattern, body, re.MULTILINE):
+                            async with client.stream("GET", match.group(1)) as stream:
+                                stream.raise_for_status()
+                                archive.writestr(
+                                    f"articles/{article.slug}/{match.group(2)}",
+                                    await stream.aread(),
+                                )
+                            body = body.replace(match.group(0), f"./{match.group(2)})")
+
+                        frontmatter = f"""---\n{"\n".join(f"{k}: {v}" for k, v in frontmatter_dict.items())}\n---\n\n"""
+                        content = f"{frontmatter}{body}"
+                        archive.writestr(
+                            f"articles/{article.slug}/{article.slug}.md", content
+                        )
+        except BaseException:
+            zip_file.close()
+            os.remove(zip_file.name)
+            raise
         return zip_file.name
 
     def _get_readable_articles_statement(
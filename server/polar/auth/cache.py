@@ -0,0 +1,257 @@
+"""
+Short-lived in-process cache of the tokens authenticating API requests:
+OAuth2 tokens and personal access tokens.
+
+Only the identity of a token is cached: its ID, its subject's type and ID,
+its scopes and its expiration. No ORM state is kept: the subject is always
+loaded in the request session, so its state, like being blocked, is never stale.
+
+Entries are dropped:
+
+* after `AUTH_TOKEN_CACHE_TTL_SECONDS`;
+* when the token expires;
+* when the token is revoked, deleted or its scopes change.
+
+Those changes are detected when they're flushed through the ORM, whatever the path.
+Local entries are evicted right away, and an invalidation marker is set in Redis
+at the end of the request or of the worker job, so other processes stop using
+their entries. Changes made with raw SQL are only picked up when the entries expire.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from datetime import UTC, datetime
+from typing import Any, Generic, TypeVar
+from uuid import UUID
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, UOWTransaction
+
+from polar.auth.scope import Scope
+from polar.config import settings
+from polar.kit.db.models import RecordModel
+from polar.kit.utils import utc_now
+from polar.models import OAuth2Token, Organization, PersonalAccessToken, User
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+
+AUTH_CACHE_MAXSIZE = 10_000
+
+_INVALIDATION_MARKER_PREFIX = "auth:cache:invalidated"
+
+T = TypeVar("T", OAuth2Token, PersonalAccessToken)
+
+
+def _get_key_marker(key: str) -> str:
+    return f"{_INVALIDATION_MARKER_PREFIX}:key:{key}"
+
+
+@dataclasses.dataclass(frozen=True)
+class TokenIdentity:
+    id: UUID
+    subject_type: type[User] | type[Organization]
+    subject_id: UUID
+    scopes: frozenset[Scope]
+    expires_at: datetime | None
+
+    async def get_subject(self, session: AsyncSession) -> User | Organization | None:
+        """Load the subject of the token in `session`."""
+        if self.subject_type is User:
+            return await session.get(User, self.subject_id)
+        return await session.get(Organization, self.subject_id)
+
+
+@dataclasses.dataclass
+class _Entry:
+    identity: TokenIdentity
+    expires_at: float
+
+    def is_fresh(self) -> bool:
+        if time.monotonic() >= self.expires_at:
+            return False
+        return self.identity.expires_at is None or self.identity.expires_at > utc_now()
+
+
+class AuthCache(Generic[T]):
+    def __init__(
+        self,
+        *,
+        get_identity: Callable[[T], TokenIdentity],
+        maxsize: int = AUTH_CACHE_MAXSIZE,
+    ) -> None:
+        self.get_identity: Callable[[T], TokenIdentity] = get_identity
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        _caches.append(self)
+
+    async def get(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        key: str,
+        load: Callable[[AsyncSession], Awaitable[T | None]],
+    ) -> TokenIdentity | None:
+        """
+        Return the identity of the valid token matching `key`.
+
+        Args:
+            session: The request session.
+            redis: Redis client, to check for invalidations from other processes.
+            key: The cache key, e.g. the hash of the token as stored in the database.
+            load: Function loading the token from the database if not cached.
+        """
+        ttl = settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            value = await load(session)
+            return self.get_identity(value) if value is not None else None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.is_fresh() and not await self._is_invalidated(redis, key):
+                self._entries.move_to_end(key)
+                return entry.identity
+            self._entries.pop(key, None)
+
+        value = await load(session)
+        if value is None:
+            return None
+
+        entry = _Entry(
+            identity=self.get_identity(value), expires_at=time.monotonic() + ttl
+        )
+        if entry.is_fresh() and not await self._is_invalidated(redis, key):
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return entry.identity
+
+    def evict(self, *, keys: Iterable[str] = ()) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _is_invalidated(self, redis: Redis, key: str) -> bool:
+        return await redis.exists(_get_key_marker(key)) > 0
+
+
+_caches: list[AuthCache[Any]] = []
+
+oauth2_token_cache = AuthCache[OAuth2Token](
+    get_identity=lambda token: TokenIdentity(
+        id=token.id,
+        subject_type=type(token.sub),
+        subject_id=token.sub.id,
+        scopes=frozenset(token.scopes),
+        expires_at=datetime.fromtimestamp(token.expires_at, UTC),
+    )
+)
+personal_access_token_cache = AuthCache[PersonalAccessToken](
+    get_identity=lambda token: TokenIdentity(
+        id=token.id,
+        subject_type=User,
+        subject_id=token.user_id,
+        scopes=frozenset(token.scopes),
+        expires_at=token.expires_at,
+    )
+)
+
+
+@dataclasses.dataclass
+class Invalidations:
+    keys: set[str] = dataclasses.field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+
+_invalidations = contextvars.ContextVar[Invalidations | None](
+    "polar_auth_cache_invalidations", default=None
+)
+
+
+@contextlib.contextmanager
+def collect_invalidations() -> Iterator[Invalidations]:
+    """
+    Collect the invalidations happening in this context, to publish them after.
+
+    The same object is shared with the copies of the context,
+    so it also collects the invalidations from sync code running in a threadpool.
+    """
+    invalidations = Invalidations()
+    token = _invalidations.set(invalidations)
+    try:
+        yield invalidations
+    finally:
+        _invalidations.reset(token)
+
+
+async def publish_invalidations(redis: Redis, invalidations: Invalidations) -> None:
+    """Set the Redis markers telling other processes to drop their entries."""
+    # Entries might be stored slightly after the marker is set,
+    # so the marker needs to outlive them.
+    ex = max(1, 2 * settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+    async with redis.pipeline() as pipe:
+        for key in invalidations.keys:
+            pipe.set(_get_key_marker(key), 1, ex=ex)
+        await pipe.execute()
+
+
+def invalidate(*, keys: Iterable[str] = ()) -> None:
+    keys = set(keys)
+    for cache in _caches:
+        cache.evict(keys=keys)
+
+    invalidations = _invalidations.get()
+    if invalidations is not None:
+        invalidations.keys.update(keys)
+
+
+def _has_changes(obj: RecordModel, *keys: str) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[key].history.has_changes() for key in keys)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session: Session, flush_context: UOWTransaction) -> None:
+    keys: set[str] = set()
+
+    for obj in session.dirty:
+        if isinstance(obj, OAuth2Token) and _has_changes(
+            obj,
+            "access_token_revoked_at",
+            "refresh_token_revoked_at",
+            "scope",
+            "deleted_at",
+        ):
+            keys.add(obj.access_token)  # pyright: ignore
+        elif isinstance(obj, PersonalAccessToken) and _has_changes(
+            obj, "expires_at", "scope", "deleted_at"
+        ):
+            keys.add(obj.token)
+
+    for obj in session.deleted:
+        if isinstance(obj, OAuth2Token):
+            keys.add(obj.access_token)  # pyright: ignore
+        elif isinstance(obj, PersonalAccessToken):
+            keys.add(obj.token)
+
+    if keys:
+        invalidate(keys=keys)
+
+
+__all__ = [
+    "AuthCache",
+    "TokenIdentity",
+    "collect_invalidations",
+    "invalidate",
+    "oauth2_token_cache",
+    "personal_access_token_cache",
+    "publish_invalidations",
+]
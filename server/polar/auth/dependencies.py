@@ -4,14 +4,14 @@ from typing import Annotated
 from fastapi import Depends, Request, Security
 from makefun import with_signature
 
+from polar.auth.cache import TokenIdentity
 from polar.auth.scope import RESERVED_SCOPES, Scope
 from polar.config import settings
 from polar.exceptions import NotPermitted, Unauthorized
-from polar.models import OAuth2Token, PersonalAccessToken
-from polar.oauth2.dependencies import get_optional_token
+from polar.oauth2.dependencies import get_optional_token_identity
 from polar.oauth2.exceptions import InsufficientScopeError, InvalidTokenError
 from polar.personal_access_token.dependencies import get_optional_personal_access_token
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_session, release_connection
 from polar.sentry import set_sentry_user
 
 from .models import (
@@ -31,13 +31,11 @@ async def _get_cookie_token(request: Request) -> str | None:
     return request.cookies.get(settings.AUTH_COOKIE_KEY)
 
 
-async def get_auth_subject(
-    cookie_token: str | None = Depends(_get_cookie_token),
-    oauth2_credentials: tuple[OAuth2Token | None, bool] = Depends(get_optional_token),
-    personal_access_token_credentials: tuple[
-        PersonalAccessToken | None, bool
-    ] = Depends(get_optional_personal_access_token),
-    session: AsyncSession = Depends(get_db_session),
+async def _get_auth_subject(
+    cookie_token: str | None,
+    oauth2_credentials: tuple[TokenIdentity | None, bool],
+    personal_access_token_credentials: tuple[TokenIdentity | None, bool],
+    session: AsyncSession,
 ) -> AuthSubject[Subject]:
     if cookie_token is not None:
         user = await AuthService.get_user_from_cookie(session, cookie=cookie_token)
@@ -57,16 +55,20 @@ async def get_auth_subject(
     )
 
     if oauth2_token:
-        return AuthSubject(
-            oauth2_token.sub, oauth2_token.scopes, AuthMethod.OAUTH2_ACCESS_TOKEN
-        )
+        subject = await oauth2_token.get_subject(session)
+        if subject is not None:
+            return AuthSubject(
+                subject, set(oauth2_token.scopes), AuthMethod.OAUTH2_ACCESS_TOKEN
+            )
 
     if personal_access_token:
-        return AuthSubject(
-            personal_access_token.user,
-            personal_access_token.scopes,
-            AuthMethod.PERSONAL_ACCESS_TOKEN,
-        )
+        subject = await personal_access_token.get_subject(session)
+        if subject is not None:
+            return AuthSubject(
+                subject,
+                set(personal_access_token.scopes),
+                AuthMethod.PERSONAL_ACCESS_TOKEN,
+            )
 
     if oauth2_authorization_set or personal_access_token_authorization_set:
         raise InvalidTokenError()
@@ -74,6 +76,25 @@ async def get_auth_subject(
     return AuthSubject(Anonymous(), set(), AuthMethod.NONE)
 
 
+async def get_auth_subject(
+    cookie_token: str | None = Depends(_get_cookie_token),
+    oauth2_credentials: tuple[TokenIdentity | None, bool] = Depends(
+        get_optional_token_identity
+    ),
+    personal_access_token_credentials: tuple[TokenIdentity | None, bool] = Depends(
+        get_optional_personal_access_token
+    ),
+    session: AsyncSession = Depends(get_db_session),
+) -> AuthSubject[Subject]:
+    auth_subject = await _get_auth_subject(
+        cookie_token, oauth2_credentials, personal_access_token_credentials, session
+    )
+    # Authentication only reads: don't hold the connection until the endpoint
+    # needs it, which may be after slow external calls.
+    await release_connection(session)
+    return auth_subject
+
+
 class _Authenticator:
     def __init__(
         self,
@@ -1,5 +1,6 @@
+from collections.abc import Sequence
 from enum import StrEnum
-from typing import Self
+from typing import Self, TypeVar
 from uuid import UUID
 
 from fastapi import Depends
@@ -10,6 +11,7 @@ from polar.external_organization.service import (
     external_organization as external_organization_service,
 )
 from polar.issue.service import issue as issue_service
+from polar.kit.db.postgres import sql
 from polar.models.account import Account
 from polar.models.article import Article
 from polar.models.benefit import Benefit
@@ -24,12 +26,10 @@ from polar.models.product import Product
 from polar.models.repository import Repository
 from polar.models.subscription import Subscription
 from polar.models.user import User
+from polar.models.user_organization import UserOrganization
 from polar.models.webhook_endpoint import WebhookEndpoint
 from polar.postgres import AsyncSession, get_db_session
 from polar.repository.service import repository as repository_service
-from polar.user_organization.service import (
-    user_organization as user_organization_service,
-)
 
 
 class AccessType(StrEnum):
@@ -55,6 +55,8 @@ Object = (
     | LicenseKey
 )
 
+ObjectT = TypeVar("ObjectT", bound=Object)
+
 
 class Authz:
     session: AsyncSession
@@ -62,11 +64,19 @@ class Authz:
     # request scoped caches
     _cache_can_user_read_repository_id: dict[tuple[UUID, UUID], bool]
     _cache_is_member: dict[tuple[UUID, UUID], bool]
+    _cache_memberships_loaded: set[UUID]
+    _cache_issue: dict[UUID, Issue | None]
+    _cache_repository: dict[UUID, Repository | None]
+    _cache_linked_organization: dict[UUID, Organization | None]
 
     def __init__(self, session: AsyncSession):
         self.session = session
         self._cache_can_user_read_repository_id = {}
         self._cache_is_member = {}
+        self._cache_memberships_loaded = set()
+        self._cache_issue = {}
+        self._cache_repository = {}
+        self._cache_linked_organization = {}
 
     @classmethod
     async def authz(cls, session: AsyncSession = Depends(get_db_session)) -> Self:
@@ -309,6 +319,112 @@ class Authz:
             f"Unknown subject/action/object combination. subject={type(subject)} access={accessType} object={type(object)}"  # noqa: E501
         )
 
+    async def can_many(
+        self, subject: Subject, accessType: AccessType, objects: Sequence[Object]
+    ) -> list[bool]:
+        """
+        Same as `can`, for a list of objects.
+
+        The memberships, issues, repositories and linked organizations
+        needed by the checks are loaded upfront with one query each,
+        so the number of queries doesn't grow with the number of objects.
+        """
+        await self._prefetch(subject, objects)
+        return [await self.can(subject, accessType, object) for object in objects]
+
+    async def filter_readable(
+        self, subject: Subject, objects: Sequence[ObjectT]
+    ) -> list[ObjectT]:
+        """Return the objects the subject can read, keeping their order."""
+        allowed = await self.can_many(subject, AccessType.read, objects)
+        return [object for object, can in zip(objects, allowed) if can]
+
+    async def _prefetch(self, subject: Subject, objects: Sequence[Object]) -> None:
+        if getattr(subject, "blocked_at", None) is not None:
+            return
+
+        if isinstance(subject, User):
+            await self._load_memberships(subject.id)
+            await self._prefetch_issues(
+                {o.issue_id for o in objects if isinstance(o, IssueReward)}
+            )
+
+        repository_ids = {o.repository_id for o in objects if isinstance(o, Issue)}
+        repository_ids.update(
+            issue.repository_id
+            for issue in self._cache_issue.values()
+            if issue is not None
+        )
+        await self._prefetch_repositories(repository_ids)
+
+        if isinstance(subject, User):
+            external_organization_ids: set[UUID] = set()
+            for o in objects:
+                if isinstance(o, Repository):
+                    external_organization_ids.add(o.organization_id)
+                elif isinstance(o, ExternalOrganization):
+                    external_organization_ids.add(o.id)
+                elif isinstance(o, Pledge) and o.organization_id is not None:
+                    external_organization_ids.add(o.organization_id)
+            external_organization_ids.update(
+                repository.organization_id
+                for repository in self._cache_repository.values()
+                if repository is not None
+            )
+            await self._prefetch_linked_organizations(external_organization_ids)
+
+    async def _prefetch_issues(self, issue_ids: set[UUID]) -> None:
+        issue_ids = issue_ids - self._cache_issue.keys()
+        if not issue_ids:
+            return
+
+        statement = sql.select(Issue).where(
+            Issue.id.in_(issue_ids), Issue.deleted_at.is_(None)
+        )
+        issues = {i.id: i for i in (await self.session.scalars(statement)).all()}
+        for id in issue_ids:
+            self._cache_issue[id] = issues.get(id)
+
+    async def _prefetch_repositories(self, repository_ids: set[UUID]) -> None:
+        repository_ids = repository_ids - self._cache_repository.keys()
+        if not repository_ids:
+            return
+
+        statement = sql.select(Repository).where(
+            Repository.id.in_(repository_ids), Repository.deleted_at.is_(None)
+        )
+        repositories = {r.id: r for r in (await self.session.scalars(statement)).all()}
+        for id in repository_ids:
+            self._cache_repository[id] = repositories.get(id)
+
+    async def _prefetch_linked_organizations(
+        self, external_organization_ids: set[UUID]
+    ) -> None:
+        external_organization_ids = (
+            external_organization_ids - self._cache_linked_organization.keys()
+        )
+        if not external_organization_ids:
+            return
+
+        statement = (
+            sql.select(ExternalOrganization)
+            .where(
+                ExternalOrganization.id.in_(external_organization_ids),
+                ExternalOrganization.deleted_at.is_(None),
+            )
+            .options(joinedload(ExternalOrganization.organization))
+        )
+        external_organizations = {
+            e.id: e for e in (await self.session.scalars(statement)).all()
+        }
+        for id in external_organization_ids:
+            external_organization = external_organizations.get(id)
+            self._cache_linked_organization[id] = (
+                external_organization.organization
+                if external_organization is not None
+                else None
+            )
+
     #
     # Repository
     #
@@ -340,7 +456,7 @@ class Authz:
         if key in self._cache_can_user_read_repository_id:
             return self._cache_can_user_read_repository_id[key]
 
-        repo = await repository_service.get(self.session, repository_id)
+        repo = await self._get_repository(repository_id)
         if not repo:
             self._cache_can_user_read_repository_id[key] = False
             return False
@@ -354,22 +470,36 @@ class Authz:
             subject, object.organization_id
         )
 
+    async def _get_repository(self, repository_id: UUID) -> Repository | None:
+        if repository_id in self._cache_repository:
+            return self._cache_repository[repository_id]
+
+        repo = await repository_service.get(self.session, repository_id)
+        self._cache_repository[repository_id] = repo
+        return repo
+
     #
     # ExternalOrganization
     #
     async def _get_linked_organization_from_external_organization(
         self, external_organization_id: UUID
     ) -> Organization | None:
+        if external_organization_id in self._cache_linked_organization:
+            return self._cache_linked_organization[external_organization_id]
+
         external_organization = await external_organization_service.get(
             self.session,
             external_organization_id,
             options=(joinedload(ExternalOrganization.organization),),
         )
 
-        if external_organization is None:
-            return None
-
-        return external_organization.organization
+        organization = (
+            external_organization.organization
+            if external_organization is not None
+            else None
+        )
+        self._cache_linked_organization[external_organization_id] = organization
+        return organization
 
     async def _can_user_read_external_organization_id(
         self, subject: User, external_organization_id: UUID
@@ -411,17 +541,21 @@ class Authz:
         if key in self._cache_is_member:
             return self._cache_is_member[key]
 
-        memberships = await user_organization_service.list_by_user_id(
-            self.session, user_id
-        )
+        await self._load_memberships(user_id)
+        return self._cache_is_member.setdefault(key, False)
 
-        for m in memberships:
-            if m.organization_id == organization_id:
-                self._cache_is_member[key] = True
-                return True
+    async def _load_memberships(self, user_id: UUID) -> None:
+        """Cache all the memberships of the user, so any org is checked at once."""
+        if user_id in self._cache_memberships_loaded:
+            return
 
-        self._cache_is_member[key] = False
-        return False
+        statement = sql.select(UserOrganization.organization_id).where(
+            UserOrganization.user_id == user_id,
+            UserOrganization.deleted_at.is_(None),
+        )
+        for organization_id in (await self.session.scalars(statement)).all():
+            self._cache_is_member[(user_id, organization_id)] = True
+        self._cache_memberships_loaded.add(user_id)
 
     #
     # Account
@@ -443,7 +577,7 @@ class Authz:
     # Issue
     #
     async def _can_anonymous_read_issue(self, object: Issue) -> bool:
-        repo = await repository_service.get(self.session, object.repository_id)
+        repo = await self._get_repository(object.repository_id)
         if not repo:
             return False
 
@@ -462,7 +596,7 @@ class Authz:
         return False
 
     async def _can_user_write_issue(self, subject: User, object: Issue) -> bool:
-        repo = await repository_service.get(self.session, object.repository_id)
+        repo = await self._get_repository(object.repository_id)
         if not repo:
             return False
 
@@ -474,6 +608,14 @@ class Authz:
 
         return False
 
+    async def _get_issue(self, issue_id: UUID) -> Issue | None:
+        if issue_id in self._cache_issue:
+            return self._cache_issue[issue_id]
+
+        issue = await issue_service.get(self.session, issue_id)
+        self._cache_issue[issue_id] = issue
+        return issue
+
     #
     # IssueReward
     #
@@ -492,7 +634,7 @@ class Authz:
             return True
 
         # Can read reward if can write issue
-        issue = await issue_service.get(self.session, object.issue_id)
+        issue = await self._get_issue(object.issue_id)
         if issue and await self._can_user_write_issue(subject, issue):
             return True
 
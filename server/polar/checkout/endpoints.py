@@ -27,6 +27,7 @@ from .schemas import (
     CheckoutUpdate,
     CheckoutUpdatePublic,
 )
+from .service import CHECKOUT_PENDING_TOKEN_PREFIX
 from .service import checkout as checkout_service
 
 router = APIRouter(
@@ -109,10 +110,11 @@ async def create(
     auth_subject: auth.CheckoutWrite,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Create a checkout session."""
     return await checkout_service.create(
-        session, checkout_create, auth_subject, ip_geolocation_client
+        session, checkout_create, auth_subject, ip_geolocation_client, redis=redis
     )
 
 
@@ -131,6 +133,7 @@ async def update(
     auth_subject: auth.CheckoutWrite,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Update a checkout session."""
     checkout = await checkout_service.get_by_id(session, auth_subject, id)
@@ -139,7 +142,7 @@ async def update(
         raise ResourceNotFound()
 
     return await checkout_service.update(
-        session, checkout, checkout_update, ip_geolocation_client
+        session, checkout, checkout_update, ip_geolocation_client, redis=redis
     )
 
 
@@ -152,9 +155,18 @@ async def update(
 async def client_get(
     client_secret: CheckoutClientSecret,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Get a checkout session by client secret."""
-    checkout = await checkout_service.get_by_client_secret(session, client_secret)
+    checkout: Checkout | None
+    # Checkout links redirect to a pending checkout: only preview it,
+    # it's created on the first update or confirmation.
+    if client_secret.startswith(CHECKOUT_PENDING_TOKEN_PREFIX):
+        checkout = await checkout_service.get_or_preview_from_pending_token(
+            session, client_secret, redis=redis
+        )
+    else:
+        checkout = await checkout_service.get_by_client_secret(session, client_secret)
 
     if checkout is None:
         raise ResourceNotFound()
@@ -175,11 +187,17 @@ async def client_create(
     auth_subject: auth.CheckoutWeb,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Create a checkout session from a client. Suitable to build checkout links."""
     ip_address = request.client.host if request.client else None
     return await checkout_service.client_create(
-        session, checkout_create, auth_subject, ip_geolocation_client, ip_address
+        session,
+        checkout_create,
+        auth_subject,
+        ip_geolocation_client,
+        ip_address,
+        redis=redis,
     )
 
 
@@ -193,19 +211,24 @@ async def client_create(
     },
 )
 async def client_update(
+    request: Request,
     client_secret: CheckoutClientSecret,
     checkout_update: CheckoutUpdatePublic,
     ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """Update a checkout session by client secret."""
-    checkout = await checkout_service.get_by_client_secret(session, client_secret)
+    ip_address = request.client.host if request.client else None
+    checkout = await checkout_service.get_or_create_by_client_secret(
+        session, client_secret, ip_geolocation_client, ip_address, redis=redis
+    )
 
     if checkout is None:
         raise ResourceNotFound()
 
     return await checkout_service.update(
-        session, checkout, checkout_update, ip_geolocation_client
+        session, checkout, checkout_update, ip_geolocation_client, redis=redis
     )
 
 
@@ -219,21 +242,29 @@ async def client_update(
     },
 )
 async def client_confirm(
+    request: Request,
     client_secret: CheckoutClientSecret,
     checkout_confirm: CheckoutConfirm,
+    ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
 ) -> Checkout:
     """
     Confirm a checkout session by client secret.
 
     Orders and subscriptions will be processed.
     """
-    checkout = await checkout_service.get_by_client_secret(session, client_secret)
+    ip_address = request.client.host if request.client else None
+    checkout = await checkout_service.get_or_create_by_client_secret(
+        session, client_secret, ip_geolocation_client, ip_address, redis=redis
+    )
 
     if checkout is None:
         raise ResourceNotFound()
 
-    return await checkout_service.confirm(session, checkout, checkout_confirm)
+    return await checkout_service.confirm(
+        session, checkout, checkout_confirm, redis=redis
+    )
 
 
 @router.get("/client/{client_secret}/stream", include_in_schema=False)
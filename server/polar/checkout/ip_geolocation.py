@@ -1,18 +1,115 @@
+"""
+IP to country geolocation, backed by the IPInfo Country ASN database.
+
+The database file is memory-mapped by libmaxminddb, so its pages live in the
+OS page cache and are shared by all the API processes of a host.
+Lookups go through an in-process LRU cache.
+
+The file is watched for changes: when a new version is moved in place,
+it's opened and swapped in without restarting the server.
+"""
+
 import argparse
+import os
 import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
 from typing import Annotated, cast
 
 import ipinfo_db
 import ipinfo_db.reader
+import structlog
 from fastapi import Depends, Request
 
 from polar.config import settings
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
 
 DATABASE_PATH = (
     settings.IP_GEOLOCATION_DATABASE_DIRECTORY_PATH
     / settings.IP_GEOLOCATION_DATABASE_NAME
 )
 
+IP_GEOLOCATION_CACHE_MAXSIZE = 10_000
+IP_GEOLOCATION_RELOAD_CHECK_INTERVAL_SECONDS = 60.0
+
+
+class IPGeolocationDatabase:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        cache_maxsize: int = IP_GEOLOCATION_CACHE_MAXSIZE,
+        reload_check_interval: float = IP_GEOLOCATION_RELOAD_CHECK_INTERVAL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.cache_maxsize = cache_maxsize
+        self.reload_check_interval = reload_check_interval
+        self._file_id = self._get_file_id()
+        self._client = ipinfo_db.Client(path=path)
+        self._next_reload_check = time.monotonic() + reload_check_interval
+        self._cache: OrderedDict[str, str | None] = OrderedDict()
+
+    def get_country(self, ip: str) -> str | None:
+        self.reload_if_changed()
+
+        try:
+            country = self._cache[ip]
+        except KeyError:
+            pass
+        else:
+            self._cache.move_to_end(ip)
+            return country
+
+        country = cast(str | None, self._client.getCountry(ip))
+        self._cache[ip] = country
+        if len(self._cache) > self.cache_maxsize:
+            self._cache.popitem(last=False)
+        return country
+
+    def reload_if_changed(self, *, force_check: bool = False) -> bool:
+        """
+        Open the database file again if it was replaced since it was opened.
+
+        The file is only checked every `reload_check_interval` seconds,
+        unless `force_check` is set.
+
+        Returns:
+            Whether the database was reloaded.
+        """
+        now = time.monotonic()
+        if not force_check and now < self._next_reload_check:
+            return False
+        self._next_reload_check = now + self.reload_check_interval
+
+        try:
+            file_id = self._get_file_id()
+        except FileNotFoundError:
+            # Keep serving the current database until a new one is moved in
+            return False
+        if file_id == self._file_id:
+            return False
+
+        client = ipinfo_db.Client(path=self.path)
+        # The lookups are synchronous, so none is using the previous reader
+        previous_client, self._client = self._client, client
+        self._file_id = file_id
+        self._cache.clear()
+        previous_client.close()
+
+        log.info("ip_geolocation.reloaded", path=str(self.path))
+        return True
+
+    def close(self) -> None:
+        self._client.close()
+
+    def _get_file_id(self) -> tuple[int, int, int, int]:
+        stat = os.stat(self.path)
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
 
 async def _get_client_dependency(request: Request) -> "IPGeolocationClient | None":
     """
@@ -21,7 +118,7 @@ async def _get_client_dependency(request: Request) -> "IPGeolocationClient | Non
     return request.state.ip_geolocation_client
 
 
-IPGeolocationClient = Annotated[ipinfo_db.Client, Depends(_get_client_dependency)]
+IPGeolocationClient = Annotated[IPGeolocationDatabase, Depends(_get_client_dependency)]
 
 
 def _download_database(access_token: str) -> None:
@@ -31,11 +128,23 @@ def _download_database(access_token: str) -> None:
     This should not be called when starting the server or during a request but
     at build time.
 
+    The database is downloaded next to the current one, then moved in place,
+    so running servers never open a partially written file.
+
     Args:
         access_token: IPInfo access token.
     """
-    client = ipinfo_db.Client(access_token, DATABASE_PATH, replace=True)
-    client.close()
+    fd, temporary_path = tempfile.mkstemp(
+        dir=DATABASE_PATH.parent, prefix=f".{DATABASE_PATH.name}."
+    )
+    os.close(fd)
+    try:
+        client = ipinfo_db.Client(access_token, temporary_path, replace=True)
+        client.close()
+        os.replace(temporary_path, DATABASE_PATH)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
 
 
 def get_client() -> IPGeolocationClient:
@@ -50,7 +159,7 @@ def get_client() -> IPGeolocationClient:
             f"Database not found at {DATABASE_PATH}. "
             "Please run `python -m polar.checkout.ip_geolocation ACCESS_TOKEN`."
         )
-    return ipinfo_db.Client(path=DATABASE_PATH)
+    return IPGeolocationDatabase(DATABASE_PATH)
 
 
 def get_ip_country(client: IPGeolocationClient, ip: str) -> str | None:
@@ -64,7 +173,7 @@ def get_ip_country(client: IPGeolocationClient, ip: str) -> str | None:
     Returns:
         Country alpha-2 code.
     """
-    return cast(str | None, client.getCountry(ip))
+    return client.get_country(ip)
 
 
 if __name__ == "__main__":
@@ -77,4 +186,9 @@ if __name__ == "__main__":
     _download_database(args.access_token)
     sys.stdout.write(f"Database downloaded to {DATABASE_PATH}\n")
 
-__all__ = ["get_client", "get_ip_country", "IPGeolocationClient"]
+__all__ = [
+    "get_client",
+    "get_ip_country",
+    "IPGeolocationClient",
+    "IPGeolocationDatabase",
+]
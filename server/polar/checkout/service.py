@@ -1,10 +1,13 @@
+import hashlib
 import uuid
 from collections.abc import Sequence
+from datetime import UTC, datetime
 from typing import Any
 
 import stripe as stripe_lib
 import structlog
 from sqlalchemy import Select, UnaryExpression, asc, desc, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 from polar.auth.models import (
@@ -22,6 +25,7 @@ from polar.checkout.schemas import (
     CheckoutUpdatePublic,
 )
 from polar.checkout.tax import TaxID, to_stripe_tax_id, validate_tax_id
+from polar.checkout_link.service import checkout_link as checkout_link_service
 from polar.config import settings
 from polar.custom_field.data import validate_custom_field_data
 from polar.enums import PaymentProcessor
@@ -30,18 +34,20 @@ from polar.exceptions import PolarError, PolarRequestValidationError, Validation
 from polar.integrations.stripe.schemas import ProductType
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_expandable_id
+from polar.kit import jwt
 from polar.kit.address import Address
-from polar.kit.crypto import generate_token
+from polar.kit.crypto import generate_token, get_token_hash
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
-from polar.kit.utils import utc_now
+from polar.kit.utils import generate_uuid, utc_now
 from polar.logging import Logger
 from polar.models import (
     Checkout,
     CheckoutLink,
     Organization,
     Product,
+    ProductPrice,
     ProductPriceCustom,
     ProductPriceFixed,
     Subscription,
@@ -53,7 +59,9 @@ from polar.models.product_price import ProductPriceAmountType, ProductPriceFree
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.organization.service import organization as organization_service
 from polar.postgres import AsyncSession
+from polar.product.cache import product_snapshot_cache
 from polar.product.service.product_price import product_price as product_price_service
+from polar.redis import Redis
 from polar.user.service.user import user as user_service
 from polar.user_organization.service import (
     user_organization as user_organization_service,
@@ -155,6 +163,7 @@ class NotAFreePrice(CheckoutError):
 
 
 CHECKOUT_CLIENT_SECRET_PREFIX = "polar_c_"
+CHECKOUT_PENDING_TOKEN_PREFIX = "polar_cp_"
 
 
 class CheckoutService(ResourceServiceReader[Checkout]):
@@ -207,6 +216,8 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         checkout_create: CheckoutCreate,
         auth_subject: AuthSubject[User | Organization],
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
+        *,
+        redis: Redis | None = None,
     ) -> Checkout:
         price = await product_price_service.get_writable_by_id(
             session, checkout_create.product_price_id, auth_subject
@@ -341,7 +352,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                 )
             customer = subscription.user
 
-        product = await self._eager_load_product(session, product)
+        product = await self._eager_load_product(session, product, redis)
 
         amount = checkout_create.amount
         currency = None
@@ -393,7 +404,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, checkout, redis)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -410,6 +421,8 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         auth_subject: AuthSubject[User | Anonymous],
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
         ip_address: str | None = None,
+        *,
+        redis: Redis | None = None,
     ) -> Checkout:
         price = await product_price_service.get_by_id(
             session, checkout_create.product_price_id
@@ -452,7 +465,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                 ]
             )
 
-        product = await self._eager_load_product(session, product)
+        product = await self._eager_load_product(session, product, redis)
 
         amount = None
         currency = None
@@ -497,7 +510,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, checkout, redis)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -533,51 +546,19 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         embed_origin: str | None = None,
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
         ip_address: str | None = None,
+        *,
+        redis: Redis | None = None,
+        id: uuid.UUID | None = None,
+        client_secret: str | None = None,
     ) -> Checkout:
-        price = checkout_link.product_price
-
-        if price.is_archived:
-            raise PolarRequestValidationError(
-                [
-                    {
-                        "type": "value_error",
-                        "loc": ("body", "product_price_id"),
-                        "msg": "Price is archived.",
-                        "input": price.id,
-                    }
-                ]
-            )
-
-        product = price.product
-        if product.is_archived:
-            raise PolarRequestValidationError(
-                [
-                    {
-                        "type": "value_error",
-                        "loc": ("body", "product_price_id"),
-                        "msg": "Product is archived.",
-                        "input": price.id,
-                    }
-                ]
-            )
-
-        product = await self._eager_load_product(session, product)
-
-        amount = None
-        currency = None
-        if isinstance(price, ProductPriceFixed):
-            amount = price.price_amount
-            currency = price.price_currency
-        elif isinstance(price, ProductPriceCustom):
-            currency = price.price_currency
-            if amount is None:
-                amount = price.preset_amount or 1000
-        elif isinstance(price, ProductPriceFree):
-            amount = None
-            currency = None
+        price = self._get_checkout_link_price(checkout_link)
+        product = await self._eager_load_product(session, price.product, redis)
+        amount, currency = self._get_checkout_link_amount(price)
 
         checkout = Checkout(
-            client_secret=generate_token(prefix=CHECKOUT_CLIENT_SECRET_PREFIX),
+            id=id or generate_uuid(),
+            client_secret=client_secret
+            or generate_token(prefix=CHECKOUT_CLIENT_SECRET_PREFIX),
             amount=amount,
             currency=currency,
             product=product,
@@ -595,7 +576,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
         try:
-            checkout = await self._update_checkout_tax(session, checkout)
+            checkout = await self._update_checkout_tax(session, checkout, redis)
         # Swallow incomplete tax calculation error: require it only on confirm
         except TaxCalculationError:
             pass
@@ -605,21 +586,177 @@ class CheckoutService(ResourceServiceReader[Checkout]):
 
         return checkout
 
+    def create_pending_checkout_token(
+        self, checkout_link: CheckoutLink, embed_origin: str | None = None
+    ) -> str:
+        """
+        Issue a signed token holding what's needed to create a checkout from a link.
+
+        Checkout link redirects hand out this token instead of creating a checkout,
+        so visitors bouncing off the link don't cost a checkout, a geolocation
+        and a tax calculation. The checkout page shows a preview built from
+        the token, see `get_or_preview_from_pending_token`, and the checkout
+        is created on the first client update or confirmation,
+        see `get_or_create_from_pending_token`.
+
+        The token ends up in URLs, so it doesn't hold any visitor data:
+        the IP address is taken from the request creating the checkout.
+        """
+        # Fail early, like creating the checkout right away would
+        self._get_checkout_link_price(checkout_link)
+
+        token = jwt.encode(
+            data={
+                "checkout_link_client_secret": checkout_link.client_secret,
+                "embed_origin": embed_origin,
+                # Every redirect gets its own checkout
+                "nonce": generate_token(),
+            },
+            secret=settings.SECRET,
+            expires_in=settings.CHECKOUT_TTL_SECONDS,
+            type="checkout_link_pending",
+        )
+        return f"{CHECKOUT_PENDING_TOKEN_PREFIX}{token}"
+
+    async def get_or_preview_from_pending_token(
+        self, session: AsyncSession, token: str, *, redis: Redis | None = None
+    ) -> Checkout | None:
+        """
+        Return the checkout of a pending token, or a preview if it's not created yet.
+
+        The preview is built in memory from the checkout link: it's not saved,
+        and doesn't trigger any geolocation, tax calculation or webhook.
+        Its client secret is the pending token itself, so the client
+        creates the checkout when it first updates or confirms it.
+        Its ID is derived from the token: it's the ID the checkout gets once created.
+        """
+        data = self._decode_pending_checkout_token(token)
+        if data is None:
+            return None
+
+        checkout = await self.get_by_client_secret(
+            session, self._get_pending_checkout_client_secret(token)
+        )
+        if checkout is not None:
+            return checkout
+
+        checkout_link = await checkout_link_service.get_by_client_secret(
+            session, data["checkout_link_client_secret"]
+        )
+        if checkout_link is None:
+            return None
+
+        price = self._get_checkout_link_price(checkout_link)
+        product = await self._eager_load_product(session, price.product, redis)
+        amount, currency = self._get_checkout_link_amount(price)
+
+        return Checkout(
+            id=self._get_pending_checkout_id(token),
+            created_at=utc_now(),
+            client_secret=token,
+            status=CheckoutStatus.open,
+            expires_at=datetime.fromtimestamp(data["exp"], UTC),
+            amount=amount,
+            currency=currency,
+            product_id=product.id,
+            product=product,
+            product_price_id=price.id,
+            product_price=price,
+            embed_origin=data["embed_origin"],
+            payment_processor=checkout_link.payment_processor,
+            payment_processor_metadata={},
+            success_url=checkout_link.success_url,
+            user_metadata=checkout_link.user_metadata,
+            custom_field_data={},
+        )
+
+    async def get_or_create_from_pending_token(
+        self,
+        session: AsyncSession,
+        token: str,
+        ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
+        ip_address: str | None = None,
+        *,
+        redis: Redis | None = None,
+    ) -> Checkout | None:
+        """
+        Return the checkout of a pending token, creating it the first time.
+
+        The checkout client secret is derived from the token,
+        so using the same token again returns the same checkout.
+        """
+        data = self._decode_pending_checkout_token(token)
+        if data is None:
+            return None
+
+        client_secret = self._get_pending_checkout_client_secret(token)
+        checkout = await self.get_by_client_secret(session, client_secret)
+        if checkout is not None:
+            return checkout
+
+        checkout_link = await checkout_link_service.get_by_client_secret(
+            session, data["checkout_link_client_secret"]
+        )
+        if checkout_link is None:
+            return None
+
+        nested = await session.begin_nested()
+        try:
+            await self.checkout_link_create(
+                session,
+                checkout_link,
+                data["embed_origin"],
+                ip_geolocation_client,
+                ip_address,
+                redis=redis,
+                id=self._get_pending_checkout_id(token),
+                client_secret=client_secret,
+            )
+        # The same token was used concurrently, and the other request won
+        except IntegrityError:
+            await nested.rollback()
+
+        return await self.get_by_client_secret(session, client_secret)
+
+    async def get_or_create_by_client_secret(
+        self,
+        session: AsyncSession,
+        client_secret: str,
+        ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
+        ip_address: str | None = None,
+        *,
+        redis: Redis | None = None,
+    ) -> Checkout | None:
+        """
+        Return a checkout by client secret.
+
+        If it's a pending checkout token, the checkout is created the first time.
+        """
+        if client_secret.startswith(CHECKOUT_PENDING_TOKEN_PREFIX):
+            return await self.get_or_create_from_pending_token(
+                session, client_secret, ip_geolocation_client, ip_address, redis=redis
+            )
+        return await self.get_by_client_secret(session, client_secret)
+
     async def update(
         self,
         session: AsyncSession,
         checkout: Checkout,
         checkout_update: CheckoutUpdate | CheckoutUpdatePublic,
         ip_geolocation_client: ip_geolocation.IPGeolocationClient | None = None,
+        *,
+        redis: Redis | None = None,
     ) -> Checkout:
+        tax_inputs = self._get_tax_inputs(checkout)
         checkout = await self._update_checkout(
             session, checkout, checkout_update, ip_geolocation_client
         )
-        try:
-            checkout = await self._update_checkout_tax(session, checkout)
-        # Swallow incomplete tax calculation error: require it only on confirm
-        except TaxCalculationError:
-            pass
+        if self._should_update_checkout_tax(checkout, tax_inputs):
+            try:
+                checkout = await self._update_checkout_tax(session, checkout, redis)
+            # Swallow incomplete tax calculation error: require it only on confirm
+            except TaxCalculationError:
+                pass
 
         await self._after_checkout_updated(session, checkout)
         return checkout
@@ -629,21 +766,25 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         session: AsyncSession,
         checkout: Checkout,
         checkout_confirm: CheckoutConfirm,
+        *,
+        redis: Redis | None = None,
     ) -> Checkout:
+        tax_inputs = self._get_tax_inputs(checkout)
         checkout = await self._update_checkout(session, checkout, checkout_confirm)
 
         errors: list[ValidationError] = []
-        try:
-            checkout = await self._update_checkout_tax(session, checkout)
-        except TaxCalculationError as e:
-            errors.append(
-                {
-                    "type": "value_error",
-                    "loc": ("body", "customer_billing_address"),
-                    "msg": e.message,
-                    "input": None,
-                }
-            )
+        if self._should_update_checkout_tax(checkout, tax_inputs):
+            try:
+                checkout = await self._update_checkout_tax(session, checkout, redis)
+            except TaxCalculationError as e:
+                errors.append(
+                    {
+                        "type": "value_error",
+                        "loc": ("body", "customer_billing_address"),
+                        "msg": e.message,
+                        "input": None,
+                    }
+                )
 
         if checkout.amount is None and isinstance(
             checkout.product_price, ProductPriceCustom
@@ -687,9 +828,22 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         assert checkout.customer_email is not None
 
         if checkout.payment_processor == PaymentProcessor.stripe:
-            stripe_customer_id = await self._create_or_update_stripe_customer(
-                session, checkout
-            )
+            customer = await self._get_customer(session, checkout)
+            try:
+                if customer is not None and customer.stripe_customer_id is not None:
+                    stripe_customer_id = customer.stripe_customer_id
+                    await self._update_stripe_customer(
+                        session, checkout, stripe_customer_id
+                    )
+                else:
+                    stripe_customer_id = await self._create_stripe_customer(
+                        checkout, customer
+                    )
+            except stripe_lib.StripeError as e:
+                error = e.error
+                error_type = error.type if error is not None else None
+                error_message = error.message if error is not None else None
+                raise PaymentError(checkout, error_type, error_message)
             checkout.payment_processor_metadata = {"customer_id": stripe_customer_id}
 
             if checkout.is_payment_required:
@@ -1188,8 +1342,30 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         session.add(checkout)
         return checkout
 
+    def _get_tax_inputs(self, checkout: Checkout) -> tuple[Any, ...]:
+        return (
+            checkout.currency,
+            checkout.amount,
+            checkout.customer_billing_address,
+            checkout.customer_tax_id,
+        )
+
+    def _should_update_checkout_tax(
+        self, checkout: Checkout, previous_tax_inputs: tuple[Any, ...]
+    ) -> bool:
+        """
+        Whether the tax amount needs to be calculated again after an update.
+
+        The price can only change within the same product,
+        so the tax amount stays valid as long as those inputs don't change.
+        """
+        return (
+            checkout.tax_amount is None
+            or self._get_tax_inputs(checkout) != previous_tax_inputs
+        )
+
     async def _update_checkout_tax(
-        self, session: AsyncSession, checkout: Checkout
+        self, session: AsyncSession, checkout: Checkout, redis: Redis | None = None
     ) -> Checkout:
         if not checkout.product.is_tax_applicable:
             checkout.tax_amount = 0
@@ -1210,6 +1386,7 @@ class CheckoutService(ResourceServiceReader[Checkout]):
                     [checkout.customer_tax_id]
                     if checkout.customer_tax_id is not None
                     else [],
+                    redis=redis,
                 )
                 checkout.tax_amount = tax_amount
             except TaxCalculationError:
@@ -1220,6 +1397,65 @@ class CheckoutService(ResourceServiceReader[Checkout]):
 
         return checkout
 
+    def _get_checkout_link_price(self, checkout_link: CheckoutLink) -> ProductPrice:
+        price = checkout_link.product_price
+
+        if price.is_archived:
+            raise PolarRequestValidationError(
+                [
+                    {
+                        "type": "value_error",
+                        "loc": ("body", "product_price_id"),
+                        "msg": "Price is archived.",
+                        "input": price.id,
+                    }
+                ]
+            )
+
+        if price.product.is_archived:
+            raise PolarRequestValidationError(
+                [
+                    {
+                        "type": "value_error",
+                        "loc": ("body", "product_price_id"),
+                        "msg": "Product is archived.",
+                        "input": price.id,
+                    }
+                ]
+            )
+
+        return price
+
+    def _get_checkout_link_amount(
+        self, price: ProductPrice
+    ) -> tuple[int | None, str | None]:
+        if isinstance(price, ProductPriceFixed):
+            return price.price_amount, price.price_currency
+        if isinstance(price, ProductPriceCustom):
+            return price.preset_amount or 1000, price.price_currency
+        return None, None
+
+    def _decode_pending_checkout_token(self, token: str) -> dict[str, Any] | None:
+        try:
+            return jwt.decode(
+                token=token.removeprefix(CHECKOUT_PENDING_TOKEN_PREFIX),
+                secret=settings.SECRET,
+                type="checkout_link_pending",
+            )
+        except (jwt.DecodeError, jwt.ExpiredSignatureError):
+            return None
+
+    def _get_pending_checkout_client_secret(self, token: str) -> str:
+        return CHECKOUT_CLIENT_SECRET_PREFIX + get_token_hash(
+            token, secret=settings.SECRET
+        )
+
+    def _get_pending_checkout_id(self, token: str) -> uuid.UUID:
+        # Hashed again, so the public ID doesn't reveal the client secret
+        client_secret = self._get_pending_checkout_client_secret(token)
+        digest = hashlib.sha256(client_secret.encode("ascii")).digest()
+        return uuid.UUID(bytes=digest[:16], version=4)
+
     async def _update_checkout_ip_geolocation(
         self,
         session: AsyncSession,
@@ -1252,48 +1488,141 @@ class CheckoutService(ResourceServiceReader[Checkout]):
             fields.update({"customer_name", "customer_billing_address"})
         return fields
 
-    async def _create_or_update_stripe_customer(
+    async def _get_customer(
         self, session: AsyncSession, checkout: Checkout
+    ) -> User | None:
+        if checkout.customer_id is None:
+            return None
+        return await user_service.get(session, checkout.customer_id)
+
+    async def _lock_customer(self, session: AsyncSession, customer: User) -> User:
+        """
+        Lock the customer row until the end of the transaction
+        and refresh it, so its Stripe customer is only created once.
+        """
+        statement = (
+            select(User)
+            .where(User.id == customer.id)
+            .with_for_update(of=User)
+            .execution_options(populate_existing=True)
+        )
+        result = await session.execute(statement)
+        return result.unique().scalar_one()
+
+    async def _create_stripe_customer(
+        self, checkout: Checkout, customer: User | None
     ) -> str:
-        assert checkout.customer_email is not None
+        """
+        Create a Stripe customer dedicated to the checkout.
 
-        stripe_customer_id: str | None = None
-        if checkout.customer_id is not None:
-            user = await user_service.get(session, checkout.customer_id)
-            if user is not None and user.stripe_customer_id is not None:
-                stripe_customer_id = user.stripe_customer_id
+        It's not saved on the user: their own customer is provisioned
+        by the `checkout.provision_stripe_customer` task.
+        """
+        assert checkout.customer_email is not None
 
-        if stripe_customer_id is None:
-            create_params: stripe_lib.Customer.CreateParams = {
-                "email": checkout.customer_email
-            }
-            if checkout.customer_name is not None:
-                create_params["name"] = checkout.customer_name
-            if checkout.customer_billing_address is not None:
-                create_params["address"] = checkout.customer_billing_address.to_dict()  # type: ignore
-            if checkout.customer_tax_id is not None:
-                create_params["tax_id_data"] = [
-                    to_stripe_tax_id(checkout.customer_tax_id)
-                ]
-            stripe_customer = await stripe_service.create_customer(**create_params)
-            stripe_customer_id = stripe_customer.id
-        else:
-            update_params: stripe_lib.Customer.ModifyParams = {
-                "email": checkout.customer_email
+        create_params: stripe_lib.Customer.CreateParams = {
+            "email": checkout.customer_email
+        }
+        if checkout.customer_name is not None:
+            create_params["name"] = checkout.customer_name
+        if checkout.customer_billing_address is not None:
+            create_params["address"] = checkout.customer_billing_address.to_dict()  # type: ignore
+        if checkout.customer_tax_id is not None:
+            create_params["tax_id_data"] = [to_stripe_tax_id(checkout.customer_tax_id)]
+        if customer is not None:
+            create_params["metadata"] = {
+                "user_id": str(customer.id),
+                "email": customer.email,
             }
-            if checkout.customer_name is not None:
-                update_params["name"] = checkout.customer_name
-            if checkout.customer_billing_address is not None:
-                update_params["address"] = checkout.customer_billing_address.to_dict()  # type: ignore
-            await stripe_service.update_customer(
-                stripe_customer_id,
-                tax_id=to_stripe_tax_id(checkout.customer_tax_id)
-                if checkout.customer_tax_id is not None
-                else None,
-                **update_params,
+        stripe_customer = await stripe_service.create_customer(**create_params)
+        return stripe_customer.id
+
+    async def _update_stripe_customer(
+        self, session: AsyncSession, checkout: Checkout, stripe_customer_id: str
+    ) -> None:
+        """
+        Update the existing Stripe customer with the checkout details.
+
+        It runs before the payment: the tax ID and the billing address
+        have to be on the customer for its invoices.
+        Only the details changed since the last checkout synced to this customer
+        are sent, so the tax ID isn't added twice and the call is skipped
+        when nothing changed.
+        """
+        assert checkout.customer_email is not None
+
+        last_synced = await self._get_last_synced_checkout(
+            session, checkout, stripe_customer_id
+        )
+        update_params: stripe_lib.Customer.ModifyParams = {}
+        if last_synced is None or last_synced.customer_email != checkout.customer_email:
+            update_params["email"] = checkout.customer_email
+        if checkout.customer_name is not None and (
+            last_synced is None or last_synced.customer_name != checkout.customer_name
+        ):
+            update_params["name"] = checkout.customer_name
+        if checkout.customer_billing_address is not None and (
+            last_synced is None
+            or last_synced.customer_billing_address != checkout.customer_billing_address
+        ):
+            update_params["address"] = checkout.customer_billing_address.to_dict()  # type: ignore
+        tax_id: stripe_lib.Customer.CreateParamsTaxIdDatum | None = None
+        if checkout.customer_tax_id is not None and (
+            last_synced is None
+            or last_synced.customer_tax_id is None
+            or tuple(last_synced.customer_tax_id) != tuple(checkout.customer_tax_id)
+        ):
+            tax_id = to_stripe_tax_id(checkout.customer_tax_id)
+
+        if not update_params and tax_id is None:
+            return
+
+        await stripe_service.update_customer(
+            stripe_customer_id, tax_id=tax_id, **update_params
+        )
+
+    async def _get_last_synced_checkout(
+        self, session: AsyncSession, checkout: Checkout, stripe_customer_id: str
+    ) -> Checkout | None:
+        statement = (
+            select(Checkout)
+            .where(
+                Checkout.deleted_at.is_(None),
+                Checkout.id != checkout.id,
+                Checkout.customer_id == checkout.customer_id,
+                Checkout.status.in_(
+                    (CheckoutStatus.confirmed, CheckoutStatus.succeeded)
+                ),
+                Checkout.payment_processor_metadata["customer_id"].astext
+                == stripe_customer_id,
             )
+            .order_by(Checkout.created_at.desc())
+            .limit(1)
+        )
+        result = await session.execute(statement)
+        return result.scalars().first()
+
+    async def provision_stripe_customer(
+        self, session: AsyncSession, checkout_id: uuid.UUID
+    ) -> None:
+        """
+        Create the Stripe customer of the checkout user ahead of the confirmation,
+        so confirming only has to create the payment.
+        """
+        checkout = await self.get(session, checkout_id)
+        if checkout is None or checkout.status != CheckoutStatus.open:
+            return
+
+        customer = await self._get_customer(session, checkout)
+        if customer is None or customer.stripe_customer_id is not None:
+            return
+
+        # Another checkout of the user may be provisioning it right now
+        customer = await self._lock_customer(session, customer)
+        if customer.stripe_customer_id is not None:
+            return
 
-        return stripe_customer_id
+        await stripe_service.get_or_create_user_customer(session, customer)
 
     async def _get_eager_loaded_checkout(
         self, session: AsyncSession, checkout_id: uuid.UUID
@@ -1313,6 +1642,12 @@ class CheckoutService(ResourceServiceReader[Checkout]):
     async def _after_checkout_created(
         self, session: AsyncSession, checkout: Checkout
     ) -> None:
+        if (
+            checkout.customer_id is not None
+            and checkout.payment_processor == PaymentProcessor.stripe
+        ):
+            enqueue_job("checkout.provision_stripe_customer", checkout_id=checkout.id)
+
         organization = await organization_service.get(
             session, checkout.product.organization_id
         )
@@ -1336,8 +1671,13 @@ class CheckoutService(ResourceServiceReader[Checkout]):
         )
 
     async def _eager_load_product(
-        self, session: AsyncSession, product: Product
+        self, session: AsyncSession, product: Product, redis: Redis | None = None
     ) -> Product:
+        if redis is not None and await product_snapshot_cache.load(
+            session, redis, product
+        ):
+            return product
+
         await session.refresh(
             product,
             {"organization", "prices", "product_medias", "attached_custom_fields"},
@@ -23,6 +23,14 @@ async def handle_free_success(
         await checkout_service.handle_free_success(session, checkout_id)
 
 
+@task("checkout.provision_stripe_customer")
+async def provision_stripe_customer(
+    ctx: JobContext, checkout_id: uuid.UUID, polar_context: PolarWorkerContext
+) -> None:
+    async with AsyncSessionMaker(ctx) as session:
+        await checkout_service.provision_stripe_customer(session, checkout_id)
+
+
 @task(
     "checkout.expire_open_checkouts",
     cron_trigger=CronTrigger.from_crontab("0,15,30,45 * * * *"),
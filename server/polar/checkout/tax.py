@@ -1,6 +1,8 @@
+import asyncio
 import hashlib
 import json
 from collections.abc import Sequence
+from datetime import timedelta
 from enum import StrEnum
 from typing import Any, LiteralString
 
@@ -14,6 +16,7 @@ from stdnum import get_cc_module
 from polar.exceptions import PolarError
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.kit.address import Address
+from polar.redis import Redis
 
 
 class TaxIDFormat(StrEnum):
@@ -284,21 +287,40 @@ class InvalidTaxLocation(TaxCalculationError):
         )
 
 
-async def calculate_tax(
+TAX_CALCULATION_CACHE_TTL = timedelta(hours=1)
+"""
+Tax rates rarely change, and a checkout session doesn't live longer than that.
+"""
+
+_pending_calculations: dict[str, asyncio.Task[int]] = {}
+
+
+def _get_calculation_key(
     currency: str,
     amount: int,
     stripe_product_id: str,
     address: Address,
     tax_ids: list[TaxID],
-) -> int:
-    # Compute an idempotency key based on the input parameters to work as a sort of cache
+) -> str:
     address_str = address.model_dump_json()
     tax_ids_str = ",".join(f"{tax_id[0]}:{tax_id[1]}" for tax_id in tax_ids)
-    idempotency_key_str = (
-        f"{currency}:{amount}:{stripe_product_id}:{address_str}:{tax_ids_str}"
-    )
-    idempotency_key = hashlib.sha256(idempotency_key_str.encode()).hexdigest()
+    key_str = f"{currency}:{amount}:{stripe_product_id}:{address_str}:{tax_ids_str}"
+    return hashlib.sha256(key_str.encode()).hexdigest()
+
+
+def _get_cache_key(calculation_key: str) -> str:
+    return f"checkout:tax_calculation:{calculation_key}"
 
+
+async def _create_tax_calculation(
+    calculation_key: str,
+    currency: str,
+    amount: int,
+    stripe_product_id: str,
+    address: Address,
+    tax_ids: list[TaxID],
+    redis: Redis | None,
+) -> int:
     try:
         calculation = await stripe_service.create_tax_calculation(
             currency=currency,
@@ -315,7 +337,8 @@ async def calculate_tax(
                 "address_source": "billing",
                 "tax_ids": [to_stripe_tax_id(tax_id) for tax_id in tax_ids],
             },
-            idempotency_key=idempotency_key,
+            # Same inputs on another process get the same calculation from Stripe
+            idempotency_key=calculation_key,
         )
     except stripe_lib.InvalidRequestError as e:
         if (
@@ -329,5 +352,61 @@ async def calculate_tax(
         if e.error is None or e.error.code != "customer_tax_location_invalid":
             raise
         raise InvalidTaxLocation(e) from e
-    else:
-        return calculation.tax_amount_exclusive
+
+    tax_amount = calculation.tax_amount_exclusive
+    if redis is not None:
+        await redis.set(
+            _get_cache_key(calculation_key), tax_amount, ex=TAX_CALCULATION_CACHE_TTL
+        )
+    return tax_amount
+
+
+async def calculate_tax(
+    currency: str,
+    amount: int,
+    stripe_product_id: str,
+    address: Address,
+    tax_ids: list[TaxID],
+    *,
+    redis: Redis | None = None,
+) -> int:
+    """
+    Calculate the tax amount with Stripe Tax.
+
+    If a Redis client is given, the results are cached for
+    `TAX_CALCULATION_CACHE_TTL`, keyed on the inputs.
+    Concurrent calculations with the same inputs share a single Stripe call.
+
+    Raises:
+        IncompleteTaxLocation: The address is missing required information.
+        InvalidTaxLocation: The tax location can't be determined from the address.
+    """
+    calculation_key = _get_calculation_key(
+        currency, amount, stripe_product_id, address, tax_ids
+    )
+
+    if redis is not None:
+        cached_tax_amount = await redis.get(_get_cache_key(calculation_key))
+        if cached_tax_amount is not None:
+            return int(cached_tax_amount)
+
+    task = _pending_calculations.get(calculation_key)
+    if task is None:
+        task = asyncio.create_task(
+            _create_tax_calculation(
+                calculation_key,
+                currency,
+                amount,
+                stripe_product_id,
+                address,
+                tax_ids,
+                redis,
+            )
+        )
+        _pending_calculations[calculation_key] = task
+        task.add_done_callback(
+            lambda _: _pending_calculations.pop(calculation_key, None)
+        )
+
+    # Don't cancel the calculation shared with other callers
+    return await asyncio.shield(task)
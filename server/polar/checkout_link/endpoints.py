@@ -1,14 +1,15 @@
 from typing import Annotated
 
-from fastapi import Depends, Path, Query, Request
+from fastapi import Depends, Path, Query, Request, Response
 from fastapi.datastructures import URL
 from fastapi.responses import RedirectResponse
 from pydantic import UUID4
 
-from polar.checkout import ip_geolocation
 from polar.checkout.service import checkout as checkout_service
+from polar.config import settings
 from polar.exceptions import ResourceNotFound
 from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.rate_limit import RateLimit, RateLimiter, copy_rate_limit_headers
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import CheckoutLink
 from polar.openapi import APITag
@@ -154,15 +155,27 @@ async def delete(
     await checkout_link_service.delete(session, checkout_link)
 
 
-@router.get("/{client_secret}/redirect", include_in_schema=False)
+@router.get(
+    "/{client_secret}/redirect",
+    include_in_schema=False,
+    dependencies=[
+        # Every redirect may end up creating a checkout
+        Depends(RateLimiter("checkout_link_redirect", RateLimit(limit=30, period=60)))
+    ],
+)
 async def redirect(
     request: Request,
+    response: Response,
     client_secret: CheckoutLinkClientSecret,
-    ip_geolocation_client: ip_geolocation.IPGeolocationClient,
     embed_origin: str | None = Query(None),
     session: AsyncSession = Depends(get_db_session),
 ) -> RedirectResponse:
-    """Use a checkout link to create a checkout session and redirect to it."""
+    """
+    Use a checkout link to redirect to a checkout session.
+
+    The checkout session is only created when the customer first updates
+    or confirms it on the checkout page.
+    """
     checkout_link = await checkout_link_service.get_by_client_secret(
         session, client_secret
     )
@@ -170,16 +183,13 @@ async def redirect(
     if checkout_link is None:
         raise ResourceNotFound()
 
-    ip_address = request.client.host if request.client else None
-    checkout = await checkout_service.checkout_link_create(
-        session, checkout_link, embed_origin, ip_geolocation_client, ip_address
-    )
+    token = checkout_service.create_pending_checkout_token(checkout_link, embed_origin)
 
     # Add the query parameters from the request to the URL
-    checkout_url = URL(checkout.url)
+    checkout_url = URL(settings.generate_frontend_url(f"/checkout/{token}"))
     query_params = {
         k: v for k, v in request.query_params.items() if k not in {"embed_origin"}
     }
     checkout_url = checkout_url.include_query_params(**query_params)
 
-    return RedirectResponse(checkout_url)
+    return copy_rate_limit_headers(response, RedirectResponse(checkout_url))
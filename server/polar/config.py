@@ -62,6 +62,12 @@ class Settings(BaseSettings):
     AUTH_COOKIE_TTL_SECONDS: int = 60 * 60 * 24 * 31  # 31 days
     AUTH_COOKIE_DOMAIN: str = "127.0.0.1"
 
+    # Auth tokens cache. Set to 0 to disable.
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 60
+
+    # Rate limiting of public endpoints
+    RATE_LIMIT_ENABLED: bool = True
+
     # Magic link
     MAGIC_LINK_TTL_SECONDS: int = 60 * 30  # 30 minutes
 
@@ -80,6 +86,18 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = 5
     DATABASE_SYNC_POOL_SIZE: int = 1  # Specific pool size for sync connection: since we only use it in OAuth2 router, don't waste resources.
     DATABASE_POOL_RECYCLE_SECONDS: int = 600  # 10 minutes
+    # Reject requests with a 503 when the expected wait for a connection is higher.
+    # Disabled by default: set it to enable admission control.
+    DATABASE_ADMISSION_MAX_EXPECTED_WAIT_SECONDS: float | None = None
+    # Read replica, for read-only endpoints and tasks. Unset to only use the primary.
+    POSTGRES_READ_USER: str | None = None
+    POSTGRES_READ_PWD: str | None = None
+    POSTGRES_READ_HOST: str | None = None
+    POSTGRES_READ_PORT: int | None = None
+    POSTGRES_READ_DATABASE: str | None = None
+    DATABASE_READ_POOL_SIZE: int = 5
+    DATABASE_READ_MAX_LAG_SECONDS: float = 5.0
+    DATABASE_READ_LAG_CHECK_INTERVAL_SECONDS: float = 5.0
 
     # Redis
     REDIS_HOST: str = "127.0.0.1"
@@ -166,6 +184,7 @@ class Settings(BaseSettings):
 
     # Application behaviours
     API_PAGINATION_MAX_LIMIT: int = 100
+    API_PAGINATION_COUNT_CAP: int = 10000
 
     GITHUB_BADGE_EMBED: bool = False
     GITHUB_BADGE_EMBED_DEFAULT_LABEL: str = "Fund"
@@ -235,6 +254,22 @@ class Settings(BaseSettings):
             )
         )
 
+    def get_postgres_read_dsn(
+        self, driver: Literal["asyncpg", "psycopg2"]
+    ) -> str | None:
+        if self.POSTGRES_READ_HOST is None:
+            return None
+        return str(
+            PostgresDsn.build(
+                scheme=f"postgresql+{driver}",
+                username=self.POSTGRES_READ_USER or self.POSTGRES_USER,
+                password=self.POSTGRES_READ_PWD or self.POSTGRES_PWD,
+                host=self.POSTGRES_READ_HOST,
+                port=self.POSTGRES_READ_PORT or self.POSTGRES_PORT,
+                path=self.POSTGRES_READ_DATABASE or self.POSTGRES_DATABASE,
+            )
+        )
+
     def is_environment(self, environments: set[Environment]) -> bool:
         return self.ENV in environments
 
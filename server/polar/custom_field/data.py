@@ -1,4 +1,7 @@
+import uuid
+from collections import OrderedDict
 from collections.abc import Sequence
+from datetime import datetime
 from typing import TYPE_CHECKING, Any
 
 from pydantic import BaseModel, Field, ValidationError, create_model
@@ -66,13 +69,74 @@ def build_custom_field_data_schema(
     return create_model("CustomFieldDataInput", **fields_definitions)
 
 
+CustomFieldDataSchemaKey = tuple[tuple[uuid.UUID, datetime, bool], ...]
+
+
+class CustomFieldDataSchemaCache:
+    """
+    In-memory LRU cache of the compiled custom field data schemas.
+
+    Building a pydantic model is much more expensive than validating with it,
+    so we reuse them across requests. Schemas are keyed by the identity and
+    version of the attached custom fields, so an updated field
+    never hits a stale schema, even in other processes.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._schemas: OrderedDict[CustomFieldDataSchemaKey, type[BaseModel]] = (
+            OrderedDict()
+        )
+
+    def get(
+        self, custom_fields: Sequence[tuple["CustomField", bool]]
+    ) -> type[BaseModel]:
+        key = self._get_key(custom_fields)
+        try:
+            self._schemas.move_to_end(key)
+            return self._schemas[key]
+        except KeyError:
+            schema = build_custom_field_data_schema(custom_fields)
+            self._schemas[key] = schema
+            if len(self._schemas) > self.maxsize:
+                self._schemas.popitem(last=False)
+            return schema
+
+    def invalidate(self, custom_field_id: uuid.UUID) -> None:
+        """Evict the schemas involving the given custom field."""
+        for key in [
+            key
+            for key in self._schemas
+            if any(id == custom_field_id for id, _, _ in key)
+        ]:
+            del self._schemas[key]
+
+    def clear(self) -> None:
+        self._schemas.clear()
+
+    def _get_key(
+        self, custom_fields: Sequence[tuple["CustomField", bool]]
+    ) -> CustomFieldDataSchemaKey:
+        return tuple(
+            (
+                custom_field.id,
+                custom_field.modified_at or custom_field.created_at,
+                required,
+            )
+            for custom_field, required in custom_fields
+        )
+
+
+custom_field_data_schema_cache = CustomFieldDataSchemaCache()
+
+
 def validate_custom_field_data(
     attached_custom_fields: Sequence["AttachedCustomFieldMixin"],
     data: dict[str, Any],
     *,
     error_loc_prefix: Sequence[str] = ("body", "custom_field_data"),
 ) -> dict[str, Any]:
-    schema = build_custom_field_data_schema(
+    schema = custom_field_data_schema_cache.get(
         [(f.custom_field, f.required) for f in attached_custom_fields]
     )
     try:
@@ -22,13 +22,20 @@ from polar.exceptions import PolarError, PolarRequestValidationError
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
-from polar.models import CustomField, Organization, User, UserOrganization
+from polar.models import (
+    CustomField,
+    Organization,
+    ProductCustomField,
+    User,
+    UserOrganization,
+)
 from polar.models.custom_field import CustomFieldType
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncSession
+from polar.product.cache import product_snapshot_cache
 
 from .attachment import attached_custom_fields_models
-from .data import custom_field_data_models
+from .data import custom_field_data_models, custom_field_data_schema_cache
 from .schemas import CustomFieldCreate, CustomFieldUpdate
 
 
@@ -209,11 +216,16 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
                 await session.execute(update_statement)
 
         session.add(custom_field)
+        custom_field_data_schema_cache.invalidate(custom_field.id)
+        await self._invalidate_product_snapshots(session, custom_field)
         return custom_field
 
     async def delete(
         self, session: AsyncSession, custom_field: CustomField
     ) -> CustomField:
+        # Before the attachments are deleted
+        await self._invalidate_product_snapshots(session, custom_field)
+
         custom_field.set_deleted_at()
         session.add(custom_field)
 
@@ -224,8 +236,21 @@ class CustomFieldService(ResourceServiceReader[CustomField]):
             )
             await session.execute(delete_statement)
 
+        custom_field_data_schema_cache.invalidate(custom_field.id)
+
         return custom_field
 
+    async def _invalidate_product_snapshots(
+        self, session: AsyncSession, custom_field: CustomField
+    ) -> None:
+        # Checkouts use a cached snapshot of the products with their custom fields
+        statement = select(ProductCustomField.product_id).where(
+            ProductCustomField.custom_field_id == custom_field.id
+        )
+        result = await session.execute(statement)
+        for product_id in result.scalars().unique().all():
+            product_snapshot_cache.invalidate(product_id)
+
     async def get_by_organization_and_id(
         self, session: AsyncSession, id: uuid.UUID, organization_id: uuid.UUID
     ) -> CustomField | None:
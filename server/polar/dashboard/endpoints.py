@@ -19,6 +19,8 @@ from polar.external_organization.service import (
 from polar.funding.schemas import PledgesTypeSummaries
 from polar.issue.schemas import Issue as IssueSchema
 from polar.issue.service import issue
+from polar.kit.db.query_stats import query_budget
+from polar.models.external_organization import ExternalOrganization
 from polar.models.organization import Organization
 from polar.models.pledge import PledgeState
 from polar.models.repository import Repository
@@ -27,7 +29,9 @@ from polar.models.user_organization import UserOrganization
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.organization.service import organization as organization_service
-from polar.pledge.endpoints import to_schema as pledge_to_schema
+from polar.pledge.endpoints import (
+    to_schema_from_memberships as pledge_to_schema_from_memberships,
+)
 from polar.pledge.schemas import Pledge as PledgeSchema
 from polar.pledge.service import pledge as pledge_service
 from polar.postgres import AsyncSession, get_db_session
@@ -48,6 +52,7 @@ router = APIRouter(tags=["dashboard", APITag.private])
     "/dashboard/personal",
     response_model=IssueListResponse,
 )
+@query_budget(15)
 async def get_personal_dashboard(
     auth_subject: WebUser,
     q: str | None = Query(default=None),
@@ -78,6 +83,7 @@ async def get_personal_dashboard(
     "/dashboard/organization/{id}",
     response_model=IssueListResponse,
 )
+@query_budget(15)
 async def get_dashboard(
     auth_subject: WebUser,
     id: OrganizationID,
@@ -125,11 +131,7 @@ async def get_dashboard(
         )
 
     # Limit to repositories that the authed subject can read
-    repositories = [
-        r
-        for r in repositories
-        if await authz.can(auth_subject.subject, AccessType.read, r)
-    ]
+    repositories = await authz.filter_readable(auth_subject.subject, repositories)
 
     if not repositories:
         raise HTTPException(
@@ -206,13 +208,16 @@ async def dashboard(
 
     # add pledges to included
     issue_pledges: dict[UUID, list[PledgeSchema]] = {}
+    linked_external_organizations: dict[UUID, ExternalOrganization | None] = {}
     for i in issues:
         for pled in i.pledges:
             # Filter out invalid pledges
             if pled.state not in pledge_statuses:
                 continue
 
-            pledge_schema = await pledge_to_schema(session, user, pled)
+            pledge_schema = pledge_to_schema_from_memberships(
+                user, pled, user_memberships
+            )
 
             # Add user-specific metadata
             pledge_schema.authed_can_admin_sender = (
@@ -221,9 +226,13 @@ async def dashboard(
                 )
             )
 
-            external_organization = await external_organization_service.get_linked(
-                session, i.organization_id
-            )
+            if i.organization_id not in linked_external_organizations:
+                linked_external_organizations[
+                    i.organization_id
+                ] = await external_organization_service.get_linked(
+                    session, i.organization_id
+                )
+            external_organization = linked_external_organizations[i.organization_id]
             pledge_schema.authed_can_admin_received = (
                 external_organization is not None
                 and any(
@@ -249,14 +258,17 @@ async def dashboard(
     issue_rewards: dict[UUID, list[Reward]] = {}
     if for_org:
         rewards = await reward_service.list(session, issue_ids=[i.id for i in issues])
-        for pledge, reward, transaction in rewards:
+        can_write_pledges = await authz.can_many(
+            user, AccessType.write, [pledge for pledge, _, _ in rewards]
+        )
+        for (pledge, reward, transaction), can_write_pledge in zip(
+            rewards, can_write_pledges
+        ):
             reward_resource = to_resource(
                 pledge,
                 reward,
                 transaction,
-                include_receiver_admin_fields=await authz.can(
-                    user, AccessType.write, pledge
-                ),
+                include_receiver_admin_fields=can_write_pledge,
             )
 
             ir2 = issue_rewards.get(pledge.issue_id, [])
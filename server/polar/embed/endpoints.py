@@ -2,6 +2,7 @@ from fastapi import Depends, Request
 from pydantic import UUID4
 
 from polar.exceptions import ResourceNotFound, ResourceNotModified
+from polar.kit.rate_limit import RateLimit, RateLimiter, get_auth_subject_key
 from polar.openapi import APITag
 from polar.postgres import AsyncSession, get_db_session
 from polar.product.schemas import ProductID
@@ -11,7 +12,22 @@ from polar.routing import APIRouter
 from . import auth
 from .schemas import ProductEmbed
 
-router = APIRouter(prefix="/embed", tags=["embeds", APITag.private])
+
+async def _get_rate_limit_key(request: Request, auth_subject: auth.EmbedsRead) -> str:
+    return await get_auth_subject_key(request, auth_subject)
+
+
+router = APIRouter(
+    prefix="/embed",
+    tags=["embeds", APITag.private],
+    dependencies=[
+        Depends(
+            RateLimiter(
+                "embed", RateLimit(limit=300, period=60), key=_get_rate_limit_key
+            )
+        )
+    ],
+)
 
 
 @router.get("/product/{id}", summary="Product Embed")
@@ -0,0 +1,30 @@
+from typing import Annotated
+
+from fastapi import Depends
+
+from polar.auth.dependencies import Authenticator
+from polar.auth.models import AuthSubject, Organization, User
+from polar.auth.scope import Scope
+
+from .schemas import ExportType
+
+EXPORT_TYPE_SCOPES: dict[ExportType, set[Scope]] = {
+    ExportType.subscriptions: {
+        Scope.web_default,
+        Scope.subscriptions_read,
+        Scope.subscriptions_write,
+    },
+    ExportType.payout_transactions: {Scope.web_default},
+    ExportType.articles: {Scope.web_default, Scope.articles_write},
+}
+"""
+Scopes allowing to read an export, by type.
+
+They match the scopes required to create the export.
+"""
+
+_ExportsRead = Authenticator(
+    required_scopes=set().union(*EXPORT_TYPE_SCOPES.values()),
+    allowed_subjects={User, Organization},
+)
+ExportsRead = Annotated[AuthSubject[User | Organization], Depends(_ExportsRead)]
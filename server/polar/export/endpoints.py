@@ -0,0 +1,41 @@
+from fastapi import Depends
+
+from polar.exceptions import ResourceNotFound
+from polar.openapi import APITag
+from polar.redis import Redis, get_redis
+from polar.routing import APIRouter
+
+from . import auth
+from .schemas import Export, ExportID
+from .service import export as export_service
+
+router = APIRouter(prefix="/exports", tags=["exports", APITag.documented])
+
+ExportNotFound = {
+    "description": "Export not found.",
+    "model": ResourceNotFound.schema(),
+}
+
+
+@router.get(
+    "/{id}",
+    summary="Get Export",
+    response_model=Export,
+    responses={404: ExportNotFound},
+)
+async def get(
+    id: ExportID,
+    auth_subject: auth.ExportsRead,
+    redis: Redis = Depends(get_redis),
+) -> Export:
+    """
+    Get an export by ID.
+
+    Poll this endpoint until the export succeeds to get its download URL.
+    """
+    job = await export_service.get(redis, auth_subject, id)
+
+    if job is None:
+        raise ResourceNotFound()
+
+    return export_service.to_schema(job)
@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime
+from enum import StrEnum
+from typing import Annotated, Literal
+
+from fastapi import Path
+from pydantic import UUID4, BaseModel, Field
+
+from polar.kit.schemas import Schema
+
+ExportID = Annotated[UUID4, Path(description="The export ID.")]
+
+
+class ExportType(StrEnum):
+    subscriptions = "subscriptions"
+    payout_transactions = "payout_transactions"
+    articles = "articles"
+
+
+class ExportStatus(StrEnum):
+    pending = "pending"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class SubscriptionsExportParameters(BaseModel):
+    type: Literal[ExportType.subscriptions] = ExportType.subscriptions
+    organization_id: list[uuid.UUID] | None = None
+
+
+class PayoutTransactionsExportParameters(BaseModel):
+    type: Literal[ExportType.payout_transactions] = ExportType.payout_transactions
+    payout_id: uuid.UUID
+
+
+class ArticlesExportParameters(BaseModel):
+    type: Literal[ExportType.articles] = ExportType.articles
+    organization_id: uuid.UUID
+
+
+ExportParameters = Annotated[
+    SubscriptionsExportParameters
+    | PayoutTransactionsExportParameters
+    | ArticlesExportParameters,
+    Field(discriminator="type"),
+]
+
+
+class Export(Schema):
+    """
+    An export job.
+
+    The file is generated in the background.
+    Once `status` is `succeeded`, it can be downloaded from `url`.
+    """
+
+    id: UUID4 = Field(description="The ID of the export.")
+    type: ExportType = Field(description="The type of the export.")
+    status: ExportStatus = Field(description="The status of the export.")
+    filename: str = Field(description="The name of the generated file.")
+    url: str | None = Field(
+        description=(
+            "A temporary URL to download the file. "
+            "Only set when the export succeeded."
+        )
+    )
+    expires_at: datetime | None = Field(
+        description="When the download URL expires. Only set when the export succeeded."
+    )
@@ -0,0 +1,309 @@
+import functools
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from typing import Literal
+
+import structlog
+from anyio import to_thread
+from pydantic import BaseModel
+
+from polar.account.service import account as account_service
+from polar.article.service import article_service
+from polar.auth.models import (
+    AuthMethod,
+    AuthSubject,
+    Organization,
+    User,
+    is_organization,
+    is_user,
+)
+from polar.auth.scope import Scope
+from polar.authz.service import Authz
+from polar.config import settings
+from polar.eventstream.service import publish as eventstream_publish
+from polar.exceptions import PolarError
+from polar.integrations.aws.s3 import S3Service
+from polar.kit.csv import stream_csv
+from polar.kit.db.postgres import AsyncSession, AsyncSessionMaker
+from polar.kit.utils import generate_uuid
+from polar.logging import Logger
+from polar.organization.service import organization as organization_service
+from polar.redis import Redis
+from polar.subscription.service import SUBSCRIPTIONS_CSV_HEADER
+from polar.subscription.service import subscription as subscription_service
+from polar.transaction.service.payout import PAYOUT_CSV_HEADER
+from polar.transaction.service.payout import (
+    payout_transaction as payout_transaction_service,
+)
+from polar.user.service.user import user as user_service
+from polar.worker import enqueue_job
+
+from .auth import EXPORT_TYPE_SCOPES
+from .schemas import (
+    ArticlesExportParameters,
+    ExportParameters,
+    ExportStatus,
+    ExportType,
+    PayoutTransactionsExportParameters,
+    SubscriptionsExportParameters,
+)
+from .schemas import Export as ExportSchema
+
+log: Logger = structlog.get_logger()
+
+EXPORT_TTL = timedelta(days=1)
+"""
+How long the state of an export job is kept.
+
+Past this delay, the job is forgotten and the file can't be downloaded anymore
+through the API.
+"""
+
+
+class ExportError(PolarError): ...
+
+
+class ExportDoesNotExist(ExportError):
+    def __init__(self, export_id: uuid.UUID) -> None:
+        self.export_id = export_id
+        message = f"The export with id {export_id} does not exist."
+        super().__init__(message)
+
+
+class ExportSubjectDoesNotExist(ExportError):
+    def __init__(self, export_id: uuid.UUID, subject_id: uuid.UUID) -> None:
+        self.export_id = export_id
+        self.subject_id = subject_id
+        message = (
+            f"The subject {subject_id} who requested the export {export_id} "
+            "does not exist anymore."
+        )
+        super().__init__(message)
+
+
+class ExportJob(BaseModel):
+    """State of an export job, stored in Redis."""
+
+    id: uuid.UUID
+    status: ExportStatus
+    filename: str
+    mime_type: str
+    subject_type: Literal["user", "organization"]
+    subject_id: uuid.UUID
+    scopes: set[Scope]
+    method: AuthMethod
+    parameters: ExportParameters
+    path: str | None = None
+
+    @property
+    def type(self) -> ExportType:
+        return self.parameters.type
+
+
+def _get_key(id: uuid.UUID) -> str:
+    return f"export:{id}"
+
+
+def _get_s3_service() -> S3Service:
+    return S3Service(
+        bucket=settings.S3_FILES_BUCKET_NAME,
+        presign_ttl=settings.S3_FILES_PRESIGN_TTL,
+    )
+
+
+class ExportService:
+    async def create(
+        self,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        parameters: ExportParameters,
+        *,
+        filename: str,
+        mime_type: str,
+    ) -> ExportJob:
+        """
+        Create an export job and enqueue its generation in the worker.
+
+        The caller is responsible for checking that the subject
+        has access to the exported data.
+        """
+        job = ExportJob(
+            id=generate_uuid(),
+            status=ExportStatus.pending,
+            filename=filename,
+            mime_type=mime_type,
+            subject_type="user" if is_user(auth_subject) else "organization",
+            subject_id=auth_subject.subject.id,
+            scopes=auth_subject.scopes,
+            method=auth_subject.method,
+            parameters=parameters,
+        )
+        await self._save(redis, job)
+
+        enqueue_job("export.run", export_id=job.id)
+
+        return job
+
+    async def get(
+        self,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        id: uuid.UUID,
+    ) -> ExportJob | None:
+        job = await self._get(redis, id)
+        if job is None:
+            return None
+
+        if job.subject_id != auth_subject.subject.id:
+            return None
+        if is_user(auth_subject) and job.subject_type != "user":
+            return None
+        if is_organization(auth_subject) and job.subject_type != "organization":
+            return None
+        if not auth_subject.scopes & EXPORT_TYPE_SCOPES[job.type]:
+            return None
+
+        return job
+
+    def to_schema(self, job: ExportJob) -> ExportSchema:
+        url, expires_at = None, None
+        if job.status == ExportStatus.succeeded and job.path is not None:
+            url, expires_at = _get_s3_service().generate_presigned_download_url(
+                path=job.path, filename=job.filename, mime_type=job.mime_type
+            )
+        return ExportSchema(
+            id=job.id,
+            type=job.type,
+            status=job.status,
+            filename=job.filename,
+            url=url,
+            expires_at=expires_at,
+        )
+
+    async def run(
+        self,
+        session: AsyncSession,
+        sessionmaker: AsyncSessionMaker,
+        redis: Redis,
+        id: uuid.UUID,
+    ) -> ExportJob:
+        """
+        Generate the file of an export job and upload it to S3.
+
+        The subject is notified through the eventstream once the file is ready,
+        with the export and its download URL.
+        """
+        job = await self._get(redis, id)
+        if job is None:
+            raise ExportDoesNotExist(id)
+
+        auth_subject = await self._get_auth_subject(session, job)
+
+        path = f"exports/{job.subject_id}/{job.id}/{job.filename}"
+        local_path: str | None = None
+        try:
+            local_path = await self._generate(
+                session, sessionmaker, auth_subject, job.parameters
+            )
+            with open(local_path, "rb") as file:
+                # boto3 uploads are blocking: don't stall the other jobs of the worker
+                await to_thread.run_sync(
+                    functools.partial(
+                        _get_s3_service().upload,
+                        file,
+                        path=path,
+                        mime_type=job.mime_type,
+                    )
+                )
+        except Exception:
+            log.exception("export.failed", export_id=job.id, type=job.type)
+            job.status = ExportStatus.failed
+            await self._save(redis, job)
+            raise
+        finally:
+            if local_path is not None:
+                os.remove(local_path)
+
+        job.status = ExportStatus.succeeded
+        job.path = path
+        await self._save(redis, job)
+
+        await eventstream_publish(
+            "export.completed",
+            self.to_schema(job).model_dump(mode="json"),
+            user_id=job.subject_id if job.subject_type == "user" else None,
+            organization_id=(
+                job.subject_id if job.subject_type == "organization" else None
+            ),
+            run_in_worker=False,
+            redis=redis,
+        )
+
+        return job
+
+    async def _generate(
+        self,
+        session: AsyncSession,
+        sessionmaker: AsyncSessionMaker,
+        auth_subject: AuthSubject[User | Organization],
+        parameters: ExportParameters,
+    ) -> str:
+        """Generate the export into a local temporary file and return its path."""
+        if isinstance(parameters, ArticlesExportParameters):
+            return await article_service.export(
+                session, parameters.organization_id, auth_subject, Authz(session)
+            )
+
+        header: tuple[str, ...]
+        if isinstance(parameters, SubscriptionsExportParameters):
+            header = SUBSCRIPTIONS_CSV_HEADER
+            rows = subscription_service.stream_export_csv_rows(
+                sessionmaker, auth_subject, organization_id=parameters.organization_id
+            )
+        elif isinstance(parameters, PayoutTransactionsExportParameters):
+            payout = await payout_transaction_service.get(session, parameters.payout_id)
+            assert payout is not None
+            assert payout.account_id is not None
+            account = await account_service.get(session, payout.account_id)
+            assert account is not None
+            header = PAYOUT_CSV_HEADER
+            rows = payout_transaction_service.get_payout_csv_rows(
+                sessionmaker, account=account, payout=payout
+            )
+
+        file = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            with file:
+                async for chunk in stream_csv(rows, header=header):
+                    file.write(chunk)
+        # The caller only gets the path on success: clean up ourselves
+        except BaseException:
+            os.remove(file.name)
+            raise
+        return file.name
+
+    async def _get_auth_subject(
+        self, session: AsyncSession, job: ExportJob
+    ) -> AuthSubject[User | Organization]:
+        subject: User | Organization | None
+        if job.subject_type == "user":
+            subject = await user_service.get(session, job.subject_id)
+        else:
+            subject = await organization_service.get(session, job.subject_id)
+        if subject is None:
+            raise ExportSubjectDoesNotExist(job.id, job.subject_id)
+        return AuthSubject(subject, job.scopes, job.method)
+
+    async def _get(self, redis: Redis, id: uuid.UUID) -> ExportJob | None:
+        value = await redis.get(_get_key(id))
+        if value is None:
+            return None
+        return ExportJob.model_validate_json(value)
+
+    async def _save(self, redis: Redis, job: ExportJob) -> None:
+        await redis.setex(_get_key(job.id), EXPORT_TTL, job.model_dump_json())
+
+
+export = ExportService()
@@ -0,0 +1,26 @@
+import uuid
+
+from polar.worker import (
+    AsyncReadSessionMaker,
+    JobContext,
+    PolarWorkerContext,
+    get_worker_read_sessionmaker,
+    get_worker_redis,
+    task,
+)
+
+from .service import export as export_service
+
+
+@task("export.run")
+async def export_run(
+    ctx: JobContext, export_id: uuid.UUID, polar_context: PolarWorkerContext
+) -> None:
+    # Exports only read data, so they can run on the read replica
+    async with AsyncReadSessionMaker(ctx) as session:
+        await export_service.run(
+            session,
+            await get_worker_read_sessionmaker(ctx),
+            get_worker_redis(ctx),
+            export_id,
+        )
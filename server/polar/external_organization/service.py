@@ -7,6 +7,7 @@ from sqlalchemy.orm import joinedload
 
 from polar.auth.models import Anonymous, AuthSubject, is_organization
 from polar.enums import Platforms
+from polar.kit.loader import get_session_loader
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
@@ -69,19 +70,29 @@ class ExternalOrganizationService(ResourceServiceReader[ExternalOrganization]):
     async def get_linked(
         self, session: AsyncSession, id: uuid.UUID
     ) -> ExternalOrganization | None:
-        """Get an ExternalOrganization by ID that is linked to an Organization."""
-        statement = (
-            select(ExternalOrganization)
-            .where(
-                ExternalOrganization.id == id,
-                ExternalOrganization.deleted_at.is_(None),
-                ExternalOrganization.organization_id.isnot(None),
+        """
+        Get an ExternalOrganization by ID that is linked to an Organization.
+
+        Concurrent lookups are batched into a single query.
+        """
+
+        async def _load(
+            ids: Sequence[uuid.UUID],
+        ) -> dict[uuid.UUID, ExternalOrganization]:
+            statement = (
+                select(ExternalOrganization)
+                .where(
+                    ExternalOrganization.id.in_(ids),
+                    ExternalOrganization.deleted_at.is_(None),
+                    ExternalOrganization.organization_id.isnot(None),
+                )
+                .options(joinedload(ExternalOrganization.organization))
             )
-            .options(joinedload(ExternalOrganization.organization))
-        )
+            result = await session.execute(statement)
+            return {o.id: o for o in result.scalars().all()}
 
-        result = await session.execute(statement)
-        return result.scalar_one_or_none()
+        loader = get_session_loader(session, (ExternalOrganization, "linked"), _load)
+        return await loader.load(id)
 
     def _get_readable_external_organization_statement(
         self, auth_subject: AuthSubject[Anonymous | User | Organization]
@@ -120,9 +120,8 @@ class FundingService:
         inner_statement = inner_statement.order_by(*order_by_clauses)
 
         # paginate on inner query (issue listing)
-        page, limit = pagination
-        offset = limit * (page - 1)
-        inner_statement = inner_statement.offset(offset).limit(limit)
+        offset = pagination.limit * (pagination.page - 1)
+        inner_statement = inner_statement.offset(offset).limit(pagination.limit)
 
         # Given a list of issues, join in the pledges
         outer_statement = self._apply_pledges_summary_statement(
@@ -1,6 +1,6 @@
 import base64
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, cast
+from typing import IO, TYPE_CHECKING, Any, cast
 
 import botocore
 import structlog
@@ -176,6 +176,11 @@ class S3Service:
         file = S3File.from_head(data.path, head)
         return file
 
+    def upload(self, data: IO[bytes], *, path: str, mime_type: str) -> None:
+        self.client.upload_fileobj(
+            data, self.bucket, path, ExtraArgs={"ContentType": mime_type}
+        )
+
     def generate_presigned_download_url(
         self,
         *,
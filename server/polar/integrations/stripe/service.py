@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from collections.abc import AsyncIterator
 from typing import Literal, Unpack, cast
@@ -13,7 +14,7 @@ from polar.kit.utils import utc_now
 from polar.logfire import instrument_httpx
 from polar.models.organization import Organization
 from polar.models.user import User
-from polar.postgres import AsyncSession, sql
+from polar.postgres import AsyncSession, release_connection, sql
 
 stripe_lib.api_key = settings.STRIPE_SECRET_KEY
 
@@ -278,6 +279,7 @@ class StripeService:
         if not customer:
             return []
 
+        await release_connection(session)
         payment_methods = await stripe_lib.PaymentMethod.list_async(
             customer=customer.id,
             type="card",
@@ -297,6 +299,7 @@ class StripeService:
         if not customer:
             return None
 
+        await release_connection(session)
         return await stripe_lib.billing_portal.Session.create_async(
             customer=customer.id,
             return_url=f"{settings.FRONTEND_BASE_URL}/settings",
@@ -311,6 +314,7 @@ class StripeService:
         if not customer:
             return None
 
+        await release_connection(session)
         return await stripe_lib.billing_portal.Session.create_async(
             customer=customer.id,
             return_url=f"{settings.FRONTEND_BASE_URL}/team/{org.slug}/settings",
@@ -561,11 +565,13 @@ class StripeService:
         tax_id: stripe_lib.Customer.CreateParamsTaxIdDatum | None = None,
         **params: Unpack[stripe_lib.Customer.ModifyParams],
     ) -> stripe_lib.Customer:
-        if tax_id is not None:
-            await stripe_lib.Customer.create_tax_id_async(id, **tax_id)
-
-        customer = await stripe_lib.Customer.modify_async(id, **params)
+        if tax_id is None:
+            return await stripe_lib.Customer.modify_async(id, **params)
 
+        _, customer = await asyncio.gather(
+            stripe_lib.Customer.create_tax_id_async(id, **tax_id),
+            stripe_lib.Customer.modify_async(id, **params),
+        )
         return customer
 
     async def create_customer_session(
@@ -1,8 +1,12 @@
-import collections
 import csv
-from collections.abc import Iterable
+import io
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
 from typing import TYPE_CHECKING, Any, BinaryIO
 
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
 if TYPE_CHECKING:
     import _csv
 
@@ -41,49 +45,98 @@ def get_emails_from_csv(lines: Iterable[str]) -> set[str]:
     return emails
 
 
-class IterableCSVWriter:
-    """
-    Utility class wrapping the built-in csv.writer allowing
-    to generate CSV rows as strings.
+CSV_STREAM_CHUNK_SIZE = 1000
+"""Number of rows written in each chunk of a CSV stream."""
+
 
-    It's useful to generate CSV with StreamingResponse, for example.
+async def stream_csv(
+    rows: AsyncIterable[Iterable[Any]],
+    *,
+    header: Iterable[str] | None = None,
+    chunk_size: int = CSV_STREAM_CHUNK_SIZE,
+    compress: bool = False,
+    dialect: "_csv._DialectLike" = "excel",
+) -> AsyncIterator[bytes]:
+    """
+    Generate a CSV file from an async iterable of rows, as encoded chunks.
+
+    Rows are buffered and flushed every `chunk_size` rows, so memory usage
+    only depends on the chunk size, not on the number of rows.
+    Combined with a server-side cursor to fetch the rows,
+    exports run in constant memory.
+
+    Args:
+        rows: The rows to write.
+        header: Optional header row.
+        chunk_size: Number of rows to write in each chunk.
+        compress: Whether to gzip the output.
+        dialect: The CSV dialect.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, dialect=dialect)
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def _flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        if compressor is not None:
+            return compressor.compress(data)
+        return data
+
+    if header is not None:
+        writer.writerow(header)
+
+    buffered_rows = 0
+    async for row in rows:
+        writer.writerow(row)
+        buffered_rows += 1
+        if buffered_rows == chunk_size:
+            buffered_rows = 0
+            if chunk := _flush():
+                yield chunk
+
+    chunk = _flush()
+    if compressor is not None:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def accepts_gzip(request: Request) -> bool:
+    accept_encoding = request.headers.get("accept-encoding", "")
+    encodings = {
+        encoding.split(";")[0].strip().lower()
+        for encoding in accept_encoding.split(",")
+    }
+    return "gzip" in encodings
+
+
+class CSVStreamingResponse(StreamingResponse):
     """
+    Stream a CSV file as an attachment.
 
-    writer: "_csv._writer"
+    The content is gzip-compressed if `compress` is set,
+    typically when the client accepts it. Since the encoding is negotiated,
+    the response always varies on `Accept-Encoding`.
+    """
 
     def __init__(
         self,
-        dialect: "_csv._DialectLike" = "excel",
+        rows: AsyncIterable[Iterable[Any]],
         *,
-        delimiter: str = ",",
-        quotechar: str | None = '"',
-        escapechar: str | None = None,
-        doublequote: bool = True,
-        skipinitialspace: bool = False,
-        lineterminator: str = "\r\n",
-        quoting: "_csv._QuotingType" = 0,
-        strict: bool = False,
+        filename: str,
+        header: Iterable[str] | None = None,
+        compress: bool = False,
     ) -> None:
-        self._lines: collections.deque[str] = collections.deque()
-        self.writer = csv.writer(
-            self,
-            dialect=dialect,
-            delimiter=delimiter,
-            quotechar=quotechar,
-            escapechar=escapechar,
-            doublequote=doublequote,
-            skipinitialspace=skipinitialspace,
-            lineterminator=lineterminator,
-            quoting=quoting,
-            strict=strict,
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Vary": "Accept-Encoding",
+        }
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+        super().__init__(
+            stream_csv(rows, header=header, compress=compress),
+            media_type="text/csv",
+            headers=headers,
         )
-
-    def getrow(self, row: Iterable[Any]) -> str:
-        self.writer.writerow(row)
-        return self.read()
-
-    def write(self, line: str) -> None:
-        self._lines.append(line)
-
-    def read(self) -> str:
-        return self._lines.popleft()
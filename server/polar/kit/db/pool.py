@@ -0,0 +1,69 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+WaitTimeListener = Callable[[float], None]
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool keeping track of how long checkouts wait for a connection.
+
+    It's a drop-in replacement for the default pool of async engines.
+    Listeners added to `wait_time_listeners` are called with the wait time
+    of every checkout, in seconds.
+    """
+
+    def __init__(
+        self, *args: Any, wait_time_smoothing: float = 0.2, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_time_smoothing = wait_time_smoothing
+        self.wait_time_listeners: list[WaitTimeListener] = []
+        self.average_wait_time = 0.0
+        self.waiting = 0
+
+    def recreate(self) -> "InstrumentedAsyncAdaptedQueuePool":
+        pool = super().recreate()
+        assert isinstance(pool, InstrumentedAsyncAdaptedQueuePool)
+        pool.wait_time_smoothing = self.wait_time_smoothing
+        pool.wait_time_listeners = self.wait_time_listeners
+        return pool
+
+    @property
+    def capacity(self) -> int:
+        return self.size() + max(self._max_overflow, 0)
+
+    def is_saturated(self) -> bool:
+        """Whether a new checkout would have to wait for a connection."""
+        return self.checkedout() >= self.capacity
+
+    def get_expected_wait_time(self) -> float:
+        """
+        Estimate how long a new checkout would wait for a connection, in seconds.
+
+        Zero if a connection is available. Otherwise, the recent average wait time,
+        scaled by the number of checkouts already waiting in front of it.
+        """
+        if not self.is_saturated():
+            return 0.0
+        return self.average_wait_time * (1 + self.waiting / max(self.capacity, 1))
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+            self._record_wait_time(time.perf_counter() - start)
+
+    def _record_wait_time(self, wait_time: float) -> None:
+        # Exponentially weighted moving average, to favor recent checkouts
+        self.average_wait_time += self.wait_time_smoothing * (
+            wait_time - self.average_wait_time
+        )
+        for listener in self.wait_time_listeners:
+            listener(wait_time)
@@ -1,6 +1,8 @@
+import time
 from typing import TypeAlias
 
-from sqlalchemy import Engine
+import structlog
+from sqlalchemy import Connection, Engine, Select, event, text
 from sqlalchemy import create_engine as _create_engine
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -10,9 +12,12 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.ext.asyncio import (
     create_async_engine as _create_async_engine,
 )
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session, SessionTransaction, sessionmaker
 
 from ..extensions.sqlalchemy import sql
+from .pool import InstrumentedAsyncAdaptedQueuePool
+
+log = structlog.get_logger()
 
 
 def create_async_engine(
@@ -31,6 +36,7 @@ def create_async_engine(
         else {},
         pool_size=pool_size,
         pool_recycle=pool_recycle,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
     )
 
 
@@ -65,6 +71,162 @@ def create_sync_sessionmaker(engine: Engine) -> sessionmaker[Session]:
     return sessionmaker(engine, expire_on_commit=False)
 
 
+_HAS_WRITES_KEY = "polar_has_writes"
+_CONNECTION_INFO_KEY = "polar_connection_info"
+
+
+@event.listens_for(Engine, "before_execute")
+def _track_executed_writes(
+    conn: Connection,
+    clauseelement: object,
+    multiparams: object,
+    params: object,
+    execution_options: object,
+) -> None:
+    # Be conservative: anything which is not a SELECT, like raw SQL, is a write.
+    # Flushes are tracked here as well, since they go through the connection.
+    # Locking reads count too: their locks last until the end of the transaction.
+    if (
+        not isinstance(clauseelement, Select)
+        or clauseelement._for_update_arg is not None
+    ):
+        conn.info[_HAS_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_begin")
+def _track_connection(
+    session: Session, transaction: SessionTransaction, connection: Connection
+) -> None:
+    # Writes are tracked on the connection rather than with `do_orm_execute`:
+    # listening to it breaks `yield_per` queries having selectin loaders.
+    connection.info.pop(_HAS_WRITES_KEY, None)
+    session.info[_CONNECTION_INFO_KEY] = connection.info
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset_writes(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_CONNECTION_INFO_KEY, None)
+
+
+def _has_writes(session: AsyncSession) -> bool:
+    connection_info = session.info.get(_CONNECTION_INFO_KEY)
+    return connection_info is not None and connection_info.get(_HAS_WRITES_KEY, False)
+
+
+async def release_connection(session: AsyncSession) -> bool:
+    """
+    Return the connection held by the session to the pool, if it's safe to do so.
+
+    Sessions acquire a connection lazily, on their first query, and hold it
+    until the end of the transaction. Call this before a long external call,
+    like Stripe or S3, so the connection doesn't sit idle in the meantime.
+    The next query will transparently acquire a new one.
+
+    It's only safe if the transaction didn't write nor lock anything, so we can
+    end it early without changing its outcome. Otherwise, the connection is kept.
+
+    Returns:
+        Whether the session doesn't hold a connection anymore.
+    """
+    if not session.in_transaction():
+        return True
+
+    # The session doesn't own its connection, e.g. in tests
+    if not isinstance(session.bind, AsyncEngine):
+        return False
+
+    if (
+        _has_writes(session)
+        or session.new
+        or session.dirty
+        or session.deleted
+        # Ending the transaction would expire the loaded objects
+        or session.sync_session.expire_on_commit
+    ):
+        return False
+
+    await session.commit()
+    return True
+
+
+REPLICATION_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+async def get_replication_lag(sessionmaker: AsyncSessionMaker) -> float:
+    """
+    Return how many seconds a replica is behind its primary.
+
+    A replica which replayed everything it received is considered up-to-date,
+    even if the primary didn't write anything for a while.
+    Returns 0 when run against a primary.
+    """
+    async with sessionmaker() as session:
+        result = await session.execute(REPLICATION_LAG_QUERY)
+        lag = result.scalar_one()
+        return float(lag) if lag is not None else 0.0
+
+
+class ReadReplica:
+    """
+    Route read-only sessions to a replica, with a fallback to the primary.
+
+    The replication lag is checked at most every `lag_check_interval` seconds.
+    If it exceeds `max_lag`, or the replica can't be reached,
+    read-only sessions are opened on the primary instead.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncSessionMaker,
+        replica: AsyncSessionMaker | None,
+        *,
+        max_lag: float,
+        lag_check_interval: float,
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self._is_healthy = True
+        self._checked_at: float | None = None
+
+    async def get_sessionmaker(self) -> AsyncSessionMaker:
+        if self.replica is None:
+            return self.primary
+
+        now = time.monotonic()
+        if (
+            self._checked_at is None
+            or now - self._checked_at >= self.lag_check_interval
+        ):
+            self._checked_at = now
+            self._is_healthy = await self._check_health(self.replica)
+
+        return self.replica if self._is_healthy else self.primary
+
+    async def _check_health(self, replica: AsyncSessionMaker) -> bool:
+        try:
+            lag = await get_replication_lag(replica)
+        except Exception as e:
+            log.warning("postgres.read_replica.unreachable", error=str(e))
+            return False
+
+        if lag > self.max_lag:
+            log.warning("postgres.read_replica.lagging", lag=lag, max_lag=self.max_lag)
+            return False
+
+        return True
+
+
 __all__ = [
     "AsyncSession",
     "AsyncEngine",
@@ -76,5 +238,8 @@ __all__ = [
     "create_sync_engine",
     "create_async_sessionmaker",
     "create_sync_sessionmaker",
+    "get_replication_lag",
+    "release_connection",
+    "ReadReplica",
     "sql",
 ]
@@ -0,0 +1,142 @@
+"""
+Request-scoped SQL instrumentation.
+
+Every statement executed while `record_query_stats` is active is counted and timed,
+whatever the engine or session it goes through. Endpoints can declare
+the maximum number of statements they should need with the `query_budget` decorator.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from typing import Any, TypeVar
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.engine.interfaces import DBAPICursor, ExecutionContext
+
+N_PLUS_ONE_THRESHOLD = 5
+"""Number of executions of the same statement from which we flag a N+1 pattern."""
+
+_QUERY_BUDGET_ATTRIBUTE = "__query_budget__"
+_START_TIMES_KEY = "polar_query_start_times"
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, route: str, count: int, budget: int) -> None:
+        self.route = route
+        self.count = count
+        self.budget = budget
+        super().__init__(
+            f"{route} executed {count} SQL statements, "
+            f"but its query budget is {budget}."
+        )
+
+
+@dataclasses.dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    statements: Counter[str] = dataclasses.field(default_factory=Counter)
+
+    def get_repeated_statements(
+        self, threshold: int = N_PLUS_ONE_THRESHOLD
+    ) -> list[tuple[str, int]]:
+        """
+        Return the statements executed at least `threshold` times,
+        which usually denotes a N+1 pattern.
+        """
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+_query_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar(
+    "polar_query_stats", default=None
+)
+
+
+@contextlib.contextmanager
+def record_query_stats() -> Iterator[QueryStats]:
+    """Count and time the SQL statements executed in this context."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: DBAPICursor,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    if _query_stats.get() is not None:
+        conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: DBAPICursor,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    stats = _query_stats.get()
+    start_times: list[float] | None = conn.info.get(_START_TIMES_KEY)
+    if stats is None or not start_times:
+        return
+
+    stats.count += 1
+    stats.duration += time.perf_counter() - start_times.pop()
+    stats.statements[statement] += 1
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def query_budget(max_queries: int) -> Callable[[F], F]:
+    """
+    Declare the maximum number of SQL statements an endpoint should execute.
+
+    Going over it fails the request in tests, and is logged otherwise.
+
+    Example:
+
+    ```py
+    @router.get("/")
+    @query_budget(10)
+    async def list(...): ...
+    ```
+    """
+
+    def decorator(endpoint: F) -> F:
+        setattr(endpoint, _QUERY_BUDGET_ATTRIBUTE, max_queries)
+        return endpoint
+
+    return decorator
+
+
+def get_query_budget(endpoint: Callable[..., Any] | None) -> int | None:
+    return getattr(endpoint, _QUERY_BUDGET_ATTRIBUTE, None)
+
+
+__all__ = [
+    "N_PLUS_ONE_THRESHOLD",
+    "QueryBudgetExceeded",
+    "QueryStats",
+    "get_query_budget",
+    "query_budget",
+    "record_query_stats",
+]
@@ -0,0 +1,186 @@
+"""
+Bulk upserts for large sets of rows.
+
+Small sets are upserted with chunked `INSERT ... VALUES ... ON CONFLICT` statements,
+keeping each of them under the PostgreSQL parameters limit.
+
+Very large sets are staged through `COPY` into a temporary table, and then upserted
+with a single `INSERT ... SELECT ... ON CONFLICT` statement. It avoids building
+and planning giant statements.
+"""
+
+from collections.abc import Iterable, Sequence
+from typing import Any, TypeVar
+
+from sqlalchemy import Table, column, table, text
+from sqlalchemy.orm import InstrumentedAttribute
+
+from polar.kit.utils import generate_uuid
+
+from .postgres import AsyncSession, sql
+
+M = TypeVar("M")
+
+UPSERT_CHUNK_SIZE = 1000
+"""Maximum number of rows per `INSERT ... VALUES` statement."""
+
+UPSERT_COPY_THRESHOLD = 10_000
+"""Number of rows from which we stage them through `COPY`."""
+
+POSTGRES_MAX_PARAMETERS = 32767
+
+
+async def upsert_many(
+    session: AsyncSession,
+    model: type[M],
+    values: Sequence[dict[str, Any]],
+    *,
+    index_elements: Sequence[InstrumentedAttribute[Any]],
+    mutable_keys: Iterable[str],
+    returning: bool = True,
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+    copy_threshold: int | None = UPSERT_COPY_THRESHOLD,
+) -> Sequence[M]:
+    """
+    Insert rows, or update their `mutable_keys` if they conflict on `index_elements`.
+
+    Args:
+        session: The database session.
+        model: The model to upsert.
+        values: The rows to upsert. They should all have the same keys.
+        index_elements: The columns of the unique constraint to resolve conflicts.
+        mutable_keys: The columns to update on conflict.
+        returning: Whether to return the upserted objects.
+        If `False`, an empty list is returned.
+        chunk_size: Maximum number of rows per `INSERT ... VALUES` statement.
+        copy_threshold: Number of rows from which we stage them through `COPY`.
+        Set it to `None` to never use `COPY`.
+
+    Returns:
+        The upserted objects, if `returning` is `True`.
+    """
+    if not values:
+        return []
+
+    mutable_keys = set(mutable_keys)
+
+    if copy_threshold is not None and len(values) >= copy_threshold:
+        return await _upsert_many_copy(
+            session,
+            model,
+            values,
+            index_elements=index_elements,
+            mutable_keys=mutable_keys,
+            returning=returning,
+        )
+
+    model_table: Table = model.__table__  # type: ignore[attr-defined]
+    # Python-side defaults are also sent as parameters,
+    # so the number of columns is an upper bound of the parameters per row.
+    chunk_size = max(
+        1, min(chunk_size, POSTGRES_MAX_PARAMETERS // len(model_table.columns))
+    )
+
+    instances: list[M] = []
+    for i in range(0, len(values), chunk_size):
+        insert_statement = sql.insert(model).values(values[i : i + chunk_size])
+        upsert_statement = insert_statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={k: getattr(insert_statement.excluded, k) for k in mutable_keys},
+        )
+        if returning:
+            result = await session.execute(
+                upsert_statement.returning(model).execution_options(
+                    populate_existing=True
+                )
+            )
+            instances.extend(result.scalars().all())
+        else:
+            await session.execute(upsert_statement)
+
+    return instances
+
+
+async def _upsert_many_copy(
+    session: AsyncSession,
+    model: type[M],
+    values: Sequence[dict[str, Any]],
+    *,
+    index_elements: Sequence[InstrumentedAttribute[Any]],
+    mutable_keys: set[str],
+    returning: bool,
+) -> Sequence[M]:
+    model_table: Table = model.__table__  # type: ignore[attr-defined]
+    connection = await session.connection()
+    dialect = connection.dialect
+
+    # Python-side defaults aren't applied by COPY, so we compute them ourselves.
+    keys = list(values[0].keys())
+    default_columns = [
+        c
+        for c in model_table.columns
+        if c.key not in keys
+        and c.default is not None
+        and (c.default.is_scalar or c.default.is_callable)
+    ]
+    columns = [model_table.columns[key] for key in keys] + default_columns
+
+    # COPY bypasses SQLAlchemy, so we need to process the values ourselves,
+    # e.g. to serialize JSONB values.
+    processors = [c.type.dialect_impl(dialect).bind_processor(dialect) for c in columns]
+
+    def _get_record(row: dict[str, Any]) -> tuple[Any, ...]:
+        record: list[Any] = [row[key] for key in keys]
+        for c in default_columns:
+            assert c.default is not None
+            record.append(
+                c.default.arg(None)  # type: ignore[attr-defined]
+                if c.default.is_callable
+                else c.default.arg  # type: ignore[attr-defined]
+            )
+        return tuple(
+            processor(value) if processor is not None else value
+            for processor, value in zip(processors, record)
+        )
+
+    # The temporary table only holds the copied columns, without any constraint.
+    staging_table_name = f"upsert_{model_table.name}_{generate_uuid().hex}"
+    column_names = ", ".join(f'"{c.name}"' for c in columns)
+    await connection.execute(
+        text(
+            f'CREATE TEMPORARY TABLE "{staging_table_name}" ON COMMIT DROP AS '
+            f'SELECT {column_names} FROM "{model_table.name}" WITH NO DATA'
+        )
+    )
+
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(  # type: ignore[union-attr]
+        staging_table_name,
+        records=(_get_record(row) for row in values),
+        columns=[c.name for c in columns],
+    )
+
+    staging_table = table(staging_table_name, *(column(c.name) for c in columns))
+    insert_statement = sql.insert(model).from_select(
+        [c.key for c in columns], sql.select(*staging_table.columns)
+    )
+    upsert_statement = insert_statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={k: getattr(insert_statement.excluded, k) for k in mutable_keys},
+    )
+
+    instances: Sequence[M] = []
+    if returning:
+        result = await session.execute(
+            upsert_statement.returning(model).execution_options(populate_existing=True)
+        )
+        instances = result.scalars().all()
+    else:
+        await session.execute(upsert_statement)
+
+    # Don't wait for the end of the transaction to free the staging table.
+    # If the upsert failed, the transaction is aborted and can't run it anyway:
+    # the table is dropped with the transaction.
+    await connection.execute(text(f'DROP TABLE IF EXISTS "{staging_table_name}"'))
+
+    return instances
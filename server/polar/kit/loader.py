@@ -0,0 +1,115 @@
+"""
+Batched loading of objects by key.
+
+A `DataLoader` collects the keys requested during the same event loop tick,
+and resolves them all at once with a single batch function call,
+typically a single `IN` query. Callers keep awaiting one key at a time:
+
+```py
+users = await asyncio.gather(*(user_service.get_batched(session, id) for id in ids))
+```
+
+Loaders don't cache results across ticks: lookups done one after the other
+still trigger one query each, so they can't return stale objects after a write.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Mapping, Sequence
+from typing import Any, Generic, TypeVar
+
+from .db.postgres import AsyncSession
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchLoadFn = Callable[[Sequence[K]], Awaitable[Mapping[K, V]]]
+
+LOADER_MAX_BATCH_SIZE = 1000
+
+
+class DataLoader(Generic[K, V]):
+    def __init__(
+        self,
+        batch_load_fn: BatchLoadFn[K, V],
+        *,
+        max_batch_size: int = LOADER_MAX_BATCH_SIZE,
+    ) -> None:
+        """
+        Args:
+            batch_load_fn: Async function taking a list of keys, and returning
+            a mapping of the found values by key. Missing keys resolve to `None`.
+            max_batch_size: Maximum number of keys passed to `batch_load_fn` at once.
+        """
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self._pending: dict[K, asyncio.Future[V | None]] = {}
+        self._dispatch_scheduled = False
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> V | None:
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(key)
+        if future is None:
+            future = loop.create_future()
+            self._pending[key] = future
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        # Don't cancel the future shared with other callers of the same key
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Sequence[K]) -> list[V | None]:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self) -> None:
+        pending = self._pending
+        self._pending = {}
+        self._dispatch_scheduled = False
+
+        task = asyncio.create_task(self._resolve(pending))
+        # Keep a reference to the task, so it's not garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: dict[K, asyncio.Future[V | None]]) -> None:
+        keys = list(pending)
+        for i in range(0, len(keys), self.max_batch_size):
+            batch = keys[i : i + self.max_batch_size]
+            try:
+                values = await self.batch_load_fn(batch)
+            except Exception as e:
+                for key in batch:
+                    if not pending[key].done():
+                        pending[key].set_exception(e)
+                continue
+
+            for key in batch:
+                if not pending[key].done():
+                    pending[key].set_result(values.get(key))
+
+
+_SESSION_LOADERS_KEY = "polar_loaders"
+
+
+def get_session_loader(
+    session: AsyncSession, name: Hashable, batch_load_fn: BatchLoadFn[K, V]
+) -> DataLoader[K, V]:
+    """
+    Return the loader registered under `name` for this session,
+    creating it with `batch_load_fn` if needed.
+
+    Loaders are bound to the session, since their batch function runs queries on it.
+    This makes them request-scoped in endpoints, and task-scoped in workers.
+    """
+    loaders: dict[Hashable, DataLoader[Any, Any]] = session.info.setdefault(
+        _SESSION_LOADERS_KEY, {}
+    )
+    try:
+        return loaders[name]
+    except KeyError:
+        loader = DataLoader(batch_load_fn)
+        loaders[name] = loader
+        return loader
+
+
+__all__ = ["DataLoader", "LOADER_MAX_BATCH_SIZE", "get_session_loader"]
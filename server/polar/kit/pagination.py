@@ -1,15 +1,43 @@
+import base64
+import json
 import math
 from collections.abc import Sequence
-from typing import Annotated, Any, Generic, NamedTuple, Self, TypeVar, overload
+from datetime import date, datetime
+from enum import StrEnum
+from typing import (
+    Annotated,
+    Any,
+    Generic,
+    NamedTuple,
+    Self,
+    TypeVar,
+    cast,
+    overload,
+)
 
 from fastapi import Depends, Query
-from pydantic import BaseModel, GetCoreSchemaHandler
+from pydantic import BaseModel, Field, GetCoreSchemaHandler
 from pydantic._internal._repr import display_as_type
-from pydantic_core import CoreSchema
-from sqlalchemy import Select, func, over
+from pydantic_core import CoreSchema, to_jsonable_python
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    UnaryExpression,
+    and_,
+    asc,
+    desc,
+    func,
+    literal,
+    or_,
+    over,
+    select,
+    tuple_,
+)
+from sqlalchemy.sql import ClauseElement, operators
 from sqlalchemy.sql._typing import _ColumnsClauseArgument
 
 from polar.config import settings
+from polar.exceptions import PolarRequestValidationError
 from polar.kit.db.models import RecordModel
 from polar.kit.db.models.base import Model
 from polar.kit.db.postgres import AsyncSession
@@ -20,9 +48,35 @@ RM = TypeVar("RM", bound=RecordModel)
 M = TypeVar("M", bound=Model)
 
 
+class PaginationCountMode(StrEnum):
+    exact = "exact"
+    capped = "capped"
+    none = "none"
+
+
 class PaginationParams(NamedTuple):
     page: int
     limit: int
+    count_mode: PaginationCountMode = PaginationCountMode.exact
+
+    @property
+    def count_cap(self) -> int:
+        """
+        Number of items after which we stop counting in `capped` mode.
+
+        Never lower than the items up to the current page,
+        so the count stays consistent with what the client has seen.
+        """
+        return max(settings.API_PAGINATION_COUNT_CAP, self.page * self.limit)
+
+    def is_last_page(self, page_count: int) -> bool:
+        """
+        Whether a page of `page_count` items is known to be the last one.
+
+        A partial page is, unless it's empty past the first page:
+        the page may then be beyond the last one.
+        """
+        return page_count < self.limit and (page_count > 0 or self.page == 1)
 
 
 @overload
@@ -62,30 +116,64 @@ async def paginate(
     pagination: PaginationParams,
     count_clause: _ColumnsClauseArgument[Any] | None = None,
 ) -> tuple[Sequence[Any], int]:
-    page, limit = pagination
+    """
+    Paginate a statement using OFFSET and LIMIT.
+
+    Returns the results and the total count of items, depending on the count mode:
+
+    * `exact`: the count is computed over the whole result set.
+    * `capped`: the count stops after `pagination.count_cap` items,
+    so the returned count is `pagination.count_cap + 1` at most.
+    * `none`: the count is not computed: the number of items
+    up to the current page is returned.
+    """
+    page, limit, count_mode = pagination
     offset = limit * (page - 1)
-    statement = statement.offset(offset).limit(limit)
+    paginated_statement = statement.offset(offset).limit(limit)
 
-    if count_clause is not None:
-        statement = statement.add_columns(count_clause)
-    else:
-        statement = statement.add_columns(over(func.count()))
+    if count_mode == PaginationCountMode.exact:
+        if count_clause is not None:
+            paginated_statement = paginated_statement.add_columns(count_clause)
+        else:
+            paginated_statement = paginated_statement.add_columns(over(func.count()))
 
-    result = await session.execute(statement)
+    result = await session.execute(paginated_statement)
 
     results: list[Any] = []
     count = 0
     for row in result.unique().all():
-        (*queried_data, c) = row._tuple()
-        count = int(c)
+        queried_data = row._tuple()
+        if count_mode == PaginationCountMode.exact:
+            (*queried_data, c) = queried_data
+            count = int(c)
         if len(queried_data) == 1:
             results.append(queried_data[0])
         else:
             results.append(queried_data)
 
+    if count_mode == PaginationCountMode.capped:
+        # A partial page tells us the count without having to query it
+        if pagination.is_last_page(len(results)):
+            count = offset + len(results)
+        else:
+            count = await _count_capped(session, statement, pagination.count_cap)
+    elif count_mode == PaginationCountMode.none:
+        count = offset + len(results)
+
     return results, count
 
 
+async def _count_capped(session: AsyncSession, statement: Select[Any], cap: int) -> int:
+    capped_subquery = (
+        statement.order_by(None)
+        .with_only_columns(literal(1), maintain_column_froms=True)
+        .limit(cap + 1)
+        .subquery()
+    )
+    result = await session.execute(select(func.count()).select_from(capped_subquery))
+    return result.scalar_one()
+
+
 async def get_pagination_params(
     page: int = Query(1, description="Page number, defaults to 1.", gt=0),
     limit: int = Query(
@@ -96,34 +184,339 @@ async def get_pagination_params(
         ),
         gt=0,
     ),
+    count_mode: PaginationCountMode = Query(
+        PaginationCountMode.exact,
+        alias="count",
+        description=(
+            "How to compute the total count of items. "
+            "`exact` counts all the items; "
+            f"`capped` stops counting after {settings.API_PAGINATION_COUNT_CAP} items; "
+            "`none` skips counting: only the items up to the current page "
+            "are counted. Defaults to `exact`."
+        ),
+    ),
 ) -> PaginationParams:
-    return PaginationParams(page, min(settings.API_PAGINATION_MAX_LIMIT, limit))
+    return PaginationParams(
+        page, min(settings.API_PAGINATION_MAX_LIMIT, limit), count_mode
+    )
 
 
 PaginationParamsQuery = Annotated[PaginationParams, Depends(get_pagination_params)]
 
 
-class Pagination(Schema):
-    total_count: int
-    max_page: int
+class CursorPaginationParams(NamedTuple):
+    cursor: str | None
+    limit: int
 
 
-class ListResource(BaseModel, Generic[T]):
-    items: list[T]
-    pagination: Pagination
+class InvalidCursor(PolarRequestValidationError):
+    def __init__(self, cursor: str) -> None:
+        super().__init__(
+            [
+                {
+                    "loc": ("query", "cursor"),
+                    "msg": "Invalid cursor.",
+                    "type": "value_error",
+                    "input": cursor,
+                }
+            ]
+        )
 
-    @classmethod
-    def from_paginated_results(
-        cls, items: Sequence[T], total_count: int, pagination_params: PaginationParams
-    ) -> Self:
-        return cls(
-            items=list(items),
-            pagination=Pagination(
-                total_count=total_count,
-                max_page=math.ceil(total_count / pagination_params.limit),
-            ),
+
+class _KeysetColumn(NamedTuple):
+    column: ColumnElement[Any]
+    is_desc: bool
+    nulls_first: bool
+    nullable: bool
+
+    def get_order_by_clause(self) -> UnaryExpression[Any]:
+        clause = desc(self.column) if self.is_desc else asc(self.column)
+        return clause.nulls_first() if self.nulls_first else clause.nulls_last()
+
+
+def _get_keyset_columns(
+    statement: Select[Any], order_by: Sequence[ColumnElement[Any]]
+) -> list[_KeysetColumn]:
+    """
+    Return the sort key columns of the ORDER BY clauses, with their ordering.
+
+    The primary key of the selected entity is appended as a tie-breaker,
+    in the direction of the last sort column, so the keyset is always unique
+    and the whole sort key can be matched by a single index.
+
+    Only the non-nullable columns of the selected entity are considered
+    non-nullable: columns of joined tables may be NULL through an outer join.
+    """
+    entity = statement.column_descriptions[0]["entity"]
+    columns: list[_KeysetColumn] = []
+    for order_by_clause in order_by:
+        clause: ClauseElement = order_by_clause
+        nulls_first: bool | None = None
+        if isinstance(clause, UnaryExpression) and clause.modifier in {
+            operators.nulls_first_op,
+            operators.nulls_last_op,
+        }:
+            nulls_first = clause.modifier == operators.nulls_first_op
+            clause = clause.element
+
+        is_desc = False
+        if isinstance(clause, UnaryExpression) and clause.modifier in {
+            operators.asc_op,
+            operators.desc_op,
+        }:
+            is_desc = clause.modifier == operators.desc_op
+            clause = clause.element
+
+        # PostgreSQL puts NULLs last in ascending order, first in descending order
+        if nulls_first is None:
+            nulls_first = is_desc
+
+        nullable = getattr(clause, "table", None) is not entity.__table__ or getattr(
+            clause, "nullable", True
         )
 
+        columns.append(
+            _KeysetColumn(
+                cast(ColumnElement[Any], clause), is_desc, nulls_first, nullable
+            )
+        )
+
+    is_desc = columns[-1].is_desc if columns else False
+    columns.append(_KeysetColumn(entity.id, is_desc, False, False))
+
+    return columns
+
+
+def _encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps(to_jsonable_python(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor_value(value: Any, column: ColumnElement[Any]) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if isinstance(value, python_type):
+        return value
+    return python_type(value)
+
+
+def _decode_cursor(cursor: str, columns: Sequence[_KeysetColumn]) -> list[Any]:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("Cursor doesn't match the sort key.")
+        return [
+            _decode_cursor_value(value, column.column)
+            for value, column in zip(values, columns)
+        ]
+    except (TypeError, ValueError, ArithmeticError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _get_after_clause(column: _KeysetColumn, value: Any) -> ColumnElement[bool]:
+    return column.column < value if column.is_desc else column.column > value
+
+
+def _get_keyset_clauses(
+    columns: Sequence[_KeysetColumn], values: Sequence[Any]
+) -> list[ColumnElement[bool]]:
+    """
+    Build the clauses selecting the rows coming after the given keyset values.
+
+    Each clause is bounded by a range on the leading sort column,
+    so PostgreSQL can use it as an index condition instead of filtering
+    every row of the previous pages. When the leading column is nullable
+    and its NULLs come after the cursor, they're selected by a second clause,
+    to be queried once the first one is exhausted.
+    """
+    # Non-nullable keyset sorted in a single direction: a row-value comparison
+    # is a single index condition on a matching composite index.
+    if all(not column.nullable for column in columns) and (
+        len({column.is_desc for column in columns}) == 1
+    ):
+        row = tuple_(*(column.column for column in columns))
+        row_values = tuple(values)
+        return [row < row_values if columns[0].is_desc else row > row_values]
+
+    clauses: list[ColumnElement[bool]] = []
+    equal_clauses: list[ColumnElement[bool]] = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        after_clause: ColumnElement[bool] | None
+        if value is None:
+            after_clause = column.column.is_not(None) if column.nulls_first else None
+        # NULLs of the leading column are selected by their own clause, see below
+        elif i == 0 or column.nulls_first or not column.nullable:
+            after_clause = _get_after_clause(column, value)
+        else:
+            after_clause = or_(
+                _get_after_clause(column, value), column.column.is_(None)
+            )
+        if after_clause is not None:
+            clauses.append(and_(*equal_clauses, after_clause))
+        equal_clauses.append(
+            column.column.is_(None) if value is None else column.column == value
+        )
+    after_clause = or_(*clauses)
+
+    leading_column, leading_value = columns[0], values[0]
+    if leading_value is None:
+        # NULLs first: every non-NULL row comes after, there is nothing to bound
+        if leading_column.nulls_first:
+            return [after_clause]
+        return [and_(leading_column.column.is_(None), after_clause)]
+
+    leading_column_bound = (
+        leading_column.column <= leading_value
+        if leading_column.is_desc
+        else leading_column.column >= leading_value
+    )
+    if leading_column.nulls_first or not leading_column.nullable:
+        return [and_(leading_column_bound, after_clause)]
+
+    # Leading NULLs come last: select the non-NULL rows within the bound,
+    # then the NULL rows, rather than OR-ing both in an unbounded clause.
+    return [
+        and_(leading_column_bound, after_clause),
+        leading_column.column.is_(None),
+    ]
+
+
+@overload
+async def paginate_cursor(
+    session: AsyncSession,
+    statement: Select[tuple[RM]],
+    *,
+    order_by: Sequence[ColumnElement[Any]],
+    pagination: CursorPaginationParams,
+) -> tuple[Sequence[RM], str | None]: ...
+
+
+@overload
+async def paginate_cursor(
+    session: AsyncSession,
+    statement: Select[tuple[M]],
+    *,
+    order_by: Sequence[ColumnElement[Any]],
+    pagination: CursorPaginationParams,
+) -> tuple[Sequence[M], str | None]: ...
+
+
+@overload
+async def paginate_cursor(
+    session: AsyncSession,
+    statement: Select[T],
+    *,
+    order_by: Sequence[ColumnElement[Any]],
+    pagination: CursorPaginationParams,
+) -> tuple[Sequence[T], str | None]: ...
+
+
+async def paginate_cursor(
+    session: AsyncSession,
+    statement: Select[Any],
+    *,
+    order_by: Sequence[ColumnElement[Any]],
+    pagination: CursorPaginationParams,
+) -> tuple[Sequence[Any], str | None]:
+    """
+    Paginate a statement using keyset pagination.
+
+    The sort key is given by `order_by`, the ORDER BY clauses of the statement,
+    e.g. `[Model.created_at.desc()]`. They replace the ones of the statement.
+    Instead of skipping rows with an OFFSET, we select the rows coming after
+    the sort key values of the last row of the previous page,
+    so fetching any page costs the same as fetching the first one.
+
+    Returns the results and the cursor of the next page, if any.
+    """
+    cursor, limit = pagination
+    columns = _get_keyset_columns(statement, order_by)
+
+    statement = (
+        statement.order_by(None)
+        .order_by(*(column.get_order_by_clause() for column in columns))
+        .add_columns(*(column.column for column in columns))
+    )
+
+    keyset_clauses: list[ColumnElement[bool] | None] = [None]
+    if cursor is not None:
+        values = _decode_cursor(cursor, columns)
+        keyset_clauses = list(_get_keyset_clauses(columns, values))
+
+    rows: list[Any] = []
+    for keyset_clause in keyset_clauses:
+        keyset_statement = (
+            statement if keyset_clause is None else statement.where(keyset_clause)
+        )
+        result = await session.execute(keyset_statement.limit(limit + 1 - len(rows)))
+        rows.extend(result.unique().all())
+        if len(rows) > limit:
+            break
+
+    results: list[Any] = []
+    last_values: Sequence[Any] = []
+    for row in rows:
+        row_tuple = row._tuple()
+        queried_data = row_tuple[: -len(columns)]
+        if len(results) == limit:
+            return results, _encode_cursor(last_values)
+        last_values = row_tuple[-len(columns) :]
+        if len(queried_data) == 1:
+            results.append(queried_data[0])
+        else:
+            results.append(queried_data)
+
+    return results, None
+
+
+async def get_cursor_pagination_params(
+    cursor: str | None = Query(
+        None,
+        description=(
+            "Cursor of the page to fetch, as returned in `next_cursor`. "
+            "Omit it to get the first page."
+        ),
+    ),
+    limit: int = Query(
+        10,
+        description=(
+            f"Size of a page, defaults to 10. "
+            f"Maximum is {settings.API_PAGINATION_MAX_LIMIT}."
+        ),
+        gt=0,
+    ),
+) -> CursorPaginationParams:
+    return CursorPaginationParams(cursor, min(settings.API_PAGINATION_MAX_LIMIT, limit))
+
+
+CursorPaginationParamsQuery = Annotated[
+    CursorPaginationParams, Depends(get_cursor_pagination_params)
+]
+
+
+class Pagination(Schema):
+    total_count: int
+    max_page: int
+    total_count_capped: bool = Field(
+        default=False,
+        description=(
+            "Whether counting stopped before reaching the total count. "
+            "If `true`, there are at least `total_count` items "
+            "and `max_page` isn't the last page."
+        ),
+    )
+
+
+class BaseListResource(BaseModel):
     @classmethod
     def model_parametrized_name(cls, params: tuple[type[Any], ...]) -> str:
         """
@@ -153,3 +546,50 @@ class ListResource(BaseModel, Generic[T]):
         result = super().__get_pydantic_core_schema__(source, handler)
         result["ref"] = cls.__name__  # type: ignore
         return result
+
+
+class ListResource(BaseListResource, Generic[T]):
+    items: list[T]
+    pagination: Pagination
+
+    @classmethod
+    def from_paginated_results(
+        cls, items: Sequence[T], total_count: int, pagination_params: PaginationParams
+    ) -> Self:
+        total_count_capped = False
+        if pagination_params.count_mode == PaginationCountMode.capped:
+            if total_count > pagination_params.count_cap:
+                total_count = pagination_params.count_cap
+                total_count_capped = True
+        elif pagination_params.count_mode == PaginationCountMode.none:
+            total_count_capped = not pagination_params.is_last_page(len(items))
+
+        return cls(
+            items=list(items),
+            pagination=Pagination(
+                total_count=total_count,
+                max_page=math.ceil(total_count / pagination_params.limit),
+                total_count_capped=total_count_capped,
+            ),
+        )
+
+
+class CursorPagination(Schema):
+    next_cursor: str | None = Field(
+        description=(
+            "Cursor to pass to get the next page. `null` if there are no more items."
+        )
+    )
+
+
+class CursorListResource(BaseListResource, Generic[T]):
+    items: list[T]
+    pagination: CursorPagination
+
+    @classmethod
+    def from_cursor_paginated_results(
+        cls, items: Sequence[T], next_cursor: str | None
+    ) -> Self:
+        return cls(
+            items=list(items), pagination=CursorPagination(next_cursor=next_cursor)
+        )
@@ -0,0 +1,255 @@
+"""
+Token bucket rate limiting, backed by Redis.
+
+Each bucket holds up to `limit` tokens, and is continuously refilled
+at a rate of `limit` tokens per `period`. Every request takes one token,
+and is rejected when the bucket is empty.
+
+Reading, refilling and updating the bucket happens atomically in a Lua script,
+so a rate-limited request costs a single Redis round trip.
+
+Example:
+
+```py
+router = APIRouter(
+    dependencies=[Depends(RateLimiter("embed", RateLimit(limit=60, period=60)))]
+)
+```
+"""
+
+import dataclasses
+import math
+from collections.abc import Awaitable, Callable
+from inspect import Parameter, Signature
+from typing import ClassVar, TypeVar
+
+import structlog
+from fastapi import Depends, Request, Response
+from makefun import with_signature
+from redis import RedisError
+
+from polar.auth.models import AuthSubject, Subject, is_organization, is_user
+from polar.config import settings
+from polar.exceptions import PolarError
+from polar.logging import Logger
+from polar.redis import Redis, get_redis
+
+log: Logger = structlog.get_logger()
+
+RATE_LIMIT_KEY_PREFIX = "rate_limit"
+
+R = TypeVar("R", bound=Response)
+
+# KEYS[1]: bucket key
+# ARGV[1]: bucket capacity, in tokens
+# ARGV[2]: time to refill an empty bucket, in milliseconds
+# ARGV[3]: number of tokens to take
+#
+# Returns whether the tokens were taken, the remaining tokens,
+# the time until the bucket is full and the time until enough tokens
+# are available, in milliseconds.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local rate = capacity / period
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "timestamp")
+local tokens = tonumber(bucket[1]) or capacity
+local timestamp = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - timestamp) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "timestamp", now)
+-- Past this delay, the bucket is full again: it's the same as a missing one
+redis.call("PEXPIRE", KEYS[1], math.ceil(period))
+
+return {allowed, math.floor(tokens), math.ceil((capacity - tokens) / rate), retry_after}
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    """Maximum number of requests in a burst."""
+    period: float
+    """Time to recover the full `limit`, in seconds."""
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float
+    """Time until the bucket is full again, in seconds."""
+    retry_after: float
+    """Time until a request is allowed again, in seconds. Zero if allowed."""
+
+    HEADERS: ClassVar[tuple[str, ...]] = (
+        "RateLimit-Limit",
+        "RateLimit-Remaining",
+        "RateLimit-Reset",
+        "Retry-After",
+    )
+
+    def get_headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class RateLimitExceeded(PolarError):
+    def __init__(self, result: RateLimitResult) -> None:
+        self.result = result
+        super().__init__(
+            "Rate limit exceeded, please retry later.", 429, result.get_headers()
+        )
+
+
+async def hit(
+    redis: Redis, key: str, rate_limit: RateLimit, *, cost: int = 1
+) -> RateLimitResult:
+    """Take `cost` tokens from the bucket `key`, if available."""
+    script = redis.register_script(_TOKEN_BUCKET_SCRIPT)
+    allowed, remaining, reset, retry_after = await script(
+        keys=[f"{RATE_LIMIT_KEY_PREFIX}:{key}"],
+        args=[rate_limit.limit, math.ceil(rate_limit.period * 1000), cost],
+    )
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=rate_limit.limit,
+        remaining=int(remaining),
+        reset=int(reset) / 1000,
+        retry_after=int(retry_after) / 1000,
+    )
+
+
+async def get_ip_key(request: Request) -> str:
+    return f"ip:{request.client.host if request.client else None}"
+
+
+async def get_auth_subject_key(
+    request: Request, auth_subject: AuthSubject[Subject]
+) -> str:
+    """Key on the user or organization, falling back to the IP for anonymous."""
+    if is_user(auth_subject):
+        return f"user:{auth_subject.subject.id}"
+    if is_organization(auth_subject):
+        return f"organization:{auth_subject.subject.id}"
+    return await get_ip_key(request)
+
+
+class _RateLimiter:
+    def __init__(self, name: str, rate_limit: RateLimit) -> None:
+        self.name = name
+        self.rate_limit = rate_limit
+
+    async def __call__(self, response: Response, redis: Redis, key: str) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        try:
+            result = await hit(redis, f"{self.name}:{key}", self.rate_limit)
+        except RedisError as e:
+            # Don't turn a Redis outage into an API outage
+            log.warning("rate_limit.error", name=self.name, error=str(e))
+            return
+
+        if not result.allowed:
+            raise RateLimitExceeded(result)
+
+        response.headers.update(result.get_headers())
+
+
+def copy_rate_limit_headers(source: Response, target: R) -> R:
+    """
+    Copy the rate limit headers set by a `RateLimiter` to a returned response.
+
+    FastAPI only merges the headers of the injected `Response` when the endpoint
+    doesn't return a `Response` itself, e.g. a `RedirectResponse`.
+
+    Args:
+        source: The `Response` injected in the endpoint.
+        target: The `Response` returned by the endpoint.
+    """
+    for header in RateLimitResult.HEADERS:
+        if (value := source.headers.get(header)) is not None:
+            target.headers[header] = value
+    return target
+
+
+def RateLimiter(
+    name: str,
+    rate_limit: RateLimit,
+    key: Callable[..., Awaitable[str]] = get_ip_key,
+) -> _RateLimiter:
+    """
+    Here comes some blood magic 🧙‍♂️
+
+    Generate a version of `_RateLimiter` with an overriden `__call__` signature.
+
+    By doing so, `key` is a FastAPI dependency itself, so it can depend on
+    the request, the authenticated subject or anything else.
+
+    The rate limit headers are set on the injected `Response`. Endpoints returning
+    their own `Response` must copy them with `copy_rate_limit_headers`.
+
+    Args:
+        name: Name of the limiter, scoping its buckets.
+        rate_limit: The limit applied to each bucket.
+        key: Dependency returning the bucket key of the request.
+        Defaults to the client IP.
+    """
+    parameters: list[Parameter] = [
+        Parameter(name="self", kind=Parameter.POSITIONAL_OR_KEYWORD),
+        Parameter(
+            name="response", kind=Parameter.POSITIONAL_OR_KEYWORD, annotation=Response
+        ),
+        Parameter(
+            name="redis",
+            kind=Parameter.POSITIONAL_OR_KEYWORD,
+            default=Depends(get_redis),
+        ),
+        Parameter(
+            name="key",
+            kind=Parameter.POSITIONAL_OR_KEYWORD,
+            default=Depends(key),
+        ),
+    ]
+    signature = Signature(parameters)
+
+    class _RateLimiterSignature(_RateLimiter):
+        @with_signature(signature)
+        async def __call__(self, response: Response, redis: Redis, key: str) -> None:
+            return await super().__call__(response, redis, key)
+
+    return _RateLimiterSignature(name, rate_limit)
+
+
+__all__ = [
+    "RateLimit",
+    "RateLimitExceeded",
+    "RateLimitResult",
+    "RateLimiter",
+    "copy_rate_limit_headers",
+    "get_auth_subject_key",
+    "get_ip_key",
+    "hit",
+]
@@ -4,6 +4,7 @@ from collections.abc import Sequence
 from typing import Any, Generic, TypeVar
 from uuid import UUID
 
+from sqlalchemy import Select
 from sqlalchemy.orm import InstrumentedAttribute
 from sqlalchemy.sql.base import ExecutableOption
 
@@ -11,6 +12,9 @@ from polar.kit.utils import utc_now
 
 from .db.models import RecordModel
 from .db.postgres import AsyncSession, sql
+from .db.upsert import UPSERT_CHUNK_SIZE, UPSERT_COPY_THRESHOLD
+from .db.upsert import upsert_many as db_upsert_many
+from .loader import DataLoader, get_session_loader
 from .schemas import Schema
 
 ModelType = TypeVar("ModelType", bound=RecordModel)
@@ -41,6 +45,25 @@ class ResourceServiceReader(
         res = await session.execute(query)
         return res.scalars().unique().one_or_none()
 
+    async def get_batched(self, session: AsyncSession, id: UUID) -> ModelType | None:
+        """
+        Same as `get`, but concurrent calls in the same session,
+        e.g. with `asyncio.gather`, are batched into a single query.
+        """
+        return await self._get_loader(session).load(id)
+
+    def _get_loader_statement(self, ids: Sequence[UUID]) -> Select[tuple[ModelType]]:
+        return sql.select(self.model).where(
+            self.model.id.in_(ids), self.model.deleted_at.is_(None)
+        )
+
+    def _get_loader(self, session: AsyncSession) -> DataLoader[UUID, ModelType]:
+        async def _load(ids: Sequence[UUID]) -> dict[UUID, ModelType]:
+            res = await session.execute(self._get_loader_statement(ids))
+            return {o.id: o for o in res.scalars().unique().all()}
+
+        return get_session_loader(session, (self.model, "get_batched"), _load)
+
     async def get_by(self, session: AsyncSession, **clauses: Any) -> ModelType | None:
         query = sql.select(self.model).filter_by(**clauses)
         res = await session.execute(query)
@@ -66,7 +89,6 @@ class ResourceService(
     # no state to retain. Unable to achieve this with mapping the model
     # and schema as class attributes though without breaking typing.
 
-    # TODO: Investigate new bulk methods in SQLALchemy 2.0 for upsert_many
     async def upsert_many(
         self,
         session: AsyncSession,
@@ -74,6 +96,10 @@ class ResourceService(
         constraints: list[InstrumentedAttribute[Any]],
         mutable_keys: set[str],
         autocommit: bool = True,
+        *,
+        returning: bool = True,
+        chunk_size: int = UPSERT_CHUNK_SIZE,
+        copy_threshold: int | None = UPSERT_COPY_THRESHOLD,
     ) -> Sequence[ModelType]:
         return await self._db_upsert_many(
             session,
@@ -81,6 +107,9 @@ class ResourceService(
             constraints=constraints,
             mutable_keys=mutable_keys,
             autocommit=autocommit,
+            returning=returning,
+            chunk_size=chunk_size,
+            copy_threshold=copy_threshold,
         )
 
     async def _db_upsert_many(
@@ -90,25 +119,25 @@ class ResourceService(
         constraints: list[InstrumentedAttribute[Any]],
         mutable_keys: set[str],
         autocommit: bool = True,
+        *,
+        returning: bool = True,
+        chunk_size: int = UPSERT_CHUNK_SIZE,
+        copy_threshold: int | None = UPSERT_COPY_THRESHOLD,
     ) -> Sequence[ModelType]:
         values = [obj.model_dump() for obj in objects]
         if not values:
             raise ValueError("Zero values provided")
 
-        insert_stmt = sql.insert(self.model).values(values)
-
-        # Update the insert statement with what to update on conflict, i.e mutable keys.
-        upsert_stmt = (
-            insert_stmt.on_conflict_do_update(
-                index_elements=constraints,
-                set_={k: getattr(insert_stmt.excluded, k) for k in mutable_keys},
-            )
-            .returning(self.model)
-            .execution_options(populate_existing=True)
+        instances = await db_upsert_many(
+            session,
+            self.model,
+            values,
+            index_elements=constraints,
+            mutable_keys=mutable_keys,
+            returning=returning,
+            chunk_size=chunk_size,
+            copy_threshold=copy_threshold,
         )
-
-        res = await session.execute(upsert_stmt)
-        instances = res.scalars().all()
         if autocommit:
             await session.commit()
         return instances
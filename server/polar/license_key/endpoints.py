@@ -5,7 +5,12 @@ from polar.authz.service import AccessType, Authz
 from polar.benefit.schemas import BenefitID
 from polar.exceptions import ResourceNotFound, Unauthorized
 from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorListResource,
+    CursorPaginationParamsQuery,
+    ListResource,
+    PaginationParamsQuery,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import LicenseKey, LicenseKeyActivation
 from polar.openapi import APITag
@@ -69,6 +74,40 @@ async def list(
     )
 
 
+@router.get(
+    "/cursor",
+    summary="List License Keys by Cursor",
+    response_model=CursorListResource[LicenseKeyRead],
+    responses={
+        401: UnauthorizedResponse,
+        404: NotFoundResponse,
+    },
+)
+async def list_cursor(
+    auth_subject: auth.LicenseKeysRead,
+    pagination: CursorPaginationParamsQuery,
+    organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
+        None, title="OrganizationID Filter", description="Filter by organization ID."
+    ),
+    benefit_ids: MultipleQueryFilter[BenefitID] | None = Query(
+        None, title="BenefitID Filter", description="Filter by benefit ID."
+    ),
+    session: AsyncSession = Depends(get_db_session),
+) -> CursorListResource[LicenseKeyRead]:
+    """Get license keys connected to the given organization & filters, by cursor."""
+    results, next_cursor = await license_key_service.get_list_cursor(
+        session,
+        auth_subject,
+        organization_ids=organization_id,
+        benefit_ids=benefit_ids,
+        pagination=pagination,
+    )
+
+    return CursorListResource.from_cursor_paginated_results(
+        [LicenseKeyRead.model_validate(result) for result in results], next_cursor
+    )
+
+
 @router.get(
     "/{id}",
     summary="Get License Key",
@@ -7,7 +7,12 @@ from sqlalchemy.orm import contains_eager, joinedload
 
 from polar.auth.models import AuthSubject, is_organization, is_user
 from polar.exceptions import BadRequest, NotPermitted, ResourceNotFound
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import (
+    CursorPaginationParams,
+    PaginationParams,
+    paginate,
+    paginate_cursor,
+)
 from polar.kit.services import ResourceService
 from polar.kit.utils import utc_now
 from polar.models import (
@@ -144,27 +149,30 @@ class LicenseKeyService(
         benefit_ids: Sequence[UUID] | None = None,
         organization_ids: Sequence[UUID] | None = None,
     ) -> tuple[Sequence[LicenseKey], int]:
-        query = self._get_select_base().order_by(LicenseKey.created_at.asc())
-
-        if is_user(auth_subject):
-            user = auth_subject.subject
-            query = query.join(
-                UserOrganization,
-                onclause=UserOrganization.organization_id == LicenseKey.organization_id,
-            ).where(UserOrganization.user_id == user.id)
-        elif is_organization(auth_subject):
-            query = query.where(LicenseKey.organization_id == auth_subject.subject.id)
-        else:
-            raise ValueError("Invalid auth_subject given to license keys")
-
-        if organization_ids:
-            query = query.where(LicenseKey.organization_id.in_(organization_ids))
-
-        if benefit_ids:
-            query = query.where(LicenseKey.benefit_id.in_(benefit_ids))
-
+        query = self._get_list_statement(
+            auth_subject, benefit_ids=benefit_ids, organization_ids=organization_ids
+        )
         return await paginate(session, query, pagination=pagination)
 
+    async def get_list_cursor(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        pagination: CursorPaginationParams,
+        benefit_ids: Sequence[UUID] | None = None,
+        organization_ids: Sequence[UUID] | None = None,
+    ) -> tuple[Sequence[LicenseKey], str | None]:
+        query = self._get_list_statement(
+            auth_subject, benefit_ids=benefit_ids, organization_ids=organization_ids
+        )
+        return await paginate_cursor(
+            session,
+            query,
+            order_by=[LicenseKey.created_at.asc()],
+            pagination=pagination,
+        )
+
     async def get_user_list(
         self,
         session: AsyncSession,
@@ -497,6 +505,34 @@ class LicenseKeyService(
         )
         return key
 
+    def _get_list_statement(
+        self,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        benefit_ids: Sequence[UUID] | None,
+        organization_ids: Sequence[UUID] | None,
+    ) -> Select[tuple[LicenseKey]]:
+        query = self._get_select_base().order_by(LicenseKey.created_at.asc())
+
+        if is_user(auth_subject):
+            user = auth_subject.subject
+            query = query.join(
+                UserOrganization,
+                onclause=UserOrganization.organization_id == LicenseKey.organization_id,
+            ).where(UserOrganization.user_id == user.id)
+        elif is_organization(auth_subject):
+            query = query.where(LicenseKey.organization_id == auth_subject.subject.id)
+        else:
+            raise ValueError("Invalid auth_subject given to license keys")
+
+        if organization_ids:
+            query = query.where(LicenseKey.organization_id.in_(organization_ids))
+
+        if benefit_ids:
+            query = query.where(LicenseKey.benefit_id.in_(benefit_ids))
+
+        return query
+
     def _get_select_base(self) -> Select[tuple[LicenseKey]]:
         return (
             select(LicenseKey)
@@ -1,4 +1,5 @@
 import os
+from collections.abc import Callable
 from typing import Literal
 
 import httpx
@@ -6,9 +7,11 @@ import logfire
 from fastapi import FastAPI
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.metrics import CallbackOptions, Observation
 
 from polar.config import settings
-from polar.kit.db.postgres import Engine
+from polar.kit.db.pool import InstrumentedAsyncAdaptedQueuePool
+from polar.kit.db.postgres import AsyncEngine, Engine
 
 
 def configure_logfire(service_name: Literal["server", "worker"]) -> None:
@@ -51,8 +54,52 @@ def instrument_sqlalchemy(engine: Engine) -> None:
     SQLAlchemyInstrumentor().instrument(engine=engine)
 
 
+def instrument_sqlalchemy_pool(engine: AsyncEngine, process_name: str) -> None:
+    """Report the checkout wait times and saturation of an engine pool."""
+    if settings.is_testing():
+        return
+
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, InstrumentedAsyncAdaptedQueuePool):
+        return
+
+    attributes = {"process_name": process_name}
+
+    wait_time = logfire.metric_histogram(
+        "db.pool.wait_time",
+        unit="s",
+        description="Time spent waiting for a connection from the pool.",
+    )
+    pool.wait_time_listeners.append(lambda value: wait_time.record(value, attributes))
+
+    def _observe(
+        value: Callable[[], int],
+    ) -> Callable[[CallbackOptions], list[Observation]]:
+        return lambda options: [Observation(value(), attributes)]
+
+    logfire.metric_gauge_callback(
+        "db.pool.checked_out",
+        [_observe(pool.checkedout)],
+        unit="{connection}",
+        description="Number of connections currently checked out from the pool.",
+    )
+    logfire.metric_gauge_callback(
+        "db.pool.overflow",
+        [_observe(lambda: max(pool.overflow(), 0))],
+        unit="{connection}",
+        description="Number of connections opened beyond the pool size.",
+    )
+    logfire.metric_gauge_callback(
+        "db.pool.waiting",
+        [_observe(lambda: pool.waiting)],
+        unit="{checkout}",
+        description="Number of checkouts waiting for a connection.",
+    )
+
+
 __all__ = [
     "configure_logfire",
     "instrument_fastapi",
     "instrument_sqlalchemy",
+    "instrument_sqlalchemy_pool",
 ]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import uuid
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from pydantic import BaseModel
+
+from polar.models.product_price import ProductPriceType
+from polar.redis import Redis
+
+from .queries import Interval
+from .schemas import MetricsColumns
+
+CLOSED_PERIODS_TTL = timedelta(days=30)
+"""
+Closed periods can't receive new orders or subscription changes anymore,
+so we keep them for a long time.
+"""
+
+OPEN_PERIODS_TTL = timedelta(hours=1)
+"""
+Open periods are invalidated when the organization data changes.
+The TTL is only a safety net.
+"""
+
+
+class CachedClosedPeriods(BaseModel):
+    columns: MetricsColumns
+    next_timestamp: datetime | None
+    """Timestamp of the first open period, if any."""
+
+
+def _get_generation_key(organization_id: uuid.UUID) -> str:
+    return f"metrics:generation:{organization_id}"
+
+
+class MetricsCache:
+    def get_key(
+        self,
+        organization_ids: Sequence[uuid.UUID],
+        *,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        interval: Interval,
+        open_period_start: datetime,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_price_type: Sequence[ProductPriceType] | None = None,
+    ) -> str:
+        """
+        Compute a cache key for a metrics query.
+
+        The key is bound to the open period start, so everything
+        is recomputed once when a period closes.
+        """
+        payload = json.dumps(
+            [
+                sorted(str(id) for id in organization_ids),
+                start_timestamp.isoformat(),
+                end_timestamp.isoformat(),
+                interval.value,
+                open_period_start.isoformat(),
+                sorted(str(id) for id in product_id)
+                if product_id is not None
+                else None,
+                sorted(product_price_type) if product_price_type is not None else None,
+            ]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get_generation(
+        self, redis: Redis, organization_ids: Sequence[uuid.UUID]
+    ) -> str:
+        if len(organization_ids) == 0:
+            return ""
+        sorted_ids = sorted(organization_ids)
+        generations = await redis.mget([_get_generation_key(id) for id in sorted_ids])
+        return ":".join(str(int(generation or 0)) for generation in generations)
+
+    async def invalidate(self, redis: Redis, organization_id: uuid.UUID) -> None:
+        """
+        Invalidate the open periods of an organization.
+
+        Bumps the generation of the organization,
+        so the open periods cached before are ignored.
+        """
+        await redis.incr(_get_generation_key(organization_id))
+
+    async def get_closed_periods(
+        self, redis: Redis, key: str
+    ) -> CachedClosedPeriods | None:
+        value = await redis.get(f"metrics:closed:{key}")
+        if value is None:
+            return None
+        return CachedClosedPeriods.model_validate_json(value)
+
+    async def set_closed_periods(
+        self,
+        redis: Redis,
+        key: str,
+        columns: MetricsColumns,
+        next_timestamp: datetime | None,
+    ) -> None:
+        value = CachedClosedPeriods(columns=columns, next_timestamp=next_timestamp)
+        await redis.setex(
+            f"metrics:closed:{key}", CLOSED_PERIODS_TTL, value.model_dump_json()
+        )
+
+    async def get_open_periods(
+        self, redis: Redis, key: str, generation: str
+    ) -> MetricsColumns | None:
+        value = await redis.get(f"metrics:open:{key}:{generation}")
+        if value is None:
+            return None
+        return MetricsColumns.model_validate_json(value)
+
+    async def set_open_periods(
+        self,
+        redis: Redis,
+        key: str,
+        generation: str,
+        columns: MetricsColumns,
+    ) -> None:
+        await redis.setex(
+            f"metrics:open:{key}:{generation}",
+            OPEN_PERIODS_TTL,
+            columns.model_dump_json(),
+        )
+
+
+metrics_cache = MetricsCache()
@@ -7,19 +7,37 @@ from polar.kit.schemas import MultipleQueryFilter
 from polar.models.product_price import ProductPriceType
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_read_session, get_db_session
 from polar.product.schemas import ProductID
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
 from .limits import MAX_INTERVAL_DAYS, MIN_DATE, is_under_limits
 from .queries import Interval
-from .schemas import MetricsLimits, MetricsResponse
+from .schemas import MetricsColumnarResponse, MetricsLimits, MetricsResponse
 from .service import metrics as metrics_service
 
 router = APIRouter(prefix="/metrics", tags=["metrics", APITag.documented])
 
 
+def _check_limits(start_date: date, end_date: date, interval: Interval) -> None:
+    if not is_under_limits(start_date, end_date, interval):
+        raise PolarRequestValidationError(
+            [
+                {
+                    "loc": ("query",),
+                    "msg": (
+                        "The interval is too big. "
+                        "Try to change the interval or reduce the date range."
+                    ),
+                    "type": "value_error",
+                    "input": (start_date, end_date, interval),
+                }
+            ]
+        )
+
+
 @router.get("/", summary="Get Metrics", response_model=MetricsResponse)
 async def get(
     auth_subject: auth.MetricsRead,
@@ -47,23 +65,12 @@ async def get(
         ),
     ),
     session: AsyncSession = Depends(get_db_session),
+    read_session: AsyncSession = Depends(get_db_read_session),
+    redis: Redis = Depends(get_redis),
 ) -> MetricsResponse:
     """Get metrics about your orders and subscriptions."""
 
-    if not is_under_limits(start_date, end_date, interval):
-        raise PolarRequestValidationError(
-            [
-                {
-                    "loc": ("query",),
-                    "msg": (
-                        "The interval is too big. "
-                        "Try to change the interval or reduce the date range."
-                    ),
-                    "type": "value_error",
-                    "input": (start_date, end_date, interval),
-                }
-            ]
-        )
+    _check_limits(start_date, end_date, interval)
 
     return await metrics_service.get_metrics(
         session,
@@ -74,6 +81,65 @@ async def get(
         organization_id=organization_id,
         product_id=product_id,
         product_price_type=product_price_type,
+        redis=redis,
+        read_session=read_session,
+    )
+
+
+@router.get(
+    "/columnar",
+    summary="Get Columnar Metrics",
+    response_model=MetricsColumnarResponse,
+)
+async def get_columnar(
+    auth_subject: auth.MetricsRead,
+    start_date: date = Query(
+        ...,
+        description="Start date.",
+        ge=MIN_DATE,  # type: ignore
+    ),
+    end_date: date = Query(..., description="End date."),
+    interval: Interval = Query(..., description="Interval between two timestamps."),
+    organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
+        None, title="OrganizationID Filter", description="Filter by organization ID."
+    ),
+    product_id: MultipleQueryFilter[ProductID] | None = Query(
+        None, title="ProductID Filter", description="Filter by product ID."
+    ),
+    product_price_type: MultipleQueryFilter[ProductPriceType] | None = Query(
+        None,
+        title="ProductPriceType Filter",
+        description=(
+            "Filter by product price type. "
+            "`recurring` will filter data corresponding "
+            "to subscriptions creations or renewals. "
+            "`one_time` will filter data corresponding to one-time purchases."
+        ),
+    ),
+    session: AsyncSession = Depends(get_db_session),
+    read_session: AsyncSession = Depends(get_db_read_session),
+    redis: Redis = Depends(get_redis),
+) -> MetricsColumnarResponse:
+    """
+    Get metrics about your orders and subscriptions, in a columnar layout.
+
+    Instead of a list of periods, it returns a list of timestamps
+    and a list of values for each metric. It's lighter for long ranges.
+    """
+
+    _check_limits(start_date, end_date, interval)
+
+    return await metrics_service.get_metrics_columnar(
+        session,
+        auth_subject,
+        start_date=start_date,
+        end_date=end_date,
+        interval=interval,
+        organization_id=organization_id,
+        product_id=product_id,
+        product_price_type=product_price_type,
+        redis=redis,
+        read_session=read_session,
     )
 
 
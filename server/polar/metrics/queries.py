@@ -1,6 +1,6 @@
 import uuid
 from collections.abc import Generator, Sequence
-from datetime import datetime
+from datetime import UTC, datetime, timedelta
 from enum import StrEnum
 from typing import TYPE_CHECKING, Protocol, cast
 
@@ -18,16 +18,7 @@ from sqlalchemy import (
     text,
 )
 
-from polar.auth.models import AuthSubject, is_organization, is_user
-from polar.models import (
-    Order,
-    Organization,
-    Product,
-    ProductPrice,
-    Subscription,
-    User,
-    UserOrganization,
-)
+from polar.models import Order, Product, ProductPrice, Subscription
 from polar.models.product_price import ProductPriceType
 
 if TYPE_CHECKING:
@@ -49,6 +40,23 @@ class Interval(StrEnum):
     ) -> Function[datetime]:
         return func.date_trunc(self.value, column)
 
+    def truncate(self, timestamp: datetime) -> datetime:
+        """
+        Truncate a timestamp to the start of its period,
+        the same way `date_trunc` does it in UTC.
+        """
+        timestamp = timestamp.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+        if self == Interval.hour:
+            return timestamp
+        timestamp = timestamp.replace(hour=0)
+        if self == Interval.week:
+            return timestamp - timedelta(days=timestamp.weekday())
+        if self == Interval.month:
+            return timestamp.replace(day=1)
+        if self == Interval.year:
+            return timestamp.replace(month=1, day=1)
+        return timestamp
+
 
 class MetricQuery(StrEnum):
     orders = "orders"
@@ -87,10 +95,9 @@ class QueryCallable(Protocol):
         self,
         timestamp_series: CTE,
         interval: Interval,
-        auth_subject: AuthSubject[User | Organization],
+        organization_ids: Sequence[uuid.UUID],
         metrics: list["type[Metric]"],
         *,
-        organization_id: Sequence[uuid.UUID] | None = None,
         product_id: Sequence[uuid.UUID] | None = None,
         product_price_type: Sequence[ProductPriceType] | None = None,
     ) -> CTE: ...
@@ -99,36 +106,19 @@ class QueryCallable(Protocol):
 def get_orders_cte(
     timestamp_series: CTE,
     interval: Interval,
-    auth_subject: AuthSubject[User | Organization],
+    organization_ids: Sequence[uuid.UUID],
     metrics: list["type[Metric]"],
     *,
-    organization_id: Sequence[uuid.UUID] | None = None,
     product_id: Sequence[uuid.UUID] | None = None,
     product_price_type: Sequence[ProductPriceType] | None = None,
 ) -> CTE:
     timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
 
-    readable_orders_statement = select(Order.id).join(
-        Product, onclause=Order.product_id == Product.id
+    readable_orders_statement = (
+        select(Order.id)
+        .join(Product, onclause=Order.product_id == Product.id)
+        .where(Product.organization_id.in_(organization_ids))
     )
-    if is_user(auth_subject):
-        readable_orders_statement = readable_orders_statement.where(
-            Product.organization_id.in_(
-                select(UserOrganization.organization_id).where(
-                    UserOrganization.user_id == auth_subject.subject.id,
-                    UserOrganization.deleted_at.is_(None),
-                )
-            )
-        )
-    elif is_organization(auth_subject):
-        readable_orders_statement = readable_orders_statement.where(
-            Product.organization_id == auth_subject.subject.id
-        )
-
-    if organization_id is not None:
-        readable_orders_statement = readable_orders_statement.where(
-            Product.organization_id.in_(organization_id)
-        )
 
     if product_id is not None:
         readable_orders_statement = readable_orders_statement.where(
@@ -171,36 +161,19 @@ def get_orders_cte(
 def get_active_subscriptions_cte(
     timestamp_series: CTE,
     interval: Interval,
-    auth_subject: AuthSubject[User | Organization],
+    organization_ids: Sequence[uuid.UUID],
     metrics: list["type[Metric]"],
     *,
-    organization_id: Sequence[uuid.UUID] | None = None,
     product_id: Sequence[uuid.UUID] | None = None,
     product_price_type: Sequence[ProductPriceType] | None = None,
 ) -> CTE:
     timestamp_column: ColumnElement[datetime] = timestamp_series.c.timestamp
 
-    readable_subscriptions_statement = select(Subscription.id).join(
-        Product, onclause=Subscription.product_id == Product.id
+    readable_subscriptions_statement = (
+        select(Subscription.id)
+        .join(Product, onclause=Subscription.product_id == Product.id)
+        .where(Product.organization_id.in_(organization_ids))
     )
-    if is_user(auth_subject):
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Product.organization_id.in_(
-                select(UserOrganization.organization_id).where(
-                    UserOrganization.user_id == auth_subject.subject.id,
-                    UserOrganization.deleted_at.is_(None),
-                )
-            )
-        )
-    elif is_organization(auth_subject):
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Product.organization_id == auth_subject.subject.id
-        )
-
-    if organization_id is not None:
-        readable_subscriptions_statement = readable_subscriptions_statement.where(
-            Product.organization_id.in_(organization_id)
-        )
 
     if product_id is not None:
         readable_subscriptions_statement = readable_subscriptions_statement.where(
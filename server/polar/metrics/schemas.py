@@ -1,7 +1,7 @@
 from datetime import date, datetime
 from typing import TYPE_CHECKING
 
-from pydantic import Field, create_model
+from pydantic import BaseModel, Field, create_model
 
 from polar.kit.schemas import Schema
 
@@ -61,6 +61,67 @@ class MetricsResponse(Schema):
     metrics: Metrics = Field(description="Information about the returned metrics.")
 
 
+if TYPE_CHECKING:
+
+    class MetricsValues(Schema):
+        def __getattr__(self, name: str) -> list[int]: ...
+
+else:
+    MetricsValues = create_model(
+        "MetricsValues",
+        **{m.slug: (list[int], ...) for m in METRICS},
+        __base__=Schema,
+    )
+
+
+class MetricsColumnarResponse(Schema):
+    """
+    Metrics response schema, in a columnar layout.
+
+    Each list of values is aligned with the list of timestamps.
+    """
+
+    timestamps: list[datetime] = Field(description="Timestamp of each period.")
+    values: MetricsValues = Field(
+        description="List of values for each metric, aligned with `timestamps`."
+    )
+    metrics: Metrics = Field(description="Information about the returned metrics.")
+
+
+class MetricsColumns(BaseModel):
+    """
+    Internal columnar representation of metrics data,
+    from which we build the responses.
+    """
+
+    timestamps: list[datetime]
+    values: dict[str, list[int]]
+
+    def slice(self, start: int, stop: int | None = None) -> "MetricsColumns":
+        return MetricsColumns(
+            timestamps=self.timestamps[start:stop],
+            values={slug: values[start:stop] for slug, values in self.values.items()},
+        )
+
+    def concat(self, other: "MetricsColumns") -> "MetricsColumns":
+        return MetricsColumns(
+            timestamps=[*self.timestamps, *other.timestamps],
+            values={
+                slug: [*values, *other.values[slug]]
+                for slug, values in self.values.items()
+            },
+        )
+
+    def to_periods(self) -> list[dict[str, datetime | int]]:
+        return [
+            {
+                "timestamp": timestamp,
+                **{slug: values[i] for slug, values in self.values.items()},
+            }
+            for i, timestamp in enumerate(self.timestamps)
+        ]
+
+
 class MetricsIntervalLimit(Schema):
     """Date interval limit to get metrics for a given interval."""
 
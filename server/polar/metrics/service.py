@@ -1,17 +1,24 @@
 import uuid
 from collections.abc import Sequence
-from datetime import UTC, date, datetime
+from datetime import UTC, date, datetime, timedelta
 
 from sqlalchemy import ColumnElement, FromClause, select
 
-from polar.auth.models import AuthSubject
+from polar.auth.models import AuthSubject, is_organization, is_user
+from polar.config import settings
+from polar.kit.utils import utc_now
 from polar.models import Organization, User
 from polar.models.product_price import ProductPriceType
 from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 
+from .cache import metrics_cache
 from .metrics import METRICS
 from .queries import QUERIES, Interval, get_timestamp_series_cte
-from .schemas import MetricsPeriod, MetricsResponse
+from .schemas import MetricsColumnarResponse, MetricsColumns, MetricsResponse
 
 
 class MetricsService:
@@ -26,7 +33,89 @@ class MetricsService:
         organization_id: Sequence[uuid.UUID] | None = None,
         product_id: Sequence[uuid.UUID] | None = None,
         product_price_type: Sequence[ProductPriceType] | None = None,
+        redis: Redis | None = None,
+        read_session: AsyncSession | None = None,
     ) -> MetricsResponse:
+        """
+        Compute the metrics for the given period.
+
+        If a Redis client is given, closed periods are cached long-term
+        and only the open periods are recomputed when the organization data changes.
+
+        If a read session is given, closed periods are computed on it.
+        Open periods are always computed on `session`: they're cached until
+        the next invalidation, so they must include the latest writes.
+        """
+        columns = await self._get_columns(
+            session,
+            auth_subject,
+            start_date=start_date,
+            end_date=end_date,
+            interval=interval,
+            organization_id=organization_id,
+            product_id=product_id,
+            product_price_type=product_price_type,
+            redis=redis,
+            read_session=read_session,
+        )
+        return MetricsResponse.model_validate(
+            {"periods": columns.to_periods(), "metrics": {m.slug: m for m in METRICS}}
+        )
+
+    async def get_metrics_columnar(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        start_date: date,
+        end_date: date,
+        interval: Interval,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_price_type: Sequence[ProductPriceType] | None = None,
+        redis: Redis | None = None,
+        read_session: AsyncSession | None = None,
+    ) -> MetricsColumnarResponse:
+        """
+        Same as `get_metrics`, but returns the data in a columnar layout.
+
+        It avoids to repeat every metric slug for each period,
+        which is significantly lighter for long ranges.
+        """
+        columns = await self._get_columns(
+            session,
+            auth_subject,
+            start_date=start_date,
+            end_date=end_date,
+            interval=interval,
+            organization_id=organization_id,
+            product_id=product_id,
+            product_price_type=product_price_type,
+            redis=redis,
+            read_session=read_session,
+        )
+        return MetricsColumnarResponse.model_validate(
+            {
+                "timestamps": columns.timestamps,
+                "values": columns.values,
+                "metrics": {m.slug: m for m in METRICS},
+            }
+        )
+
+    async def _get_columns(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        start_date: date,
+        end_date: date,
+        interval: Interval,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_price_type: Sequence[ProductPriceType] | None = None,
+        redis: Redis | None = None,
+        read_session: AsyncSession | None = None,
+    ) -> MetricsColumns:
         start_timestamp = datetime(
             start_date.year, start_date.month, start_date.day, 0, 0, 0, 0, UTC
         )
@@ -34,6 +123,139 @@ class MetricsService:
             end_date.year, end_date.month, end_date.day, 23, 59, 59, 999999, UTC
         )
 
+        organization_ids = await self._get_organization_ids(
+            session, auth_subject, organization_id
+        )
+
+        if redis is None:
+            return await self._query_columns(
+                read_session or session,
+                organization_ids,
+                start_timestamp=start_timestamp,
+                end_timestamp=end_timestamp,
+                interval=interval,
+                product_id=product_id,
+                product_price_type=product_price_type,
+            )
+
+        return await self._get_cached_columns(
+            session,
+            redis,
+            organization_ids,
+            read_session=read_session,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            interval=interval,
+            product_id=product_id,
+            product_price_type=product_price_type,
+        )
+
+    async def _get_cached_columns(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        organization_ids: Sequence[uuid.UUID],
+        *,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        interval: Interval,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_price_type: Sequence[ProductPriceType] | None = None,
+        read_session: AsyncSession | None = None,
+    ) -> MetricsColumns:
+        now = utc_now()
+        if read_session is not None:
+            # A period closed less than the replica lag ago may still miss writes
+            now -= timedelta(seconds=settings.DATABASE_READ_MAX_LAG_SECONDS)
+        open_period_start = interval.truncate(now)
+        key = metrics_cache.get_key(
+            organization_ids,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            interval=interval,
+            open_period_start=open_period_start,
+            product_id=product_id,
+            product_price_type=product_price_type,
+        )
+        generation = await metrics_cache.get_generation(redis, organization_ids)
+
+        cached_closed_periods = await metrics_cache.get_closed_periods(redis, key)
+        if cached_closed_periods is None:
+            columns = await self._query_columns(
+                read_session or session,
+                organization_ids,
+                start_timestamp=start_timestamp,
+                end_timestamp=end_timestamp,
+                interval=interval,
+                product_id=product_id,
+                product_price_type=product_price_type,
+            )
+            closed_count = sum(
+                1
+                for timestamp in columns.timestamps
+                if interval.truncate(timestamp) < open_period_start
+            )
+            closed_columns = columns.slice(0, closed_count)
+            open_columns = columns.slice(closed_count)
+            await metrics_cache.set_closed_periods(
+                redis,
+                key,
+                closed_columns,
+                open_columns.timestamps[0] if open_columns.timestamps else None,
+            )
+            if not open_columns.timestamps:
+                return columns
+
+            # The replica may lag behind: recompute the open periods on the primary
+            if read_session is not None:
+                open_columns = await self._query_columns(
+                    session,
+                    organization_ids,
+                    start_timestamp=open_columns.timestamps[0],
+                    end_timestamp=end_timestamp,
+                    interval=interval,
+                    product_id=product_id,
+                    product_price_type=product_price_type,
+                )
+            await metrics_cache.set_open_periods(redis, key, generation, open_columns)
+            return closed_columns.concat(open_columns)
+
+        next_timestamp = cached_closed_periods.next_timestamp
+        if next_timestamp is None:
+            return cached_closed_periods.columns
+
+        cached_open_columns = await metrics_cache.get_open_periods(
+            redis, key, generation
+        )
+        if cached_open_columns is None:
+            # Continue the series from the first open timestamp,
+            # so we get the exact same timestamps as a full computation.
+            cached_open_columns = await self._query_columns(
+                session,
+                organization_ids,
+                start_timestamp=next_timestamp,
+                end_timestamp=end_timestamp,
+                interval=interval,
+                product_id=product_id,
+                product_price_type=product_price_type,
+            )
+            await metrics_cache.set_open_periods(
+                redis, key, generation, cached_open_columns
+            )
+
+        return cached_closed_periods.columns.concat(cached_open_columns)
+
+    async def _query_columns(
+        self,
+        session: AsyncSession,
+        organization_ids: Sequence[uuid.UUID],
+        *,
+        start_timestamp: datetime,
+        end_timestamp: datetime,
+        interval: Interval,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_price_type: Sequence[ProductPriceType] | None = None,
+    ) -> MetricsColumns:
         timestamp_series = get_timestamp_series_cte(
             start_timestamp, end_timestamp, interval
         )
@@ -43,9 +265,8 @@ class MetricsService:
             query(
                 timestamp_series,
                 interval,
-                auth_subject,
+                organization_ids,
                 METRICS,
-                organization_id=organization_id,
                 product_id=product_id,
                 product_price_type=product_price_type,
             )
@@ -62,19 +283,54 @@ class MetricsService:
         statement = (
             select(
                 timestamp_column.label("timestamp"),
-                *queries,
+                *(
+                    column
+                    for query in queries
+                    for column in query.c
+                    if column.name != "timestamp"
+                ),
             )
             .select_from(from_query)
             .order_by(timestamp_column.asc())
         )
 
-        result = await session.stream(statement)
-        periods: list[MetricsPeriod] = []
-        async for row in result:
-            periods.append(MetricsPeriod(**row._asdict()))
-        return MetricsResponse.model_validate(
-            {"periods": periods, "metrics": {m.slug: m for m in METRICS}}
+        result = await session.execute(statement)
+        keys = list(result.keys())
+        # Transpose the rows into columns
+        columns = list(zip(*result.all())) or [() for _ in keys]
+        data = dict(zip(keys, columns))
+        timestamps = data.pop("timestamp")
+        return MetricsColumns(
+            timestamps=list(timestamps),
+            values={slug: list(values) for slug, values in data.items()},
         )
 
+    async def _get_organization_ids(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        organization_id: Sequence[uuid.UUID] | None = None,
+    ) -> list[uuid.UUID]:
+        """
+        Resolve the organizations the metrics are computed on.
+
+        The queries filter on this list, and it's used as the cache scope,
+        so members of the same organization share the same cache entries.
+        """
+        organization_ids: set[uuid.UUID] = set()
+        if is_user(auth_subject):
+            organization_ids = set(
+                await user_organization_service.get_organization_ids(
+                    session, auth_subject.subject.id
+                )
+            )
+        elif is_organization(auth_subject):
+            organization_ids = {auth_subject.subject.id}
+
+        if organization_id is not None:
+            organization_ids &= set(organization_id)
+
+        return sorted(organization_ids)
+
 
 metrics = MetricsService()
@@ -0,0 +1,12 @@
+import uuid
+
+from polar.worker import JobContext, PolarWorkerContext, get_worker_redis, task
+
+from .cache import metrics_cache
+
+
+@task("metrics.invalidate_organization")
+async def invalidate_organization(
+    ctx: JobContext, organization_id: uuid.UUID, polar_context: PolarWorkerContext
+) -> None:
+    await metrics_cache.invalidate(get_worker_redis(ctx), organization_id)
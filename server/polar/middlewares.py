@@ -1,12 +1,25 @@
 import functools
+import math
 import re
 
 import structlog
 from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from polar.auth.cache import collect_invalidations, publish_invalidations
 from polar.config import settings
+from polar.kit.db.pool import InstrumentedAsyncAdaptedQueuePool
+from polar.kit.db.query_stats import (
+    QueryBudgetExceeded,
+    get_query_budget,
+    record_query_stats,
+)
 from polar.logging import Logger, generate_correlation_id
+from polar.product.cache import (
+    collect_snapshot_invalidations,
+    publish_snapshot_invalidations,
+)
 from polar.worker import flush_enqueued_jobs
 
 
@@ -40,6 +53,167 @@ class FlushEnqueuedWorkerJobsMiddleware:
             await flush_enqueued_jobs(scope["state"]["arq_pool"])
 
 
+class PublishAuthCacheInvalidationsMiddleware:
+    """
+    Tell other processes to drop the auth cache entries invalidated during the request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with collect_invalidations() as invalidations:
+            await self.app(scope, receive, send)
+
+        # The Redis client lives in the lifespan state, which is absent in tests
+        redis = scope.get("state", {}).get("redis")
+        if invalidations and redis is not None:
+            await publish_invalidations(redis, invalidations)
+
+
+class PublishProductSnapshotInvalidationsMiddleware:
+    """
+    Tell other processes to drop the product snapshots invalidated during the request.
+
+    It runs once the request session is committed, so the processes
+    rebuilding their snapshot see the changes.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with collect_snapshot_invalidations() as invalidations:
+            await self.app(scope, receive, send)
+
+        # The Redis client lives in the lifespan state, which is absent in tests
+        redis = scope.get("state", {}).get("redis")
+        if invalidations and redis is not None:
+            await publish_snapshot_invalidations(redis, invalidations)
+
+
+class QueryStatsMiddleware:
+    """
+    Count the SQL statements executed by each request and their total duration.
+
+    * In development, statements repeated many times are reported as N+1 patterns.
+    * Requests going over the query budget of their endpoint fail in tests,
+    and are logged otherwise.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.logger: Logger = structlog.get_logger()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with record_query_stats() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    self._check_budget(scope, stats.count)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if stats.count == 0:
+            return
+
+        route = self._get_route(scope)
+        self.logger.debug(
+            "QueryStatsMiddleware.stats",
+            route=route,
+            queries=stats.count,
+            db_time=stats.duration,
+        )
+
+        if settings.is_development():
+            for statement, count in stats.get_repeated_statements():
+                self.logger.warning(
+                    "QueryStatsMiddleware.n_plus_one",
+                    route=route,
+                    count=count,
+                    statement=statement,
+                )
+
+    def _check_budget(self, scope: Scope, count: int) -> None:
+        budget = get_query_budget(scope.get("endpoint"))
+        if budget is None or count <= budget:
+            return
+
+        route = self._get_route(scope)
+        if settings.is_testing():
+            raise QueryBudgetExceeded(route, count, budget)
+        self.logger.warning(
+            "QueryStatsMiddleware.budget_exceeded",
+            route=route,
+            queries=count,
+            budget=budget,
+        )
+
+    def _get_route(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            return scope["path"]
+        return route.path
+
+
+class DatabaseAdmissionControlMiddleware:
+    """
+    Reject requests early when the database pool is overloaded.
+
+    If the expected wait for a connection exceeds `max_expected_wait` seconds,
+    we immediately return a 503 with a `Retry-After` header,
+    instead of letting requests queue until they time out.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_expected_wait: float,
+        excluded_paths: tuple[str, ...] = ("/healthz",),
+    ) -> None:
+        self.app = app
+        self.max_expected_wait = max_expected_wait
+        self.excluded_paths = excluded_paths
+        self.logger: Logger = structlog.get_logger()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            return await self.app(scope, receive, send)
+
+        engine = scope.get("state", {}).get("async_engine")
+        pool = engine.sync_engine.pool if engine is not None else None
+        if isinstance(pool, InstrumentedAsyncAdaptedQueuePool):
+            expected_wait = pool.get_expected_wait_time()
+            if expected_wait > self.max_expected_wait:
+                self.logger.warning(
+                    "DatabaseAdmissionControlMiddleware.rejected",
+                    expected_wait=expected_wait,
+                    checked_out=pool.checkedout(),
+                    waiting=pool.waiting,
+                )
+                response = JSONResponse(
+                    status_code=503,
+                    content={
+                        "error": "ServiceUnavailable",
+                        "detail": "The service is overloaded. Please retry later.",
+                    },
+                    headers={"Retry-After": str(math.ceil(expected_wait))},
+                )
+                return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+
 class PathRewriteMiddleware:
     def __init__(
         self, app: ASGIApp, pattern: str | re.Pattern[str], replacement: str
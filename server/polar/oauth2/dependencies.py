@@ -4,11 +4,15 @@ from fastapi import Depends, Request
 from fastapi.security import OpenIdConnect
 from fastapi.security.utils import get_authorization_scheme_param
 
+from polar.auth.cache import TokenIdentity, oauth2_token_cache
 from polar.auth.scope import SCOPES_SUPPORTED
+from polar.config import settings
 from polar.exceptions import Unauthorized
+from polar.kit.crypto import get_token_hash
 from polar.kit.db.postgres import SyncSessionMaker
 from polar.models import OAuth2Token
 from polar.postgres import AsyncSession, get_db_session
+from polar.redis import Redis, get_redis
 
 from .authorization_server import AuthorizationServer
 from .exceptions import InvalidTokenError
@@ -33,6 +37,24 @@ async def get_optional_token(
     return token, True
 
 
+async def get_optional_token_identity(
+    authorization: str = Depends(openid_scheme),
+    session: AsyncSession = Depends(get_db_session),
+    redis: Redis = Depends(get_redis),
+) -> tuple[TokenIdentity | None, bool]:
+    scheme, access_token = get_authorization_scheme_param(authorization)
+    if not authorization or scheme.lower() != "bearer":
+        return None, False
+
+    identity = await oauth2_token_cache.get(
+        session,
+        redis,
+        get_token_hash(access_token, secret=settings.SECRET),
+        lambda s: oauth2_token_service.get_by_access_token(s, access_token),
+    )
+    return identity, True
+
+
 async def get_token(
     credentials: tuple[OAuth2Token | None, bool] = Depends(get_optional_token),
 ) -> OAuth2Token:
@@ -4,7 +4,12 @@ from fastapi import Depends, Path, Query
 from pydantic import UUID4
 
 from polar.exceptions import ResourceNotFound
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorListResource,
+    CursorPaginationParamsQuery,
+    ListResource,
+    PaginationParamsQuery,
+)
 from polar.kit.schemas import MultipleQueryFilter
 from polar.models import Order
 from polar.models.product_price import ProductPriceType
@@ -71,6 +76,58 @@ async def list(
     )
 
 
+@router.get(
+    "/cursor",
+    summary="List Orders by Cursor",
+    response_model=CursorListResource[OrderSchema],
+)
+async def list_cursor(
+    auth_subject: auth.OrdersRead,
+    pagination: CursorPaginationParamsQuery,
+    sorting: sorting.ListSorting,
+    organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
+        None, title="OrganizationID Filter", description="Filter by organization ID."
+    ),
+    product_id: MultipleQueryFilter[ProductID] | None = Query(
+        None, title="ProductID Filter", description="Filter by product ID."
+    ),
+    product_price_type: MultipleQueryFilter[ProductPriceType] | None = Query(
+        None,
+        title="ProductPriceType Filter",
+        description=(
+            "Filter by product price type. "
+            "`recurring` will return orders corresponding "
+            "to subscriptions creations or renewals. "
+            "`one_time` will return orders corresponding to one-time purchases."
+        ),
+    ),
+    user_id: MultipleQueryFilter[UUID4] | None = Query(
+        None, title="UserID Filter", description="Filter by customer's user ID."
+    ),
+    session: AsyncSession = Depends(get_db_session),
+) -> CursorListResource[OrderSchema]:
+    """
+    List orders using cursor pagination.
+
+    Unlike page-based pagination, fetching a page costs the same
+    no matter how deep it is, which makes it suitable to iterate over all orders.
+    """
+    results, next_cursor = await order_service.list_cursor(
+        session,
+        auth_subject,
+        organization_id=organization_id,
+        product_id=product_id,
+        product_price_type=product_price_type,
+        user_id=user_id,
+        pagination=pagination,
+        sorting=sorting,
+    )
+
+    return CursorListResource.from_cursor_paginated_results(
+        [OrderSchema.model_validate(result) for result in results], next_cursor
+    )
+
+
 @router.get(
     "/{id}",
     summary="Get Order",
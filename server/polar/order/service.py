@@ -1,3 +1,4 @@
+import builtins
 import uuid
 from collections.abc import Sequence
 from datetime import datetime
@@ -20,7 +21,12 @@ from polar.integrations.stripe.schemas import ProductType
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_expandable_id
 from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import (
+    CursorPaginationParams,
+    PaginationParams,
+    paginate,
+    paginate_cursor,
+)
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.logging import Logger
@@ -33,7 +39,6 @@ from polar.models import (
     ProductPrice,
     Subscription,
     User,
-    UserOrganization,
 )
 from polar.models.order import OrderBillingReason
 from polar.models.product_price import ProductPriceType
@@ -59,6 +64,9 @@ from polar.transaction.service.platform_fee import (
 )
 from polar.user.schemas.user import UserSignupAttribution
 from polar.user.service.user import user as user_service
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 from polar.webhook.service import webhook as webhook_service
 from polar.webhook.webhooks import WebhookTypeObject
 from polar.worker import enqueue_job
@@ -151,51 +159,44 @@ class OrderService(ResourceServiceReader[Order]):
             (OrderSortProperty.created_at, True)
         ],
     ) -> tuple[Sequence[Order], int]:
-        statement = self._get_readable_order_statement(auth_subject)
-
-        statement = statement.options(
-            joinedload(Order.subscription),
+        statement, _ = await self._get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            product_id=product_id,
+            product_price_type=product_price_type,
+            user_id=user_id,
+            sorting=sorting,
         )
-
-        OrderProductPrice = aliased(ProductPrice)
-        statement = statement.join(
-            OrderProductPrice, onclause=Order.product_price_id == OrderProductPrice.id
-        ).options(contains_eager(Order.product_price.of_type(OrderProductPrice)))
-
-        OrderUser = aliased(User)
-        statement = statement.join(
-            OrderUser, onclause=Order.user_id == OrderUser.id
-        ).options(contains_eager(Order.user.of_type(OrderUser)))
-
-        if organization_id is not None:
-            statement = statement.where(Product.organization_id.in_(organization_id))
-
-        if product_id is not None:
-            statement = statement.where(Order.product_id.in_(product_id))
-
-        if product_price_type is not None:
-            statement = statement.where(OrderProductPrice.type.in_(product_price_type))
-
-        if user_id is not None:
-            statement = statement.where(Order.user_id.in_(user_id))
-
-        order_by_clauses: list[UnaryExpression[Any]] = []
-        for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
-            if criterion == OrderSortProperty.created_at:
-                order_by_clauses.append(clause_function(Order.created_at))
-            elif criterion == OrderSortProperty.amount:
-                order_by_clauses.append(clause_function(Order.amount))
-            elif criterion == OrderSortProperty.user:
-                order_by_clauses.append(clause_function(OrderUser.email))
-            elif criterion == OrderSortProperty.product:
-                order_by_clauses.append(clause_function(Product.name))
-            elif criterion == OrderSortProperty.subscription:
-                order_by_clauses.append(clause_function(Order.subscription_id))
-        statement = statement.order_by(*order_by_clauses)
-
         return await paginate(session, statement, pagination=pagination)
 
+    async def list_cursor(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        product_price_type: Sequence[ProductPriceType] | None = None,
+        user_id: Sequence[uuid.UUID] | None = None,
+        pagination: CursorPaginationParams,
+        sorting: builtins.list[Sorting[OrderSortProperty]] = [
+            (OrderSortProperty.created_at, True)
+        ],
+    ) -> tuple[Sequence[Order], str | None]:
+        statement, order_by_clauses = await self._get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            product_id=product_id,
+            product_price_type=product_price_type,
+            user_id=user_id,
+            sorting=sorting,
+        )
+        return await paginate_cursor(
+            session, statement, order_by=order_by_clauses, pagination=pagination
+        )
+
     async def get_by_id(
         self,
         session: AsyncSession,
@@ -203,7 +204,7 @@ class OrderService(ResourceServiceReader[Order]):
         id: uuid.UUID,
     ) -> Order | None:
         statement = (
-            self._get_readable_order_statement(auth_subject)
+            (await self._get_readable_order_statement(session, auth_subject))
             .where(Order.id == id)
             .options(
                 joinedload(Order.user),
@@ -418,6 +419,10 @@ class OrderService(ResourceServiceReader[Order]):
                 order_id=order.id,
             )
 
+        enqueue_job(
+            "metrics.invalidate_organization", organization_id=product.organization_id
+        )
+
         await self._send_webhook(session, order)
 
         return order
@@ -562,8 +567,65 @@ class OrderService(ResourceServiceReader[Order]):
         assert organization is not None
         await webhook_service.send(session, organization, event)
 
-    def _get_readable_order_statement(
-        self, auth_subject: AuthSubject[User | Organization]
+    async def _get_list_statement(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None,
+        product_id: Sequence[uuid.UUID] | None,
+        product_price_type: Sequence[ProductPriceType] | None,
+        user_id: Sequence[uuid.UUID] | None,
+        sorting: builtins.list[Sorting[OrderSortProperty]],
+    ) -> tuple[Select[tuple[Order]], builtins.list[UnaryExpression[Any]]]:
+        """Return the list statement, and its ORDER BY clauses."""
+        statement = await self._get_readable_order_statement(session, auth_subject)
+
+        statement = statement.options(
+            joinedload(Order.subscription),
+        )
+
+        OrderProductPrice = aliased(ProductPrice)
+        statement = statement.join(
+            OrderProductPrice, onclause=Order.product_price_id == OrderProductPrice.id
+        ).options(contains_eager(Order.product_price.of_type(OrderProductPrice)))
+
+        OrderUser = aliased(User)
+        statement = statement.join(
+            OrderUser, onclause=Order.user_id == OrderUser.id
+        ).options(contains_eager(Order.user.of_type(OrderUser)))
+
+        if organization_id is not None:
+            statement = statement.where(Product.organization_id.in_(organization_id))
+
+        if product_id is not None:
+            statement = statement.where(Order.product_id.in_(product_id))
+
+        if product_price_type is not None:
+            statement = statement.where(OrderProductPrice.type.in_(product_price_type))
+
+        if user_id is not None:
+            statement = statement.where(Order.user_id.in_(user_id))
+
+        order_by_clauses: builtins.list[UnaryExpression[Any]] = []
+        for criterion, is_desc in sorting:
+            clause_function = desc if is_desc else asc
+            if criterion == OrderSortProperty.created_at:
+                order_by_clauses.append(clause_function(Order.created_at))
+            elif criterion == OrderSortProperty.amount:
+                order_by_clauses.append(clause_function(Order.amount))
+            elif criterion == OrderSortProperty.user:
+                order_by_clauses.append(clause_function(OrderUser.email))
+            elif criterion == OrderSortProperty.product:
+                order_by_clauses.append(clause_function(Product.name))
+            elif criterion == OrderSortProperty.subscription:
+                order_by_clauses.append(clause_function(Order.subscription_id))
+        statement = statement.order_by(*order_by_clauses)
+
+        return statement, order_by_clauses
+
+    async def _get_readable_order_statement(
+        self, session: AsyncSession, auth_subject: AuthSubject[User | Organization]
     ) -> Select[tuple[Order]]:
         statement = (
             select(Order)
@@ -573,12 +635,10 @@ class OrderService(ResourceServiceReader[Order]):
         )
 
         if is_user(auth_subject):
-            user = auth_subject.subject
             statement = statement.where(
                 Product.organization_id.in_(
-                    select(UserOrganization.organization_id).where(
-                        UserOrganization.user_id == user.id,
-                        UserOrganization.deleted_at.is_(None),
+                    await user_organization_service.get_organization_ids(
+                        session, auth_subject.subject.id
                     )
                 )
             )
@@ -589,8 +649,8 @@ class OrderService(ResourceServiceReader[Order]):
 
         return statement
 
-    def _get_readable_subscription_statement(
-        self, auth_subject: AuthSubject[User | Organization]
+    async def _get_readable_subscription_statement(
+        self, session: AsyncSession, auth_subject: AuthSubject[User | Organization]
     ) -> Select[tuple[Subscription]]:
         statement = (
             select(Subscription)
@@ -600,12 +660,10 @@ class OrderService(ResourceServiceReader[Order]):
         )
 
         if is_user(auth_subject):
-            user = auth_subject.subject
             statement = statement.where(
                 Product.organization_id.in_(
-                    select(UserOrganization.organization_id).where(
-                        UserOrganization.user_id == user.id,
-                        UserOrganization.deleted_at.is_(None),
+                    await user_organization_service.get_organization_ids(
+                        session, auth_subject.subject.id
                     )
                 )
             )
@@ -202,6 +202,11 @@ class OrganizationService(ResourceServiceReader[Organization]):
         res = await session.execute(query)
         return res.scalars().unique().one_or_none()
 
+    def _get_loader_statement(self, ids: Sequence[UUID]) -> Select[tuple[Organization]]:
+        return (
+            super()._get_loader_statement(ids).where(Organization.blocked_at.is_(None))
+        )
+
     async def list_all_orgs_by_user_id(
         self,
         session: AsyncSession,
@@ -1,10 +1,12 @@
 from fastapi import Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from polar.auth.cache import TokenIdentity, personal_access_token_cache
+from polar.config import settings
+from polar.kit.crypto import get_token_hash
 from polar.kit.utils import utc_now
-from polar.models import PersonalAccessToken
 from polar.postgres import AsyncSession, get_db_session
-from polar.worker import enqueue_job
+from polar.redis import Redis, get_redis
 
 from .service import personal_access_token as personal_access_token_service
 
@@ -18,19 +20,21 @@ auth_header_scheme = HTTPBearer(
 async def get_optional_personal_access_token(
     auth_header: HTTPAuthorizationCredentials | None = Depends(auth_header_scheme),
     session: AsyncSession = Depends(get_db_session),
-) -> tuple[PersonalAccessToken | None, bool]:
+    redis: Redis = Depends(get_redis),
+) -> tuple[TokenIdentity | None, bool]:
     if auth_header is None:
         return None, False
 
-    token = await personal_access_token_service.get_by_token(
-        session, auth_header.credentials
+    identity = await personal_access_token_cache.get(
+        session,
+        redis,
+        get_token_hash(auth_header.credentials, secret=settings.SECRET),
+        lambda s: personal_access_token_service.get_by_token(
+            s, auth_header.credentials
+        ),
     )
 
-    if token is not None:
-        enqueue_job(
-            "personal_access_token.record_usage",
-            personal_access_token_id=token.id,
-            last_used_at=utc_now(),
-        )
+    if identity is not None:
+        await personal_access_token_service.record_usage(redis, identity.id, utc_now())
 
-    return token, True
+    return identity, True
@@ -1,9 +1,10 @@
 from collections.abc import Sequence
-from datetime import datetime
+from datetime import UTC, datetime
 from uuid import UUID
 
 import structlog
-from sqlalchemy import Select, or_, select, update
+from redis import ResponseError
+from sqlalchemy import TIMESTAMP, Select, Uuid, column, or_, select, update, values
 from sqlalchemy.orm import joinedload
 
 from polar.auth.models import AuthSubject
@@ -19,6 +20,7 @@ from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.models import PersonalAccessToken, User
 from polar.postgres import AsyncSession
+from polar.redis import Redis
 
 from .schemas import PersonalAccessTokenCreate
 
@@ -26,6 +28,13 @@ log: Logger = structlog.get_logger()
 
 TOKEN_PREFIX = "polar_pat_"
 
+USAGE_KEY = "personal_access_token:usage"
+"""Redis sorted set of the last usage timestamp by token ID, not yet flushed."""
+
+USAGE_FLUSHING_KEY = f"{USAGE_KEY}:flushing"
+
+USAGE_FLUSH_CHUNK_SIZE = 1000
+
 
 class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
     async def list(
@@ -104,14 +113,59 @@ class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
         session.add(personal_access_token)
 
     async def record_usage(
-        self, session: AsyncSession, id: UUID, last_used_at: datetime
+        self, redis: Redis, id: UUID, last_used_at: datetime
     ) -> None:
-        statement = (
-            update(PersonalAccessToken)
-            .where(PersonalAccessToken.id == id)
-            .values(last_used_at=last_used_at)
-        )
-        await session.execute(statement)
+        """
+        Record the usage of a token in Redis, keeping only the latest timestamp.
+
+        They're written to the database in bulk by `flush_usage`.
+        """
+        await redis.zadd(USAGE_KEY, {str(id): last_used_at.timestamp()}, gt=True)
+
+    async def flush_usage(self, session: AsyncSession, redis: Redis) -> int:
+        """
+        Write the usages recorded since the last flush to the database.
+
+        Returns:
+            The number of tokens having a recorded usage.
+        """
+        # If the previous flush failed, retry it before taking the new usages
+        if not await redis.exists(USAGE_FLUSHING_KEY):
+            try:
+                await redis.rename(USAGE_KEY, USAGE_FLUSHING_KEY)
+            except ResponseError:  # No usage since the last flush
+                return 0
+
+        usages = await redis.zrange(USAGE_FLUSHING_KEY, 0, -1, withscores=True)
+        for i in range(0, len(usages), USAGE_FLUSH_CHUNK_SIZE):
+            usage = values(
+                column("id", Uuid),
+                column("last_used_at", TIMESTAMP(timezone=True)),
+                name="usage",
+            ).data(
+                [
+                    (UUID(id), datetime.fromtimestamp(timestamp, UTC))
+                    for id, timestamp in usages[i : i + USAGE_FLUSH_CHUNK_SIZE]
+                ]
+            )
+            statement = (
+                update(PersonalAccessToken)
+                .where(
+                    PersonalAccessToken.id == usage.c.id,
+                    or_(
+                        PersonalAccessToken.last_used_at.is_(None),
+                        PersonalAccessToken.last_used_at < usage.c.last_used_at,
+                    ),
+                )
+                .values(last_used_at=usage.c.last_used_at)
+                .execution_options(synchronize_session=False)
+            )
+            await session.execute(statement)
+
+        await session.commit()
+        await redis.delete(USAGE_FLUSHING_KEY)
+
+        return len(usages)
 
     async def revoke_leaked(
         self,
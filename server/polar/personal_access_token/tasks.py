@@ -1,19 +1,15 @@
-import uuid
-from datetime import datetime
-
-from polar.worker import AsyncSessionMaker, JobContext, PolarWorkerContext, task
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    JobContext,
+    get_worker_redis,
+    task,
+)
 
 from .service import personal_access_token as personal_access_token_service
 
 
-@task("personal_access_token.record_usage")
-async def record_usage(
-    ctx: JobContext,
-    personal_access_token_id: uuid.UUID,
-    last_used_at: datetime,
-    polar_context: PolarWorkerContext,
-) -> None:
+@task("personal_access_token.flush_usage", cron_trigger=CronTrigger(second=0))
+async def flush_usage(ctx: JobContext) -> None:
     async with AsyncSessionMaker(ctx) as session:
-        await personal_access_token_service.record_usage(
-            session, personal_access_token_id, last_used_at
-        )
+        await personal_access_token_service.flush_usage(session, get_worker_redis(ctx))
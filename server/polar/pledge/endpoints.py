@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, Query
@@ -13,6 +14,7 @@ from polar.kit.pagination import ListResource, Pagination
 from polar.models.issue import Issue
 from polar.models.pledge import Pledge
 from polar.models.user import User
+from polar.models.user_organization import UserOrganization
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.organization.service import organization as organization_service
@@ -41,105 +43,46 @@ from .service import pledge as pledge_service
 router = APIRouter(tags=["pledges", APITag.private])
 
 
-async def include_receiver_admin_fields(
-    session: AsyncSession,
-    subject: Subject,
-    pledge: Pledge,
-) -> bool:
-    if not isinstance(subject, User):
-        return False
-
-    if not subject.id:
-        return False
-
-    # is member of receiver org
-    if pledge.organization_id:
-        m = await user_organization_service.get_by_user_and_org(
-            session, subject.id, pledge.organization_id
-        )
-        if m:
-            return True
-
-    return False
-
-
-async def include_sender_admin_fields(
-    session: AsyncSession,
-    subject: Subject,
-    pledge: Pledge,
-) -> bool:
-    if not isinstance(subject, User):
-        return False
-
-    if not subject.id:
-        return False
-
-    # if is sender
-    if pledge.by_user_id == subject.id:
-        return True
-
-    # is member of sending org
-    if pledge.by_organization_id:
-        m = await user_organization_service.get_by_user_and_org(
-            session, subject.id, pledge.by_organization_id
-        )
-        if m:
-            return True
-
-    if pledge.on_behalf_of_organization_id:
-        m = await user_organization_service.get_by_user_and_org(
-            session, subject.id, pledge.on_behalf_of_organization_id
-        )
-        if m:
-            return True
-
-    return False
-
+def to_schema_from_memberships(
+    subject: Subject, p: Pledge, memberships: Sequence[UserOrganization]
+) -> PledgeSchema:
+    """
+    Serialize a pledge for the subject, given the subject memberships.
 
-async def include_sender_fields(
-    session: AsyncSession,
-    subject: Subject,
-    pledge: Pledge,
-) -> bool:
+    Useful to serialize many pledges without querying the memberships for each.
+    """
     if not isinstance(subject, User):
-        return False
-
-    if not subject.id:
-        return False
-
-    # if is sender
-    if pledge.by_user_id == subject.id:
-        return True
-
-    # is member if sending org
-    if pledge.by_organization_id:
-        if await user_organization_service.get_by_user_and_org(
-            session, subject.id, pledge.by_organization_id
-        ):
-            return True
+        return PledgeSchema.from_db(p)
 
-    if pledge.on_behalf_of_organization_id:
-        if await user_organization_service.get_by_user_and_org(
-            session, subject.id, pledge.on_behalf_of_organization_id
-        ):
-            return True
+    member_organization_ids = {m.organization_id for m in memberships}
 
-    return False
+    # is member of receiver org
+    is_receiver = p.organization_id in member_organization_ids
 
+    # is sender or member of sending org
+    is_sender = (
+        p.by_user_id == subject.id
+        or p.by_organization_id in member_organization_ids
+        or p.on_behalf_of_organization_id in member_organization_ids
+    )
 
-async def to_schema(session: AsyncSession, subject: Subject, p: Pledge) -> PledgeSchema:
     return PledgeSchema.from_db(
         p,
-        include_receiver_admin_fields=await include_receiver_admin_fields(
-            session, subject, p
-        ),
-        include_sender_admin_fields=await include_sender_admin_fields(
-            session, subject, p
-        ),
-        include_sender_fields=await include_sender_fields(session, subject, p),
+        include_receiver_admin_fields=is_receiver,
+        include_sender_admin_fields=is_sender,
+        include_sender_fields=is_sender,
     )
 
 
+async def to_schema(session: AsyncSession, subject: Subject, p: Pledge) -> PledgeSchema:
+    memberships: Sequence[UserOrganization] = []
+    if isinstance(subject, User):
+        memberships = await user_organization_service.list_by_user_id(
+            session, subject.id
+        )
+    return to_schema_from_memberships(subject, p, memberships)
+
+
 @router.get(
     "/pledges/search",
     response_model=ListResource[PledgeSchema],
@@ -238,8 +181,7 @@ async def search(
 
     items = [
         await to_schema(session, auth_subject.subject, p)
-        for p in pledges
-        if await authz.can(auth_subject.subject, AccessType.read, p)
+        for p in await authz.filter_readable(auth_subject.subject, pledges)
     ]
 
     return ListResource(
@@ -9,6 +9,9 @@ from polar.kit.db.postgres import (
     AsyncSession,
     AsyncSessionMaker,
     Engine,
+    ReadReplica,
+    create_async_sessionmaker,
+    release_connection,
     sql,
 )
 from polar.kit.db.postgres import (
@@ -31,6 +34,33 @@ def create_async_engine(process_name: ProcessName) -> AsyncEngine:
     )
 
 
+def create_async_read_engine(process_name: ProcessName) -> AsyncEngine | None:
+    """Create an engine bound to the read replica, if one is configured."""
+    dsn = settings.get_postgres_read_dsn("asyncpg")
+    if dsn is None:
+        return None
+    return _create_async_engine(
+        dsn=dsn,
+        application_name=f"{settings.ENV.value}.{process_name}.read",
+        debug=settings.DEBUG,
+        pool_size=settings.DATABASE_READ_POOL_SIZE,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+    )
+
+
+def create_read_replica(
+    async_sessionmaker: AsyncSessionMaker, async_read_engine: AsyncEngine | None
+) -> ReadReplica:
+    return ReadReplica(
+        async_sessionmaker,
+        create_async_sessionmaker(async_read_engine)
+        if async_read_engine is not None
+        else None,
+        max_lag=settings.DATABASE_READ_MAX_LAG_SECONDS,
+        lag_check_interval=settings.DATABASE_READ_LAG_CHECK_INTERVAL_SECONDS,
+    )
+
+
 def create_sync_engine(process_name: ProcessName) -> Engine:
     return _create_sync_engine(
         dsn=str(settings.get_postgres_dsn("psycopg2")),
@@ -65,6 +95,10 @@ async def get_db_session(
     key which include the security scopes. So, we ended up with multiple sessions.
 
     Ref: https://github.com/tiangolo/fastapi/discussions/8421
+
+    The session only acquires a connection from the pool when it runs
+    its first query. Use `release_connection` to give it back before long
+    external calls.
     """
     if session := getattr(request.state, "session", None):
         yield session
@@ -80,11 +114,48 @@ async def get_db_session(
                 await session.commit()
 
 
+async def get_db_read_sessionmaker(
+    request: Request,
+) -> AsyncGenerator[AsyncSessionMaker, None]:
+    """
+    Return a sessionmaker bound to the read replica,
+    or to the primary if the replica is not configured or lagging.
+
+    Only use it for endpoints which don't write anything and can tolerate
+    slightly stale data.
+    """
+    read_replica: ReadReplica = request.state.read_replica
+    yield await read_replica.get_sessionmaker()
+
+
+async def get_db_read_session(
+    request: Request,
+    sessionmaker: AsyncSessionMaker = Depends(get_db_read_sessionmaker),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Generates a new read-only session for the request.
+
+    Like `get_db_session`, we store it in the request state
+    to only have one per request. It's never committed.
+    """
+    if session := getattr(request.state, "read_session", None):
+        yield session
+    else:
+        async with sessionmaker() as session:
+            request.state.read_session = session
+            yield session
+
+
 __all__ = [
     "AsyncSession",
     "sql",
     "create_async_engine",
+    "create_async_read_engine",
+    "create_read_replica",
     "create_sync_engine",
     "get_db_session",
     "get_db_sessionmaker",
+    "get_db_read_session",
+    "get_db_read_sessionmaker",
+    "release_connection",
 ]
@@ -0,0 +1,257 @@
+"""
+In-process cache of the products as needed by checkouts: with their organization,
+prices, benefits, medias and attached custom fields.
+
+Each product snapshot is tagged with the product version stored in Redis.
+The version is bumped at the end of the request updating the product,
+once the change is committed, so every process rebuilds its snapshot
+on the next checkout.
+
+Snapshots are detached copies of the objects loaded in the request session
+on a cache miss, so they're never attached to, nor modified through, a session.
+A snapshot never replaces the objects of the request session: it only fills
+the relationships the product hasn't loaded yet, reusing the objects
+already in the session.
+
+Updating or deleting a custom field bumps the version of the products
+it's attached to. Changes to the organization or the medias files
+don't bump the version: they're picked up when the snapshot expires.
+"""
+
+import contextlib
+import contextvars
+import copy
+import dataclasses
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from typing import Any, TypeVar, cast
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import joinedload, make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from polar.kit.db.models import RecordModel
+from polar.models import Product
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker import enqueue_job
+
+PRODUCT_SNAPSHOT_TTL_SECONDS = 300
+PRODUCT_SNAPSHOT_CACHE_MAXSIZE = 10_000
+
+_SNAPSHOT_RELATIONSHIPS = (
+    "organization",
+    "prices",
+    "product_medias",
+    "attached_custom_fields",
+)
+
+M = TypeVar("M", bound=RecordModel)
+
+
+def _get_version_key(product_id: uuid.UUID) -> str:
+    return f"product:snapshot:version:{product_id}"
+
+
+@dataclasses.dataclass
+class _Snapshot:
+    product: Product
+    version: str
+    expires_at: float
+
+
+class ProductSnapshotCache:
+    def __init__(self, *, maxsize: int = PRODUCT_SNAPSHOT_CACHE_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self._snapshots: OrderedDict[uuid.UUID, _Snapshot] = OrderedDict()
+
+    async def load(self, session: AsyncSession, redis: Redis, product: Product) -> bool:
+        """
+        Load the checkout data of `product` from its snapshot.
+
+        Only the relationships not loaded yet are set, with the objects already
+        in the session or the snapshot ones merged without loading.
+        A cache hit costs a single Redis round trip and no query.
+        On a miss, they're loaded in the request session and snapshotted.
+
+        Returns `False` if the product doesn't exist anymore.
+        """
+        version = await redis.get(_get_version_key(product.id)) or "0"
+
+        snapshot = self._get_snapshot(product.id, version)
+        if snapshot is None:
+            # Keep the pending changes pending, so they're not snapshotted
+            with session.no_autoflush:
+                loaded = await self._load(session, product.id)
+            if loaded is None:
+                self._snapshots.pop(product.id, None)
+                return False
+            self._set_snapshot(session, loaded, version)
+            return True
+
+        unloaded = inspect(product).unloaded
+        for key in _SNAPSHOT_RELATIONSHIPS:
+            if key not in unloaded:
+                continue
+            value = getattr(snapshot, key)
+            if isinstance(value, list):
+                value = [await self._attach(session, item) for item in value]
+            else:
+                value = await self._attach(session, value)
+            set_committed_value(product, key, value)
+
+        return True
+
+    def evict(self, product_id: uuid.UUID) -> None:
+        self._snapshots.pop(product_id, None)
+
+    def invalidate(self, product_id: uuid.UUID) -> None:
+        """
+        Invalidate the snapshots of a product in every process.
+
+        The local snapshot is evicted right away. The version is bumped at the end
+        of the request: bumping it before the commit would let another process
+        snapshot the previous state under the new version.
+        Outside of a request, it's bumped by a background job.
+        """
+        self.evict(product_id)
+
+        invalidations = _invalidations.get()
+        if invalidations is not None:
+            invalidations.add(product_id)
+        else:
+            enqueue_job("product.invalidate_snapshot", product_id=product_id)
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+    def _get_snapshot(self, product_id: uuid.UUID, version: str) -> Product | None:
+        snapshot = self._snapshots.get(product_id)
+        if (
+            snapshot is None
+            or snapshot.version != version
+            or snapshot.expires_at <= time.monotonic()
+        ):
+            return None
+        self._snapshots.move_to_end(product_id)
+        return snapshot.product
+
+    def _set_snapshot(
+        self, session: AsyncSession, product: Product, version: str
+    ) -> None:
+        copies: dict[int, tuple[Any, Any]] = {}
+        snapshot = _copy_detached(product, copies)
+
+        if not all(_is_snapshottable(session, obj) for obj, _ in copies.values()):
+            return
+
+        self._snapshots[product.id] = _Snapshot(
+            product=snapshot,
+            version=version,
+            expires_at=time.monotonic() + PRODUCT_SNAPSHOT_TTL_SECONDS,
+        )
+        self._snapshots.move_to_end(product.id)
+        if len(self._snapshots) > self.maxsize:
+            self._snapshots.popitem(last=False)
+
+    async def _attach(self, session: AsyncSession, obj: M) -> M:
+        key = inspect(obj).key
+        assert key is not None
+        existing = session.identity_map.get(key)
+        if existing is not None:
+            return cast(M, existing)
+        return await session.merge(obj, load=False)
+
+    async def _load(
+        self, session: AsyncSession, product_id: uuid.UUID
+    ) -> Product | None:
+        statement = (
+            select(Product)
+            .where(Product.id == product_id, Product.deleted_at.is_(None))
+            .options(
+                joinedload(Product.organization),
+                selectinload(Product.product_medias),
+                selectinload(Product.attached_custom_fields),
+            )
+        )
+        result = await session.execute(statement)
+        return result.unique().scalar_one_or_none()
+
+
+def _is_snapshottable(session: AsyncSession, obj: Any) -> bool:
+    state = inspect(obj)
+    # Changes that may not be committed
+    if state.modified or obj in session.new:
+        return False
+    # Expired or deferred columns: they'd be lazy loaded from the snapshot
+    unloaded = state.unloaded
+    return not any(attr.key in unloaded for attr in state.mapper.column_attrs)
+
+
+def _copy_detached(obj: M, copies: dict[int, tuple[Any, Any]]) -> M:
+    """
+    Copy `obj`, and the relationships it has loaded, into detached objects.
+
+    `copies` maps the originals already copied to their copy, by `id()`,
+    so the objects shared in the graph are only copied once.
+    """
+    existing = copies.get(id(obj))
+    if existing is not None:
+        return cast(M, existing[1])
+
+    state = inspect(obj)
+    mapper = state.mapper
+    obj_copy = mapper.class_manager.new_instance()
+    copies[id(obj)] = (obj, obj_copy)
+
+    unloaded = state.unloaded
+    for column_attr in mapper.column_attrs:
+        if column_attr.key not in unloaded:
+            value = copy.deepcopy(getattr(obj, column_attr.key))
+            set_committed_value(obj_copy, column_attr.key, value)
+
+    for relationship in mapper.relationships:
+        if relationship.key in unloaded:
+            continue
+        value = getattr(obj, relationship.key)
+        if isinstance(value, list):
+            value = [_copy_detached(item, copies) for item in value]
+        elif relationship.uselist:
+            continue
+        elif value is not None:
+            value = _copy_detached(value, copies)
+        set_committed_value(obj_copy, relationship.key, value)
+
+    make_transient_to_detached(obj_copy)
+    return cast(M, obj_copy)
+
+
+product_snapshot_cache = ProductSnapshotCache()
+
+
+_invalidations = contextvars.ContextVar[set[uuid.UUID] | None](
+    "polar_product_snapshot_invalidations", default=None
+)
+
+
+@contextlib.contextmanager
+def collect_snapshot_invalidations() -> Iterator[set[uuid.UUID]]:
+    """Collect the products invalidated in this context, to publish them after."""
+    invalidations: set[uuid.UUID] = set()
+    token = _invalidations.set(invalidations)
+    try:
+        yield invalidations
+    finally:
+        _invalidations.reset(token)
+
+
+async def publish_snapshot_invalidations(
+    redis: Redis, product_ids: Iterable[uuid.UUID]
+) -> None:
+    """Bump the version of the products, so every process drops their snapshot."""
+    async with redis.pipeline() as pipe:
+        for product_id in product_ids:
+            pipe.incr(_get_version_key(product_id))
+        await pipe.execute()
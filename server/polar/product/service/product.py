@@ -26,7 +26,6 @@ from polar.models import (
     ProductMedia,
     ProductPrice,
     User,
-    UserOrganization,
 )
 from polar.models.product_custom_field import ProductCustomField
 from polar.models.product_price import (
@@ -38,10 +37,14 @@ from polar.models.product_price import (
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.organization.resolver import get_payload_organization
 from polar.organization.service import organization as organization_service
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 from polar.webhook.service import webhook as webhook_service
 from polar.webhook.webhooks import WebhookTypeObject
 from polar.worker import enqueue_job
 
+from ..cache import product_snapshot_cache
 from ..schemas import (
     ExistingProductPrice,
     ProductCreate,
@@ -72,7 +75,9 @@ class ProductService(ResourceServiceReader[Product]):
             (ProductSortProperty.created_at, True)
         ],
     ) -> tuple[Sequence[Product], int]:
-        statement = self._get_readable_product_statement(auth_subject).join(
+        statement = (
+            await self._get_readable_product_statement(session, auth_subject)
+        ).join(
             ProductPrice,
             onclause=(
                 ProductPrice.id
@@ -195,7 +200,7 @@ class ProductService(ResourceServiceReader[Product]):
         id: uuid.UUID,
     ) -> Product | None:
         statement = (
-            self._get_readable_product_statement(auth_subject)
+            (await self._get_readable_product_statement(session, auth_subject))
             .where(Product.id == id, Product.deleted_at.is_(None))
             .options(
                 contains_eager(Product.organization),
@@ -610,8 +615,8 @@ class ProductService(ResourceServiceReader[Product]):
 
         return product
 
-    def _get_readable_product_statement(
-        self, auth_subject: AuthSubject[User | Organization]
+    async def _get_readable_product_statement(
+        self, session: AsyncSession, auth_subject: AuthSubject[User | Organization]
     ) -> Select[tuple[Product]]:
         statement = (
             select(Product)
@@ -624,12 +629,10 @@ class ProductService(ResourceServiceReader[Product]):
         )
 
         if is_user(auth_subject):
-            user = auth_subject.subject
             statement = statement.where(
                 Product.organization_id.in_(
-                    select(UserOrganization.organization_id).where(
-                        UserOrganization.user_id == user.id,
-                        UserOrganization.deleted_at.is_(None),
+                    await user_organization_service.get_organization_ids(
+                        session, auth_subject.subject.id
                     )
                 )
             )
@@ -654,6 +657,8 @@ class ProductService(ResourceServiceReader[Product]):
     async def _after_product_updated(
         self, session: AsyncSession, product: Product
     ) -> None:
+        # Checkouts use a cached snapshot of the product
+        product_snapshot_cache.invalidate(product.id)
         await self._send_webhook(session, product, WebhookEventType.product_updated)
 
     async def _send_webhook(
@@ -7,7 +7,10 @@ from polar.auth.models import AuthSubject, is_organization, is_user
 from polar.exceptions import PolarError
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.services import ResourceServiceReader
-from polar.models import Organization, Product, ProductPrice, User, UserOrganization
+from polar.models import Organization, Product, ProductPrice, User
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 
 
 class ProductPriceError(PolarError): ...
@@ -55,12 +58,10 @@ class ProductPriceService(ResourceServiceReader[ProductPrice]):
             )
         )
         if is_user(auth_subject):
-            user = auth_subject.subject
             statement = statement.where(
                 Product.organization_id.in_(
-                    select(UserOrganization.organization_id).where(
-                        UserOrganization.user_id == user.id,
-                        UserOrganization.deleted_at.is_(None),
+                    await user_organization_service.get_organization_ids(
+                        session, auth_subject.subject.id
                     )
                 )
             )
@@ -0,0 +1,12 @@
+import uuid
+
+from polar.worker import JobContext, PolarWorkerContext, get_worker_redis, task
+
+from .cache import publish_snapshot_invalidations
+
+
+@task("product.invalidate_snapshot")
+async def invalidate_snapshot(
+    ctx: JobContext, product_id: uuid.UUID, polar_context: PolarWorkerContext
+) -> None:
+    await publish_snapshot_invalidations(get_worker_redis(ctx), {product_id})
@@ -4,7 +4,7 @@ from polar.exceptions import ResourceNotFound
 from polar.kit.pagination import PaginationParams
 from polar.models import Product
 from polar.openapi import APITag
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_read_session
 from polar.routing import APIRouter
 
 from .schemas import Storefront
@@ -24,7 +24,9 @@ OrganizationNotFound = {
     response_model=Storefront,
     responses={404: OrganizationNotFound},
 )
-async def get(slug: str, session: AsyncSession = Depends(get_db_session)) -> Storefront:
+async def get(
+    slug: str, session: AsyncSession = Depends(get_db_read_session)
+) -> Storefront:
     """Get an organization storefront by slug."""
     organization = await storefront_service.get(session, slug)
     if organization is None:
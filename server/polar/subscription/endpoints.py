@@ -1,25 +1,30 @@
-from collections.abc import AsyncGenerator
 from typing import Annotated
 
 import structlog
-from fastapi import Depends, Query, Response
-from fastapi.responses import StreamingResponse
-
-from polar.kit.csv import (
-    IterableCSVWriter,
+from fastapi import Depends, Query, Request, Response
+
+from polar.export.schemas import Export, SubscriptionsExportParameters
+from polar.export.service import export as export_service
+from polar.kit.csv import CSVStreamingResponse, accepts_gzip
+from polar.kit.db.postgres import AsyncSessionMaker
+from polar.kit.pagination import (
+    CursorListResource,
+    CursorPaginationParamsQuery,
+    ListResource,
+    PaginationParamsQuery,
 )
-from polar.kit.pagination import ListResource, PaginationParams, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
 from polar.kit.sorting import Sorting, SortingGetter
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_read_sessionmaker, get_db_session
 from polar.product.schemas import ProductID
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
 from .schemas import Subscription as SubscriptionSchema
-from .service import SubscriptionSortProperty
+from .service import SUBSCRIPTIONS_CSV_HEADER, SubscriptionSortProperty
 from .service import subscription as subscription_service
 
 log = structlog.get_logger()
@@ -69,54 +74,90 @@ async def list(
     )
 
 
+@router.get(
+    "/cursor",
+    response_model=CursorListResource[SubscriptionSchema],
+    summary="List Subscriptions by Cursor",
+)
+async def list_cursor(
+    auth_subject: auth.SubscriptionsRead,
+    pagination: CursorPaginationParamsQuery,
+    sorting: SearchSorting,
+    organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
+        None, title="OrganizationID Filter", description="Filter by organization ID."
+    ),
+    product_id: MultipleQueryFilter[ProductID] | None = Query(
+        None, title="ProductID Filter", description="Filter by product ID."
+    ),
+    active: bool | None = Query(
+        None, description="Filter by active or inactive subscription."
+    ),
+    session: AsyncSession = Depends(get_db_session),
+) -> CursorListResource[SubscriptionSchema]:
+    """List subscriptions using cursor pagination."""
+    results, next_cursor = await subscription_service.list_cursor(
+        session,
+        auth_subject,
+        organization_id=organization_id,
+        product_id=product_id,
+        active=active,
+        pagination=pagination,
+        sorting=sorting,
+    )
+
+    return CursorListResource.from_cursor_paginated_results(
+        [SubscriptionSchema.model_validate(result) for result in results],
+        next_cursor,
+    )
+
+
 @router.get("/export", summary="Export Subscriptions")
 async def export(
+    request: Request,
     auth_subject: auth.SubscriptionsRead,
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, description="Filter by organization ID."
     ),
-    session: AsyncSession = Depends(get_db_session),
+    sessionmaker: AsyncSessionMaker = Depends(get_db_read_sessionmaker),
 ) -> Response:
     """Export subscriptions as a CSV file."""
+    return CSVStreamingResponse(
+        subscription_service.stream_export_csv_rows(
+            sessionmaker, auth_subject, organization_id=organization_id
+        ),
+        filename="polar-subscribers.csv",
+        header=SUBSCRIPTIONS_CSV_HEADER,
+        compress=accepts_gzip(request),
+    )
+
 
-    async def create_csv() -> AsyncGenerator[str, None]:
-        csv_writer = IterableCSVWriter(dialect="excel")
-        # CSV header
-        yield csv_writer.getrow(
-            (
-                "Email",
-                "Created At",
-                "Active",
-                "Product",
-                "Price",
-                "Currency",
-                "Interval",
-            )
-        )
-
-        (subscribers, _) = await subscription_service.list(
-            session,
-            auth_subject,
-            organization_id=organization_id,
-            pagination=PaginationParams(limit=1000000, page=1),
-        )
-
-        for sub in subscribers:
-            yield csv_writer.getrow(
-                (
-                    sub.user.email,
-                    sub.created_at.isoformat(),
-                    "true" if sub.active else "false",
-                    sub.product.name,
-                    sub.amount / 100 if sub.amount is not None else "",
-                    sub.currency if sub.currency is not None else "",
-                    sub.recurring_interval,
-                )
-            )
-
-    filename = "polar-subscribers.csv"
-    return StreamingResponse(
-        create_csv(),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+@router.post(
+    "/export",
+    summary="Create Subscriptions Export",
+    response_model=Export,
+    status_code=202,
+)
+async def create_export(
+    auth_subject: auth.SubscriptionsRead,
+    organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
+        None, description="Filter by organization ID."
+    ),
+    redis: Redis = Depends(get_redis),
+) -> Export:
+    """
+    Export subscriptions as a CSV file in the background.
+
+    Poll the returned export until it succeeds to get its download URL.
+    """
+    job = await export_service.create(
+        redis,
+        auth_subject,
+        SubscriptionsExportParameters(
+            organization_id=[id for id in organization_id]
+            if organization_id is not None
+            else None
+        ),
+        filename="polar-subscribers.csv",
+        mime_type="text/csv",
     )
+    return export_service.to_schema(job)
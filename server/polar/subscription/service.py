@@ -1,12 +1,13 @@
+import builtins
 import typing
 import uuid
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Sequence
 from datetime import UTC, date, datetime
 from enum import StrEnum
 from typing import Any, Literal, cast, overload
 
 import stripe as stripe_lib
-from sqlalchemy import Select, UnaryExpression, and_, asc, case, desc, select
+from sqlalchemy import Select, UnaryExpression, asc, case, desc, select
 from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 from polar.auth.models import (
@@ -22,8 +23,13 @@ from polar.enums import SubscriptionRecurringInterval
 from polar.exceptions import PolarError
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_expandable_id
-from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.db.postgres import AsyncSession, AsyncSessionMaker
+from polar.kit.pagination import (
+    CursorPaginationParams,
+    PaginationParams,
+    paginate,
+    paginate_cursor,
+)
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
 from polar.kit.utils import utc_now
@@ -39,7 +45,6 @@ from polar.models import (
     ProductPriceFree,
     Subscription,
     User,
-    UserOrganization,
 )
 from polar.models.subscription import SubscriptionStatus
 from polar.models.webhook_endpoint import WebhookEventType
@@ -54,6 +59,9 @@ from polar.postgres import sql
 from polar.posthog import posthog
 from polar.user.schemas.user import UserSignupAttribution
 from polar.user.service.user import user as user_service
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 from polar.webhook.service import webhook as webhook_service
 from polar.webhook.webhooks import WebhookTypeObject
 from polar.worker import enqueue_job
@@ -61,6 +69,16 @@ from polar.worker import enqueue_job
 from ..product.service.product import product as product_service
 from ..product.service.product_price import product_price as product_price_service
 
+SUBSCRIPTIONS_CSV_HEADER = (
+    "Email",
+    "Created At",
+    "Active",
+    "Product",
+    "Price",
+    "Currency",
+    "Interval",
+)
+
 
 class SubscriptionError(PolarError): ...
 
@@ -178,94 +196,104 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
             (SubscriptionSortProperty.started_at, True)
         ],
     ) -> tuple[Sequence[Subscription], int]:
-        statement = self._get_readable_subscriptions_statement(auth_subject).where(
-            Subscription.started_at.is_not(None)
-        )
-
-        statement = statement.join(Subscription.user).join(
-            Subscription.price, isouter=True
+        statement, _ = await self._get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            product_id=product_id,
+            active=active,
+            sorting=sorting,
         )
 
-        if organization_id is not None:
-            statement = statement.where(Product.organization_id.in_(organization_id))
+        results, count = await paginate(session, statement, pagination=pagination)
 
-        if product_id is not None:
-            statement = statement.where(Product.id.in_(product_id))
+        return results, count
 
-        if active is not None:
-            if active:
-                statement = statement.where(Subscription.active.is_(True))
-            else:
-                statement = statement.where(Subscription.revoked.is_(True))
+    async def list_cursor(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        product_id: Sequence[uuid.UUID] | None = None,
+        active: bool | None = None,
+        pagination: CursorPaginationParams,
+        sorting: builtins.list[Sorting[SubscriptionSortProperty]] = [
+            (SubscriptionSortProperty.started_at, True)
+        ],
+    ) -> tuple[Sequence[Subscription], str | None]:
+        statement, order_by_clauses = await self._get_list_statement(
+            session,
+            auth_subject,
+            organization_id=organization_id,
+            product_id=product_id,
+            active=active,
+            sorting=sorting,
+        )
+        return await paginate_cursor(
+            session, statement, order_by=order_by_clauses, pagination=pagination
+        )
 
-        order_by_clauses: list[UnaryExpression[Any]] = []
-        for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
-            if criterion == SubscriptionSortProperty.user:
-                order_by_clauses.append(clause_function(User.email))
-            if criterion == SubscriptionSortProperty.status:
-                order_by_clauses.append(
-                    clause_function(
-                        case(
-                            (Subscription.status == SubscriptionStatus.incomplete, 1),
-                            (
-                                Subscription.status
-                                == SubscriptionStatus.incomplete_expired,
-                                2,
-                            ),
-                            (Subscription.status == SubscriptionStatus.trialing, 3),
-                            (
-                                Subscription.status == SubscriptionStatus.active,
-                                case(
-                                    (Subscription.cancel_at_period_end.is_(False), 4),
-                                    (Subscription.cancel_at_period_end.is_(True), 5),
-                                ),
-                            ),
-                            (Subscription.status == SubscriptionStatus.past_due, 6),
-                            (Subscription.status == SubscriptionStatus.canceled, 7),
-                            (Subscription.status == SubscriptionStatus.unpaid, 8),
-                        )
+    async def stream_export(
+        self,
+        sessionmaker: AsyncSessionMaker,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Subscription]:
+        """
+        Stream the subscriptions to export through a server-side cursor,
+        fetching `batch_size` rows at a time.
+        """
+        # StreamingResponse is running its own async task to exhaust the iterator,
+        # so we can't rely on the request session.
+        async with sessionmaker() as session:
+            statement = (
+                (
+                    await self._get_readable_subscriptions_statement(
+                        session, auth_subject
                     )
                 )
-            if criterion == SubscriptionSortProperty.started_at:
-                order_by_clauses.append(clause_function(Subscription.started_at))
-            if criterion == SubscriptionSortProperty.current_period_end:
-                order_by_clauses.append(
-                    clause_function(Subscription.current_period_end)
-                )
-            if criterion == SubscriptionSortProperty.amount:
-                order_by_clauses.append(
-                    clause_function(
-                        case(
-                            (
-                                Subscription.recurring_interval
-                                == SubscriptionRecurringInterval.year,
-                                Subscription.amount / 12,
-                            ),
-                            (
-                                Subscription.recurring_interval
-                                == SubscriptionRecurringInterval.month,
-                                Subscription.amount,
-                            ),
-                        )
-                    ).nulls_last()
+                .where(Subscription.started_at.is_not(None))
+                .join(Subscription.user)
+                .order_by(Subscription.started_at.desc())
+                .options(
+                    contains_eager(Subscription.product),
+                    # OAuth accounts are joined by default, which is incompatible with yield_per
+                    contains_eager(Subscription.user).lazyload(User.oauth_accounts),
                 )
-            if criterion == SubscriptionSortProperty.product:
-                order_by_clauses.append(clause_function(Product.name))
-        statement = statement.order_by(*order_by_clauses)
+                .execution_options(yield_per=batch_size)
+            )
 
-        statement = statement.options(
-            contains_eager(Subscription.product).options(
-                selectinload(Product.product_medias),
-                selectinload(Product.attached_custom_fields),
-            ),
-            contains_eager(Subscription.price),
-            contains_eager(Subscription.user),
-        )
+            if organization_id is not None:
+                statement = statement.where(
+                    Product.organization_id.in_(organization_id)
+                )
 
-        results, count = await paginate(session, statement, pagination=pagination)
+            subscriptions = await session.stream_scalars(statement)
+            async for subscription in subscriptions:
+                yield subscription
 
-        return results, count
+    async def stream_export_csv_rows(
+        self,
+        sessionmaker: AsyncSessionMaker,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None = None,
+    ) -> AsyncIterator[tuple[Any, ...]]:
+        async for subscription in self.stream_export(
+            sessionmaker, auth_subject, organization_id=organization_id
+        ):
+            yield (
+                subscription.user.email,
+                subscription.created_at.isoformat(),
+                "true" if subscription.active else "false",
+                subscription.product.name,
+                subscription.amount / 100 if subscription.amount is not None else "",
+                subscription.currency if subscription.currency is not None else "",
+                subscription.recurring_interval,
+            )
 
     async def get_by_stripe_subscription_id(
         self, session: AsyncSession, stripe_subscription_id: str
@@ -482,6 +510,10 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
     async def _after_subscription_created(
         self, session: AsyncSession, subscription: Subscription
     ) -> None:
+        enqueue_job(
+            "metrics.invalidate_organization",
+            organization_id=subscription.product.organization_id,
+        )
         await self._send_webhook(
             session, subscription, WebhookEventType.subscription_created
         )
@@ -577,6 +609,10 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
         previous_status: SubscriptionStatus,
         previous_cancel_at_period_end: bool,
     ) -> None:
+        enqueue_job(
+            "metrics.invalidate_organization",
+            organization_id=subscription.product.organization_id,
+        )
         await self._send_webhook(
             session, subscription, WebhookEventType.subscription_updated
         )
@@ -713,8 +749,106 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
             to_email_addr=user.email, subject=subject, html_content=body
         )
 
-    def _get_readable_subscriptions_statement(
-        self, auth_subject: AuthSubject[User | Organization]
+    async def _get_list_statement(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        organization_id: Sequence[uuid.UUID] | None,
+        product_id: Sequence[uuid.UUID] | None,
+        active: bool | None,
+        sorting: builtins.list[Sorting[SubscriptionSortProperty]],
+    ) -> tuple[Select[tuple[Subscription]], builtins.list[UnaryExpression[Any]]]:
+        """Return the list statement, and its ORDER BY clauses."""
+        statement = (
+            await self._get_readable_subscriptions_statement(session, auth_subject)
+        ).where(Subscription.started_at.is_not(None))
+
+        statement = statement.join(Subscription.user).join(
+            Subscription.price, isouter=True
+        )
+
+        if organization_id is not None:
+            statement = statement.where(Product.organization_id.in_(organization_id))
+
+        if product_id is not None:
+            statement = statement.where(Product.id.in_(product_id))
+
+        if active is not None:
+            if active:
+                statement = statement.where(Subscription.active.is_(True))
+            else:
+                statement = statement.where(Subscription.revoked.is_(True))
+
+        order_by_clauses: builtins.list[UnaryExpression[Any]] = []
+        for criterion, is_desc in sorting:
+            clause_function = desc if is_desc else asc
+            if criterion == SubscriptionSortProperty.user:
+                order_by_clauses.append(clause_function(User.email))
+            if criterion == SubscriptionSortProperty.status:
+                order_by_clauses.append(
+                    clause_function(
+                        case(
+                            (Subscription.status == SubscriptionStatus.incomplete, 1),
+                            (
+                                Subscription.status
+                                == SubscriptionStatus.incomplete_expired,
+                                2,
+                            ),
+                            (Subscription.status == SubscriptionStatus.trialing, 3),
+                            (
+                                Subscription.status == SubscriptionStatus.active,
+                                case(
+                                    (Subscription.cancel_at_period_end.is_(False), 4),
+                                    (Subscription.cancel_at_period_end.is_(True), 5),
+                                ),
+                            ),
+                            (Subscription.status == SubscriptionStatus.past_due, 6),
+                            (Subscription.status == SubscriptionStatus.canceled, 7),
+                            (Subscription.status == SubscriptionStatus.unpaid, 8),
+                        )
+                    )
+                )
+            if criterion == SubscriptionSortProperty.started_at:
+                order_by_clauses.append(clause_function(Subscription.started_at))
+            if criterion == SubscriptionSortProperty.current_period_end:
+                order_by_clauses.append(
+                    clause_function(Subscription.current_period_end)
+                )
+            if criterion == SubscriptionSortProperty.amount:
+                order_by_clauses.append(
+                    clause_function(
+                        case(
+                            (
+                                Subscription.recurring_interval
+                                == SubscriptionRecurringInterval.year,
+                                Subscription.amount / 12,
+                            ),
+                            (
+                                Subscription.recurring_interval
+                                == SubscriptionRecurringInterval.month,
+                                Subscription.amount,
+                            ),
+                        )
+                    ).nulls_last()
+                )
+            if criterion == SubscriptionSortProperty.product:
+                order_by_clauses.append(clause_function(Product.name))
+        statement = statement.order_by(*order_by_clauses)
+
+        statement = statement.options(
+            contains_eager(Subscription.product).options(
+                selectinload(Product.product_medias),
+                selectinload(Product.attached_custom_fields),
+            ),
+            contains_eager(Subscription.price),
+            contains_eager(Subscription.user),
+        )
+
+        return statement, order_by_clauses
+
+    async def _get_readable_subscriptions_statement(
+        self, session: AsyncSession, auth_subject: AuthSubject[User | Organization]
     ) -> Select[Any]:
         statement = (
             select(Subscription)
@@ -725,15 +859,12 @@ class SubscriptionService(ResourceServiceReader[Subscription]):
         )
 
         if is_user(auth_subject):
-            statement = statement.join(
-                UserOrganization,
-                isouter=True,
-                onclause=and_(
-                    UserOrganization.organization_id == Product.organization_id,
-                    UserOrganization.user_id == auth_subject.subject.id,
-                ),
-            ).where(
-                UserOrganization.user_id == auth_subject.subject.id,
+            statement = statement.where(
+                Product.organization_id.in_(
+                    await user_organization_service.get_organization_ids(
+                        session, auth_subject.subject.id
+                    )
+                )
             )
         elif is_organization(auth_subject):
             statement = statement.where(
@@ -3,14 +3,17 @@ from polar.article import tasks as article
 from polar.benefit import tasks as benefit
 from polar.checkout import tasks as checkout
 from polar.eventstream import tasks as eventstream
+from polar.export import tasks as export
 from polar.integrations.github import tasks as github
 from polar.integrations.loops import tasks as loops
 from polar.integrations.stripe import tasks as stripe
 from polar.magic_link import tasks as magic_link
+from polar.metrics import tasks as metrics
 from polar.notifications import tasks as notifications
 from polar.order import tasks as order
 from polar.organization import tasks as organization
 from polar.personal_access_token import tasks as personal_access_token
+from polar.product import tasks as product
 from polar.subscription import tasks as subscription
 from polar.transaction import tasks as transaction
 from polar.user import tasks as user
@@ -22,14 +25,17 @@ __all__ = [
     "benefit",
     "checkout",
     "eventstream",
+    "export",
     "github",
     "loops",
     "stripe",
     "magic_link",
+    "metrics",
     "order",
     "notifications",
     "organization",
     "personal_access_token",
+    "product",
     "subscription",
     "transaction",
     "user",
@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import Depends, Query
+from fastapi import Depends, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import UUID4
 
@@ -8,13 +8,22 @@ from polar.account.service import account as account_service
 from polar.auth.dependencies import WebUser
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound
+from polar.export.schemas import Export, PayoutTransactionsExportParameters
+from polar.export.service import export as export_service
+from polar.kit.csv import CSVStreamingResponse, accepts_gzip
 from polar.kit.db.postgres import AsyncSessionMaker
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorListResource,
+    CursorPaginationParamsQuery,
+    ListResource,
+    PaginationParamsQuery,
+)
 from polar.kit.sorting import Sorting, SortingGetter
 from polar.models import Transaction as TransactionModel
 from polar.models.transaction import TransactionType
 from polar.openapi import APITag
-from polar.postgres import AsyncSession, get_db_session, get_db_sessionmaker
+from polar.postgres import AsyncSession, get_db_read_sessionmaker, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from .schemas import (
@@ -24,6 +33,7 @@ from .schemas import (
     TransactionDetails,
     TransactionsSummary,
 )
+from .service.payout import PAYOUT_CSV_HEADER
 from .service.payout import payout_transaction as payout_transaction_service
 from .service.transaction import TransactionSortProperty
 from .service.transaction import transaction as transaction_service
@@ -68,6 +78,35 @@ async def search_transactions(
     )
 
 
+@router.get("/search/cursor", response_model=CursorListResource[Transaction])
+async def search_transactions_cursor(
+    pagination: CursorPaginationParamsQuery,
+    sorting: SearchSorting,
+    auth_subject: WebUser,
+    type: TransactionType | None = Query(None),
+    account_id: UUID4 | None = Query(None),
+    payment_user_id: UUID4 | None = Query(None),
+    payment_organization_id: UUID4 | None = Query(None),
+    exclude_platform_fees: bool = Query(False),
+    session: AsyncSession = Depends(get_db_session),
+) -> CursorListResource[Transaction]:
+    results, next_cursor = await transaction_service.search_cursor(
+        session,
+        auth_subject.subject,
+        type=type,
+        account_id=account_id,
+        payment_user_id=payment_user_id,
+        payment_organization_id=payment_organization_id,
+        exclude_platform_fees=exclude_platform_fees,
+        pagination=pagination,
+        sorting=sorting,
+    )
+
+    return CursorListResource.from_cursor_paginated_results(
+        [Transaction.model_validate(result) for result in results], next_cursor
+    )
+
+
 @router.get("/lookup", response_model=TransactionDetails)
 async def lookup_transaction(
     transaction_id: UUID4,
@@ -134,10 +173,11 @@ async def create_payout(
 
 @router.get("/payouts/{id}/csv")
 async def get_payout_csv(
+    request: Request,
     id: UUID4,
     auth_subject: WebUser,
     session: AsyncSession = Depends(get_db_session),
-    sessionmaker: AsyncSessionMaker = Depends(get_db_sessionmaker),
+    sessionmaker: AsyncSessionMaker = Depends(get_db_read_sessionmaker),
     authz: Authz = Depends(Authz.authz),
 ) -> StreamingResponse:
     payout = await payout_transaction_service.get(session, id)
@@ -152,13 +192,49 @@ async def get_payout_csv(
     if not await authz.can(auth_subject.subject, AccessType.write, account):
         raise NotPermitted()
 
-    content = payout_transaction_service.get_payout_csv(
+    rows = payout_transaction_service.get_payout_csv_rows(
         sessionmaker, account=account, payout=payout
     )
     filename = f"polar-payout-{payout.created_at.isoformat()}.csv"
 
-    return StreamingResponse(
-        content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    return CSVStreamingResponse(
+        rows,
+        filename=filename,
+        header=PAYOUT_CSV_HEADER,
+        compress=accepts_gzip(request),
+    )
+
+
+@router.post(
+    "/payouts/{id}/csv",
+    summary="Create Payout CSV Export",
+    response_model=Export,
+    status_code=202,
+)
+async def create_payout_csv_export(
+    id: UUID4,
+    auth_subject: WebUser,
+    session: AsyncSession = Depends(get_db_session),
+    authz: Authz = Depends(Authz.authz),
+    redis: Redis = Depends(get_redis),
+) -> Export:
+    payout = await payout_transaction_service.get(session, id)
+
+    if payout is None:
+        raise ResourceNotFound("Payout not found")
+
+    assert payout.account_id is not None
+    account = await account_service.get(session, payout.account_id)
+    assert account is not None
+
+    if not await authz.can(auth_subject.subject, AccessType.write, account):
+        raise NotPermitted()
+
+    job = await export_service.create(
+        redis,
+        auth_subject,
+        PayoutTransactionsExportParameters(payout_id=payout.id),
+        filename=f"polar-payout-{payout.created_at.isoformat()}.csv",
+        mime_type="text/csv",
     )
+    return export_service.to_schema(job)
@@ -1,6 +1,6 @@
-from collections.abc import AsyncIterable, Sequence
+from collections.abc import AsyncIterator, Sequence
 from datetime import timedelta
-from typing import cast
+from typing import Any, cast
 
 import stripe as stripe_lib
 import structlog
@@ -12,7 +12,6 @@ from polar.config import settings
 from polar.enums import AccountType
 from polar.integrations.stripe.service import stripe as stripe_service
 from polar.integrations.stripe.utils import get_expandable_id
-from polar.kit.csv import IterableCSVWriter
 from polar.kit.db.postgres import AsyncSessionMaker
 from polar.kit.utils import generate_uuid, utc_now
 from polar.logging import Logger
@@ -30,6 +29,19 @@ from .transaction import transaction as transaction_service
 log: Logger = structlog.get_logger()
 
 
+PAYOUT_CSV_HEADER = (
+    "Date",
+    "Payout ID",
+    "Transaction ID",
+    "Description",
+    "Currency",
+    "Amount",
+    "Payout Total",
+    "Account Currency",
+    "Account Payout Total",
+)
+
+
 class PayoutTransactionError(BaseTransactionServiceError): ...
 
 
@@ -315,9 +327,14 @@ class PayoutTransactionService(BaseTransactionService):
 
         return transaction
 
-    async def get_payout_csv(
-        self, sessionmaker: AsyncSessionMaker, *, account: Account, payout: Transaction
-    ) -> AsyncIterable[str]:
+    async def get_payout_csv_rows(
+        self,
+        sessionmaker: AsyncSessionMaker,
+        *,
+        account: Account,
+        payout: Transaction,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[tuple[Any, ...]]:
         statement = (
             select(Transaction)
             .where(
@@ -336,21 +353,7 @@ class PayoutTransactionService(BaseTransactionService):
                     joinedload(Issue.repository),
                 ),
             )
-        )
-
-        csv_writer = IterableCSVWriter(dialect="excel")
-        yield csv_writer.getrow(
-            (
-                "Date",
-                "Payout ID",
-                "Transaction ID",
-                "Description",
-                "Currency",
-                "Amount",
-                "Payout Total",
-                "Account Currency",
-                "Account Payout Total",
-            )
+            .execution_options(yield_per=batch_size)
         )
 
         # StreamingResponse is running its own async task to exhaust the iterator
@@ -383,18 +386,16 @@ class PayoutTransactionService(BaseTransactionService):
                     else str(transaction.incurred_by_transaction_id)
                 )
 
-                yield csv_writer.getrow(
-                    (
-                        transaction.created_at.isoformat(),
-                        str(payout.id),
-                        transaction_id,
-                        description,
-                        transaction.currency,
-                        transaction.amount / 100,
-                        abs(payout.amount / 100),
-                        account.currency,
-                        abs(payout.account_amount / 100),
-                    )
+                yield (
+                    transaction.created_at.isoformat(),
+                    str(payout.id),
+                    transaction_id,
+                    description,
+                    transaction.currency,
+                    transaction.amount / 100,
+                    abs(payout.amount / 100),
+                    account.currency,
+                    abs(payout.account_amount / 100),
                 )
 
     async def _prepare_stripe_payout(
@@ -5,11 +5,16 @@ from typing import Any, cast
 
 from sqlalchemy import Select, UnaryExpression, asc, desc, func, or_, select
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import aliased, joinedload, subqueryload
+from sqlalchemy.orm import joinedload, subqueryload
 
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import (
+    CursorPaginationParams,
+    PaginationParams,
+    paginate,
+    paginate_cursor,
+)
 from polar.kit.sorting import Sorting
 from polar.models import (
     Account,
@@ -22,8 +27,10 @@ from polar.models import (
 )
 from polar.models.organization import Organization
 from polar.models.transaction import TransactionType
-from polar.models.user_organization import UserOrganization
 from polar.postgres import AsyncSession
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 
 from ..schemas import (
     TransactionsBalance,
@@ -53,59 +60,61 @@ class TransactionService(BaseTransactionService):
             (TransactionSortProperty.created_at, True)
         ],
     ) -> tuple[Sequence[Transaction], int]:
-        statement = self._get_readable_transactions_statement(user)
-
-        statement = statement.options(
-            # Incurred transactions
-            subqueryload(Transaction.account_incurred_transactions),
-            # Pledge
-            subqueryload(Transaction.pledge).options(
-                # Pledge.issue
-                joinedload(Pledge.issue).options(
-                    joinedload(Issue.repository),
-                    joinedload(Issue.organization),
-                )
-            ),
-            # IssueReward
-            subqueryload(Transaction.issue_reward),
-            # Order
-            subqueryload(Transaction.order).options(
-                joinedload(Order.product).options(joinedload(Product.organization)),
-                joinedload(Order.product_price),
-            ),
+        statement, _ = self._get_search_statement(
+            await self._get_readable_transactions_statement(session, user),
+            type=type,
+            account_id=account_id,
+            payment_user_id=payment_user_id,
+            payment_organization_id=payment_organization_id,
+            exclude_platform_fees=exclude_platform_fees,
+            sorting=sorting,
         )
 
-        if type is not None:
-            statement = statement.where(Transaction.type == type)
-        if account_id is not None:
-            statement = statement.where(Transaction.account_id == account_id)
-        if payment_user_id is not None:
-            statement = statement.where(Transaction.payment_user_id == payment_user_id)
-        if payment_organization_id is not None:
-            statement = statement.where(
-                Transaction.payment_organization_id == payment_organization_id
-            )
-        if exclude_platform_fees:
-            statement = statement.where(Transaction.platform_fee_type.is_(None))
-
-        order_by_clauses: list[UnaryExpression[Any]] = []
-        for criterion, is_desc in sorting:
-            clause_function = desc if is_desc else asc
-            if criterion == TransactionSortProperty.created_at:
-                order_by_clauses.append(clause_function(Transaction.created_at))
-            elif criterion == TransactionSortProperty.amount:
-                order_by_clauses.append(clause_function(Transaction.amount))
-        statement = statement.order_by(*order_by_clauses)
-
         results, count = await paginate(session, statement, pagination=pagination)
 
         return results, count
 
+    async def search_cursor(
+        self,
+        session: AsyncSession,
+        user: User,
+        *,
+        type: TransactionType | None = None,
+        account_id: uuid.UUID | None = None,
+        payment_user_id: uuid.UUID | None = None,
+        payment_organization_id: uuid.UUID | None = None,
+        exclude_platform_fees: bool = False,
+        pagination: CursorPaginationParams,
+        sorting: list[Sorting[TransactionSortProperty]] = [
+            (TransactionSortProperty.created_at, True)
+        ],
+    ) -> tuple[Sequence[Transaction], str | None]:
+        # The readable statement may yield the same transaction several times,
+        # which would shrink the pages: filter on the IDs instead.
+        readable_statement = await self._get_readable_transactions_statement(
+            session, user
+        )
+        statement, order_by_clauses = self._get_search_statement(
+            select(Transaction).where(
+                Transaction.id.in_(readable_statement.with_only_columns(Transaction.id))
+            ),
+            type=type,
+            account_id=account_id,
+            payment_user_id=payment_user_id,
+            payment_organization_id=payment_organization_id,
+            exclude_platform_fees=exclude_platform_fees,
+            sorting=sorting,
+        )
+
+        return await paginate_cursor(
+            session, statement, order_by=order_by_clauses, pagination=pagination
+        )
+
     async def lookup(
         self, session: AsyncSession, id: uuid.UUID, user: User
     ) -> Transaction:
         statement = (
-            self._get_readable_transactions_statement(user)
+            (await self._get_readable_transactions_statement(session, user))
             .options(
                 # Incurred transactions
                 subqueryload(Transaction.account_incurred_transactions),
@@ -238,8 +247,68 @@ class TransactionService(BaseTransactionService):
         result = await session.execute(statement)
         return result.scalar_one()
 
-    def _get_readable_transactions_statement(self, user: User) -> Select[Any]:
-        PaymentUserOrganization = aliased(UserOrganization)
+    def _get_search_statement(
+        self,
+        statement: Select[Any],
+        *,
+        type: TransactionType | None,
+        account_id: uuid.UUID | None,
+        payment_user_id: uuid.UUID | None,
+        payment_organization_id: uuid.UUID | None,
+        exclude_platform_fees: bool,
+        sorting: list[Sorting[TransactionSortProperty]],
+    ) -> tuple[Select[Any], list[UnaryExpression[Any]]]:
+        """Return the search statement, and its ORDER BY clauses."""
+        statement = statement.options(
+            # Incurred transactions
+            subqueryload(Transaction.account_incurred_transactions),
+            # Pledge
+            subqueryload(Transaction.pledge).options(
+                # Pledge.issue
+                joinedload(Pledge.issue).options(
+                    joinedload(Issue.repository),
+                    joinedload(Issue.organization),
+                )
+            ),
+            # IssueReward
+            subqueryload(Transaction.issue_reward),
+            # Order
+            subqueryload(Transaction.order).options(
+                joinedload(Order.product).options(joinedload(Product.organization)),
+                joinedload(Order.product_price),
+            ),
+        )
+
+        if type is not None:
+            statement = statement.where(Transaction.type == type)
+        if account_id is not None:
+            statement = statement.where(Transaction.account_id == account_id)
+        if payment_user_id is not None:
+            statement = statement.where(Transaction.payment_user_id == payment_user_id)
+        if payment_organization_id is not None:
+            statement = statement.where(
+                Transaction.payment_organization_id == payment_organization_id
+            )
+        if exclude_platform_fees:
+            statement = statement.where(Transaction.platform_fee_type.is_(None))
+
+        order_by_clauses: list[UnaryExpression[Any]] = []
+        for criterion, is_desc in sorting:
+            clause_function = desc if is_desc else asc
+            if criterion == TransactionSortProperty.created_at:
+                order_by_clauses.append(clause_function(Transaction.created_at))
+            elif criterion == TransactionSortProperty.amount:
+                order_by_clauses.append(clause_function(Transaction.amount))
+        statement = statement.order_by(*order_by_clauses)
+
+        return statement, order_by_clauses
+
+    async def _get_readable_transactions_statement(
+        self, session: AsyncSession, user: User
+    ) -> Select[Any]:
+        organization_ids = await user_organization_service.get_organization_ids(
+            session, user.id
+        )
         statement = (
             select(Transaction)
             .join(Transaction.account, isouter=True)
@@ -248,24 +317,13 @@ class TransactionService(BaseTransactionService):
                 onclause=Organization.account_id == Account.id,
                 isouter=True,
             )
-            .join(
-                UserOrganization,
-                onclause=Organization.id == UserOrganization.organization_id,
-                isouter=True,
-            )
             .join(User, onclause=User.account_id == Account.id, isouter=True)
-            .join(
-                PaymentUserOrganization,
-                onclause=Transaction.payment_organization_id
-                == PaymentUserOrganization.organization_id,
-                isouter=True,
-            )
             .where(
                 or_(
                     User.id == user.id,
-                    UserOrganization.user_id == user.id,
+                    Organization.id.in_(organization_ids),
                     Transaction.payment_user_id == user.id,
-                    PaymentUserOrganization.user_id == user.id,
+                    Transaction.payment_organization_id.in_(organization_ids),
                 )
             )
         )
@@ -5,6 +5,7 @@ from polar.benefit.schemas import BenefitID
 from polar.exceptions import NotPermitted, ResourceNotFound, Unauthorized
 from polar.kit.db.postgres import AsyncSession
 from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.rate_limit import RateLimit, RateLimiter
 from polar.kit.schemas import MultipleQueryFilter
 from polar.license_key.schemas import (
     LicenseKeyActivate,
@@ -31,6 +32,9 @@ router = APIRouter(
     prefix="/license-keys", tags=["license_keys", APITag.documented, APITag.featured]
 )
 
+# Public endpoints, called from the customers' applications
+PublicRateLimiter = Depends(RateLimiter("license_key", RateLimit(limit=100, period=60)))
+
 
 ActivationNotPermitted = {
     "description": "License key activation not required or permitted (limit reached).",
@@ -106,6 +110,7 @@ async def get(
 
 @router.post(
     "/validate",
+    dependencies=[PublicRateLimiter],
     summary="Validate License Key",
     response_model=ValidatedLicenseKey,
     responses={
@@ -138,6 +143,7 @@ async def validate(
 
 @router.post(
     "/activate",
+    dependencies=[PublicRateLimiter],
     summary="Activate License Key",
     response_model=LicenseKeyActivationRead,
     responses={
@@ -162,6 +168,7 @@ async def activate(
 
 @router.post(
     "/deactivate",
+    dependencies=[PublicRateLimiter],
     summary="Deactivate License Key",
     status_code=204,
     responses={
@@ -1,13 +1,16 @@
+import itertools
 from collections.abc import Sequence
 from uuid import UUID
 
-from sqlalchemy import Select, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Select, event, func
+from sqlalchemy.orm import Session, SessionTransaction, UOWTransaction, joinedload
 
 from polar.kit.utils import utc_now
 from polar.models import UserOrganization
 from polar.postgres import AsyncSession, sql
 
+_ORGANIZATION_IDS_KEY = "polar_user_organization_ids"
+
 
 class UserOrganizationService:
     async def list_by_org(
@@ -35,6 +38,33 @@ class UserOrganizationService:
         res = await session.execute(stmt)
         return res.scalars().unique().all()
 
+    async def get_organization_ids(
+        self, session: AsyncSession, user_id: UUID
+    ) -> list[UUID]:
+        """
+        Return the IDs of the organizations the user is a member of.
+
+        The result is cached on the session, so it's resolved once per request,
+        and readable statements can filter on it as a literal list,
+        instead of each embedding a membership subquery.
+        """
+        cache: dict[UUID, list[UUID]] = session.info.setdefault(
+            _ORGANIZATION_IDS_KEY, {}
+        )
+        try:
+            return cache[user_id]
+        except KeyError:
+            pass
+
+        stmt = sql.select(UserOrganization.organization_id).where(
+            UserOrganization.user_id == user_id,
+            UserOrganization.deleted_at.is_(None),
+        )
+        res = await session.execute(stmt)
+        organization_ids = list(res.scalars().all())
+        cache[user_id] = organization_ids
+        return organization_ids
+
     async def get_user_organization_count(
         self, session: AsyncSession, user_id: UUID
     ) -> int:
@@ -85,6 +115,7 @@ class UserOrganizationService:
             .values(deleted_at=utc_now())
         )
         await session.execute(stmt)
+        session.info.pop(_ORGANIZATION_IDS_KEY, None)
         await session.commit()
 
     def _get_list_by_user_id_query(
@@ -107,4 +138,22 @@ class UserOrganizationService:
         return stmt
 
 
+@event.listens_for(Session, "after_flush")
+def _clear_organization_ids_on_flush(
+    session: Session, flush_context: UOWTransaction
+) -> None:
+    if any(
+        isinstance(obj, UserOrganization)
+        for obj in itertools.chain(session.new, session.dirty, session.deleted)
+    ):
+        session.info.pop(_ORGANIZATION_IDS_KEY, None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _clear_organization_ids_on_rollback(
+    session: Session, previous_transaction: SessionTransaction
+) -> None:
+    session.info.pop(_ORGANIZATION_IDS_KEY, None)
+
+
 user_organization = UserOrganizationService()
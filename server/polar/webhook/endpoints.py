@@ -5,7 +5,12 @@ from pydantic import UUID4
 
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, ResourceNotFound, Unauthorized
-from polar.kit.pagination import ListResource, PaginationParamsQuery
+from polar.kit.pagination import (
+    CursorListResource,
+    CursorPaginationParamsQuery,
+    ListResource,
+    PaginationParamsQuery,
+)
 from polar.models import WebhookEndpoint
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
@@ -181,6 +186,33 @@ async def list_webhook_deliveries(
     )
 
 
+@router.get(
+    "/deliveries/cursor",
+    response_model=CursorListResource[WebhookDeliverySchema],
+)
+async def list_webhook_deliveries_cursor(
+    pagination: CursorPaginationParamsQuery,
+    auth_subject: WebhooksRead,
+    endpoint_id: UUID4 | None = Query(
+        None, description="Filter by webhook endpoint ID."
+    ),
+    session: AsyncSession = Depends(get_db_session),
+) -> CursorListResource[WebhookDeliverySchema]:
+    """
+    List webhook deliveries using cursor pagination.
+
+    Deliveries are all the attempts to deliver a webhook event to an endpoint.
+    """
+    results, next_cursor = await webhook_service.list_deliveries_cursor(
+        session, auth_subject, endpoint_id=endpoint_id, pagination=pagination
+    )
+
+    return CursorListResource.from_cursor_paginated_results(
+        [WebhookDeliverySchema.model_validate(result) for result in results],
+        next_cursor,
+    )
+
+
 @router.post(
     "/events/{id}/redeliver",
     status_code=202,
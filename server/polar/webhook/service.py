@@ -2,23 +2,30 @@ from collections.abc import Sequence
 from uuid import UUID
 
 import structlog
-from sqlalchemy import Select, and_, desc, or_, select, text
+from sqlalchemy import Select, desc, or_, select, text
 from sqlalchemy.orm import contains_eager, joinedload
 
 from polar.auth.models import AuthSubject, is_organization, is_user
 from polar.authz.service import AccessType, Authz
 from polar.exceptions import NotPermitted, PolarRequestValidationError, ResourceNotFound
 from polar.kit.db.postgres import AsyncSession
-from polar.kit.pagination import PaginationParams, paginate
+from polar.kit.pagination import (
+    CursorPaginationParams,
+    PaginationParams,
+    paginate,
+    paginate_cursor,
+)
 from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.models.organization import Organization
 from polar.models.user import User
-from polar.models.user_organization import UserOrganization
 from polar.models.webhook_delivery import WebhookDelivery
 from polar.models.webhook_endpoint import WebhookEndpoint, WebhookEventType
 from polar.models.webhook_event import WebhookEvent
 from polar.organization.resolver import get_payload_organization
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
 from polar.webhook.schemas import (
     WebhookEndpointCreate,
     WebhookEndpointUpdate,
@@ -46,7 +53,7 @@ class WebhookService:
         organization_id: UUID | None,
         pagination: PaginationParams,
     ) -> tuple[Sequence[WebhookEndpoint], int]:
-        statement = self._get_readable_endpoints_statement(auth_subject)
+        statement = await self._get_readable_endpoints_statement(session, auth_subject)
 
         if user_id is not None:
             statement = statement.where(WebhookEndpoint.user_id == user_id)
@@ -67,9 +74,9 @@ class WebhookService:
         auth_subject: AuthSubject[User | Organization],
         id: UUID,
     ) -> WebhookEndpoint | None:
-        statement = self._get_readable_endpoints_statement(auth_subject).where(
-            WebhookEndpoint.id == id
-        )
+        statement = (
+            await self._get_readable_endpoints_statement(session, auth_subject)
+        ).where(WebhookEndpoint.id == id)
         res = await session.execute(statement)
         return res.scalars().unique().one_or_none()
 
@@ -156,29 +163,29 @@ class WebhookService:
         endpoint_id: UUID | None = None,
         pagination: PaginationParams,
     ) -> tuple[Sequence[WebhookDelivery], int]:
-        readable_endpoints_statement = self._get_readable_endpoints_statement(
-            auth_subject
-        )
-        statement = (
-            select(WebhookDelivery)
-            .join(WebhookEndpoint)
-            .where(
-                WebhookDelivery.deleted_at.is_(None),
-                WebhookEndpoint.id.in_(
-                    readable_endpoints_statement.with_only_columns(WebhookEndpoint.id)
-                ),
-            )
-            .options(joinedload(WebhookDelivery.webhook_event))
-            .order_by(desc(WebhookDelivery.created_at))
+        statement = await self._get_deliveries_statement(
+            session, auth_subject, endpoint_id
         )
-
-        if endpoint_id is not None:
-            statement = statement.where(
-                WebhookDelivery.webhook_endpoint_id == endpoint_id
-            )
-
         return await paginate(session, statement, pagination=pagination)
 
+    async def list_deliveries_cursor(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        *,
+        endpoint_id: UUID | None = None,
+        pagination: CursorPaginationParams,
+    ) -> tuple[Sequence[WebhookDelivery], str | None]:
+        statement = await self._get_deliveries_statement(
+            session, auth_subject, endpoint_id
+        )
+        return await paginate_cursor(
+            session,
+            statement,
+            order_by=[desc(WebhookDelivery.created_at)],
+            pagination=pagination,
+        )
+
     async def redeliver_event(
         self,
         session: AsyncSession,
@@ -186,8 +193,8 @@ class WebhookService:
         auth_subject: AuthSubject[User | Organization],
         id: UUID,
     ) -> None:
-        readable_endpoints_statement = self._get_readable_endpoints_statement(
-            auth_subject
+        readable_endpoints_statement = await self._get_readable_endpoints_statement(
+            session, auth_subject
         )
         statement = (
             select(WebhookEvent)
@@ -256,24 +263,20 @@ class WebhookService:
             except SkipEvent:
                 continue
 
-    def _get_readable_endpoints_statement(
-        self, auth_subject: AuthSubject[User | Organization]
+    async def _get_readable_endpoints_statement(
+        self, session: AsyncSession, auth_subject: AuthSubject[User | Organization]
     ) -> Select[tuple[WebhookEndpoint]]:
         statement = select(WebhookEndpoint).where(WebhookEndpoint.deleted_at.is_(None))
 
         if is_user(auth_subject):
             user = auth_subject.subject
-            statement = statement.join(
-                UserOrganization,
-                onclause=UserOrganization.organization_id
-                == WebhookEndpoint.organization_id,
-                full=True,
-            ).where(
+            statement = statement.where(
                 or_(
                     WebhookEndpoint.user_id == user.id,
-                    and_(
-                        UserOrganization.deleted_at.is_(None),
-                        UserOrganization.user_id == user.id,
+                    WebhookEndpoint.organization_id.in_(
+                        await user_organization_service.get_organization_ids(
+                            session, user.id
+                        )
                     ),
                 )
             )
@@ -284,6 +287,35 @@ class WebhookService:
 
         return statement
 
+    async def _get_deliveries_statement(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        endpoint_id: UUID | None,
+    ) -> Select[tuple[WebhookDelivery]]:
+        readable_endpoints_statement = await self._get_readable_endpoints_statement(
+            session, auth_subject
+        )
+        statement = (
+            select(WebhookDelivery)
+            .join(WebhookEndpoint)
+            .where(
+                WebhookDelivery.deleted_at.is_(None),
+                WebhookEndpoint.id.in_(
+                    readable_endpoints_statement.with_only_columns(WebhookEndpoint.id)
+                ),
+            )
+            .options(joinedload(WebhookDelivery.webhook_event))
+            .order_by(desc(WebhookDelivery.created_at))
+        )
+
+        if endpoint_id is not None:
+            statement = statement.where(
+                WebhookDelivery.webhook_endpoint_id == endpoint_id
+            )
+
+        return statement
+
     async def _get_event_target_endpoints(
         self,
         session: AsyncSession,
@@ -21,19 +21,29 @@ from arq.typing import SecondsTimedelta
 from arq.worker import Function
 from pydantic import BaseModel
 
+from polar.auth.cache import collect_invalidations, publish_invalidations
 from polar.config import settings
 from polar.context import ExecutionContext
 from polar.kit.db.postgres import (
     AsyncEngine,
     AsyncSession,
+    ReadReplica,
     create_async_sessionmaker,
 )
 from polar.kit.db.postgres import (
     AsyncSessionMaker as AsyncSessionMakerType,
 )
-from polar.logfire import instrument_httpx, instrument_sqlalchemy
+from polar.logfire import (
+    instrument_httpx,
+    instrument_sqlalchemy,
+    instrument_sqlalchemy_pool,
+)
 from polar.logging import generate_correlation_id
-from polar.postgres import create_async_engine
+from polar.postgres import (
+    create_async_engine,
+    create_async_read_engine,
+    create_read_replica,
+)
 from polar.redis import REDIS_RETRY, REDIS_RETRY_ON_ERRROR, Redis
 
 log = structlog.get_logger()
@@ -49,6 +59,8 @@ class WorkerContext(TypedDict):
     raw_redis: Redis
     async_engine: AsyncEngine
     async_sessionmaker: AsyncSessionMakerType
+    async_read_engine: AsyncEngine | None
+    read_replica: ReadReplica
 
 
 class JobContext(WorkerContext):
@@ -97,6 +109,12 @@ class WorkerSettings:
         async_engine = create_async_engine("worker")
         async_sessionmaker = create_async_sessionmaker(async_engine)
         instrument_sqlalchemy(async_engine.sync_engine)
+        instrument_sqlalchemy_pool(async_engine, "worker")
+        async_read_engine = create_async_read_engine("worker")
+        if async_read_engine is not None:
+            instrument_sqlalchemy(async_read_engine.sync_engine)
+            instrument_sqlalchemy_pool(async_read_engine, "worker.read")
+        read_replica = create_read_replica(async_sessionmaker, async_read_engine)
         instrument_httpx()
 
         # Create a dedicated Redis instance instead of sharing the ARQ one,
@@ -107,6 +125,8 @@ class WorkerSettings:
             {
                 "async_engine": async_engine,
                 "async_sessionmaker": async_sessionmaker,
+                "async_read_engine": async_read_engine,
+                "read_replica": read_replica,
                 "raw_redis": redis,
             }
         )
@@ -116,6 +136,10 @@ class WorkerSettings:
         engine = ctx["async_engine"]
         await engine.dispose()
 
+        read_engine = ctx["async_read_engine"]
+        if read_engine is not None:
+            await read_engine.dispose()
+
         redis = ctx["raw_redis"]
         await redis.close()
 
@@ -298,9 +322,17 @@ def task_hooks(
         job_context["logfire_span"].set_attributes(log_context)
 
         log.info("polar.worker.job_started")
-        r = await f(*args, **kwargs)
-
         arq_pool = job_context["redis"]
+        with collect_invalidations() as invalidations:
+            try:
+                r = await f(*args, **kwargs)
+            finally:
+                # The job may have committed its changes before failing
+                if invalidations:
+                    await publish_invalidations(
+                        get_worker_redis(job_context), invalidations
+                    )
+
         await flush_enqueued_jobs(arq_pool)
 
         log.info("polar.worker.job_ended")
@@ -369,6 +401,26 @@ async def AsyncSessionMaker(ctx: JobContext) -> AsyncIterator[AsyncSession]:
             await session.commit()
 
 
+async def get_worker_read_sessionmaker(ctx: JobContext) -> AsyncSessionMakerType:
+    """
+    Return a sessionmaker bound to the read replica,
+    or to the primary if the replica is not configured or lagging.
+    """
+    return await ctx["read_replica"].get_sessionmaker()
+
+
+@contextlib.asynccontextmanager
+async def AsyncReadSessionMaker(ctx: JobContext) -> AsyncIterator[AsyncSession]:
+    """
+    Helper to open a read-only AsyncSession context manager from the job context.
+
+    The session is never committed, so only use it for tasks which don't write.
+    """
+    sessionmaker = await get_worker_read_sessionmaker(ctx)
+    async with sessionmaker() as session:
+        yield session
+
+
 def compute_backoff(
     attempts: int,
     *,
@@ -406,6 +458,8 @@ __all__ = [
     "enqueue_job",
     "JobContext",
     "AsyncSessionMaker",
+    "AsyncReadSessionMaker",
+    "get_worker_read_sessionmaker",
     "ArqRedis",
     "QueueName",
     "CronTrigger",
@@ -0,0 +1,449 @@
+import asyncio
+import logging.config
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from functools import wraps
+from typing import Any
+
+import structlog
+import typer
+from sqlalchemy import Float, Integer, String, Uuid, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from polar.auth.models import AuthMethod, AuthSubject
+from polar.auth.scope import Scope
+from polar.enums import SubscriptionRecurringInterval
+from polar.kit.db.postgres import AsyncSession
+from polar.kit.utils import utc_now
+from polar.metrics.limits import MAX_INTERVAL_DAYS
+from polar.metrics.queries import Interval
+from polar.metrics.service import metrics as metrics_service
+from polar.models import (
+    Organization,
+    Product,
+    ProductPriceFixed,
+    User,
+    UserOrganization,
+)
+from polar.models.product_price import ProductPriceType
+from polar.postgres import create_async_engine
+
+from .db import assert_dev_or_testing
+
+cli = typer.Typer()
+
+
+def drop_all(*args: Any, **kwargs: Any) -> Any:
+    raise structlog.DropEvent
+
+
+structlog.configure(processors=[drop_all])
+logging.config.dictConfig(
+    {
+        "version": 1,
+        "disable_existing_loggers": True,
+    }
+)
+
+
+def typer_async(f):  # type: ignore
+    # From https://github.com/tiangolo/typer/issues/85
+    @wraps(f)
+    def wrapper(*args, **kwargs):  # type: ignore
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+# Each synthetic organization sells those products.
+# Subscriptions are spread between the monthly and yearly products.
+PRODUCTS: list[
+    tuple[str, int, ProductPriceType, SubscriptionRecurringInterval | None]
+] = [
+    ("One-time", 50_00, ProductPriceType.one_time, None),
+    ("Monthly", 10_00, ProductPriceType.recurring, SubscriptionRecurringInterval.month),
+    ("Yearly", 100_00, ProductPriceType.recurring, SubscriptionRecurringInterval.year),
+]
+
+INSERT_SUBSCRIPTIONS = text(
+    """
+    INSERT INTO subscriptions (
+        id, created_at, status, recurring_interval, amount, currency,
+        current_period_start, cancel_at_period_end, started_at, ended_at,
+        user_id, product_id, price_id, user_metadata, custom_field_data
+    )
+    SELECT
+        gen_random_uuid(),
+        s.started_at,
+        CASE WHEN s.ended_at IS NULL THEN 'active' ELSE 'canceled' END,
+        s.recurring_interval,
+        s.amount,
+        'usd',
+        s.started_at,
+        false,
+        s.started_at,
+        s.ended_at,
+        (:customer_ids)[1 + s.i % :customer_count],
+        s.product_id,
+        s.price_id,
+        '{}'::jsonb,
+        '{}'::jsonb
+    FROM (
+        SELECT
+            i,
+            started_at,
+            CASE
+                WHEN random() < :churn_rate
+                THEN started_at + random() * (now() - started_at)
+            END AS ended_at,
+            CASE WHEN i % 5 = 0 THEN :yearly_product_id ELSE :monthly_product_id END
+                AS product_id,
+            CASE WHEN i % 5 = 0 THEN :yearly_price_id ELSE :monthly_price_id END
+                AS price_id,
+            CASE WHEN i % 5 = 0 THEN 'year' ELSE 'month' END AS recurring_interval,
+            CASE WHEN i % 5 = 0 THEN :yearly_amount ELSE :monthly_amount END
+                AS amount
+        FROM (
+            SELECT i, now() - random() * make_interval(days => :days) AS started_at
+            FROM generate_series(1, :count) AS i
+        ) AS series
+    ) AS s
+    """
+).bindparams(
+    bindparam("count", type_=Integer),
+    bindparam("days", type_=Integer),
+    bindparam("churn_rate", type_=Float),
+    bindparam("customer_ids", type_=ARRAY(Uuid)),
+    bindparam("customer_count", type_=Integer),
+    bindparam("monthly_product_id", type_=Uuid),
+    bindparam("monthly_price_id", type_=Uuid),
+    bindparam("monthly_amount", type_=Integer),
+    bindparam("yearly_product_id", type_=Uuid),
+    bindparam("yearly_price_id", type_=Uuid),
+    bindparam("yearly_amount", type_=Integer),
+)
+
+INSERT_SUBSCRIPTION_ORDERS = text(
+    """
+    INSERT INTO orders (
+        id, created_at, amount, tax_amount, currency, billing_reason,
+        user_id, product_id, product_price_id, subscription_id,
+        user_metadata, custom_field_data
+    )
+    SELECT
+        gen_random_uuid(),
+        cycles.created_at,
+        s.amount,
+        0,
+        'usd',
+        CASE WHEN cycles.cycle = 0 THEN 'subscription_create'
+            ELSE 'subscription_cycle' END,
+        s.user_id,
+        s.product_id,
+        s.price_id,
+        s.id,
+        '{}'::jsonb,
+        '{}'::jsonb
+    FROM subscriptions AS s
+    CROSS JOIN LATERAL (
+        SELECT
+            cycle,
+            s.started_at + cycle * CAST('1 ' || s.recurring_interval AS interval)
+                AS created_at
+        FROM generate_series(0, 1000) AS cycle
+        WHERE s.started_at + cycle * CAST('1 ' || s.recurring_interval AS interval)
+            <= coalesce(s.ended_at, now())
+    ) AS cycles
+    WHERE s.product_id IN (:monthly_product_id, :yearly_product_id)
+    LIMIT :count
+    """
+).bindparams(
+    bindparam("count", type_=Integer),
+    bindparam("monthly_product_id", type_=Uuid),
+    bindparam("yearly_product_id", type_=Uuid),
+)
+
+INSERT_ONE_TIME_ORDERS = text(
+    """
+    INSERT INTO orders (
+        id, created_at, amount, tax_amount, currency, billing_reason,
+        user_id, product_id, product_price_id, user_metadata, custom_field_data
+    )
+    SELECT
+        gen_random_uuid(),
+        now() - random() * make_interval(days => :days),
+        :amount,
+        0,
+        'usd',
+        'purchase',
+        (:customer_ids)[1 + i % :customer_count],
+        :product_id,
+        :price_id,
+        '{}'::jsonb,
+        '{}'::jsonb
+    FROM generate_series(1, :count) AS i
+    """
+).bindparams(
+    bindparam("count", type_=Integer),
+    bindparam("days", type_=Integer),
+    bindparam("amount", type_=Integer),
+    bindparam("customer_ids", type_=ARRAY(Uuid)),
+    bindparam("customer_count", type_=Integer),
+    bindparam("product_id", type_=Uuid),
+    bindparam("price_id", type_=Uuid),
+)
+
+INSERT_CUSTOMERS = text(
+    """
+    INSERT INTO users (
+        id, created_at, email, email_verified, accepted_terms_of_service, meta
+    )
+    SELECT
+        gen_random_uuid(),
+        now(),
+        'benchmark+' || :prefix || '-' || i || '@example.com',
+        true,
+        true,
+        '{}'::jsonb
+    FROM generate_series(1, :count) AS i
+    RETURNING id
+    """
+).bindparams(
+    bindparam("prefix", type_=String),
+    bindparam("count", type_=Integer),
+)
+
+
+async def _seed_organization(
+    session: AsyncSession,
+    *,
+    orders: int,
+    subscriptions: int,
+    customers: int,
+    days: int,
+    churn_rate: float,
+    one_time_ratio: float,
+) -> Organization:
+    prefix = uuid.uuid4().hex[:8]
+    organization = Organization(name=f"Benchmark {prefix}", slug=f"benchmark-{prefix}")
+    owner = User(email=f"benchmark+{prefix}@example.com")
+    session.add_all(
+        [organization, owner, UserOrganization(user=owner, organization=organization)]
+    )
+
+    prices: list[ProductPriceFixed] = []
+    for name, amount, type, recurring_interval in PRODUCTS:
+        price = ProductPriceFixed(
+            price_amount=amount,
+            price_currency="usd",
+            type=type,
+            recurring_interval=recurring_interval,
+            stripe_price_id=f"BENCHMARK_PRICE_{prefix}_{name}",
+        )
+        product = Product(
+            name=name,
+            organization=organization,
+            stripe_product_id=f"BENCHMARK_PRODUCT_{prefix}_{name}",
+            all_prices=[price],
+        )
+        session.add(product)
+        prices.append(price)
+    await session.flush()
+    one_time_price, monthly_price, yearly_price = prices
+
+    result = await session.execute(
+        INSERT_CUSTOMERS, {"prefix": prefix, "count": customers}
+    )
+    customer_ids = list(result.scalars().all())
+
+    await session.execute(
+        INSERT_SUBSCRIPTIONS,
+        {
+            "count": subscriptions,
+            "days": days,
+            "churn_rate": churn_rate,
+            "customer_ids": customer_ids,
+            "customer_count": customers,
+            "monthly_product_id": monthly_price.product_id,
+            "monthly_price_id": monthly_price.id,
+            "monthly_amount": monthly_price.price_amount,
+            "yearly_product_id": yearly_price.product_id,
+            "yearly_price_id": yearly_price.id,
+            "yearly_amount": yearly_price.price_amount,
+        },
+    )
+
+    result = await session.execute(
+        INSERT_SUBSCRIPTION_ORDERS,
+        {
+            "count": orders - int(orders * one_time_ratio),
+            "monthly_product_id": monthly_price.product_id,
+            "yearly_product_id": yearly_price.product_id,
+        },
+    )
+    subscription_orders: int = getattr(result, "rowcount", 0)
+
+    one_time_orders = max(orders - subscription_orders, 0)
+    await session.execute(
+        INSERT_ONE_TIME_ORDERS,
+        {
+            "count": one_time_orders,
+            "days": days,
+            "amount": one_time_price.price_amount,
+            "customer_ids": customer_ids,
+            "customer_count": customers,
+            "product_id": one_time_price.product_id,
+            "price_id": one_time_price.id,
+        },
+    )
+
+    await session.commit()
+
+    typer.echo(
+        f"🌱 Organization {organization.id}: "
+        f"{subscriptions} subscriptions, "
+        f"{subscription_orders} subscription orders, "
+        f"{one_time_orders} one-time orders"
+    )
+    return organization
+
+
+@cli.command()
+@typer_async
+async def seed(
+    organizations: int = typer.Option(1, help="Number of organizations to create."),
+    orders: int = typer.Option(1_000_000, help="Number of orders per organization."),
+    subscriptions: int = typer.Option(
+        200_000, help="Number of subscriptions per organization."
+    ),
+    customers: int = typer.Option(10_000, help="Number of customers per organization."),
+    days: int = typer.Option(365 * 3, help="Spread the data over the last N days."),
+    churn_rate: float = typer.Option(
+        0.3, help="Ratio of subscriptions that have ended."
+    ),
+    one_time_ratio: float = typer.Option(
+        0.3, help="Ratio of orders that are one-time purchases."
+    ),
+) -> None:
+    """Seed the database with synthetic organizations, to benchmark metrics."""
+    assert_dev_or_testing()
+
+    engine = create_async_engine("script")
+    async with AsyncSession(bind=engine, expire_on_commit=False) as session:
+        for _ in range(organizations):
+            await _seed_organization(
+                session,
+                orders=orders,
+                subscriptions=subscriptions,
+                customers=customers,
+                days=days,
+                churn_rate=churn_rate,
+                one_time_ratio=one_time_ratio,
+            )
+        await session.execute(text("ANALYZE orders, subscriptions"))
+    await engine.dispose()
+
+
+FILTERS: dict[str, dict[str, Any]] = {
+    "none": {},
+    "one_time": {"product_price_type": [ProductPriceType.one_time]},
+    "recurring": {"product_price_type": [ProductPriceType.recurring]},
+}
+
+
+@cli.command()
+@typer_async
+async def run(
+    organization_id: uuid.UUID = typer.Argument(
+        ..., help="ID of a seeded organization."
+    ),
+    repeat: int = typer.Option(3, help="Number of runs for each combination."),
+    interval: list[Interval] | None = typer.Option(
+        None, help="Only benchmark those intervals. Defaults to all."
+    ),
+) -> None:
+    """
+    Benchmark metrics for every interval and filter combination.
+
+    Each interval is queried on its largest allowed range, ending today.
+    """
+    assert_dev_or_testing()
+
+    engine = create_async_engine("script")
+    async with AsyncSession(bind=engine, expire_on_commit=False) as session:
+        organization = await session.get(Organization, organization_id)
+        if organization is None:
+            raise typer.BadParameter("Organization not found.")
+        auth_subject = AuthSubject(
+            organization, {Scope.metrics_read}, AuthMethod.OAUTH2_ACCESS_TOKEN
+        )
+
+        products = (
+            await session.execute(
+                text("SELECT id FROM products WHERE organization_id = :id"),
+                {"id": organization.id},
+            )
+        ).scalars()
+        filters = {
+            **FILTERS,
+            "product": {"product_id": [next(iter(products))]},
+        }
+
+        end_date = utc_now().date()
+        typer.echo(
+            f"{'interval':<8} {'filter':<10} {'periods':>8} "
+            f"{'min (ms)':>10} {'median (ms)':>12} {'max (ms)':>10}"
+        )
+        for benchmarked_interval in interval or list(Interval):
+            start_date = end_date - timedelta(
+                days=MAX_INTERVAL_DAYS[benchmarked_interval]
+            )
+            for filter_name, filter_kwargs in filters.items():
+                timings, periods = await _benchmark(
+                    session,
+                    auth_subject,
+                    start_date=start_date,
+                    end_date=end_date,
+                    interval=benchmarked_interval,
+                    repeat=repeat,
+                    **filter_kwargs,
+                )
+                typer.echo(
+                    f"{benchmarked_interval.value:<8} {filter_name:<10} {periods:>8} "
+                    f"{min(timings):>10.1f} {statistics.median(timings):>12.1f} "
+                    f"{max(timings):>10.1f}"
+                )
+    await engine.dispose()
+
+
+async def _benchmark(
+    session: AsyncSession,
+    auth_subject: AuthSubject[Organization],
+    *,
+    start_date: date,
+    end_date: date,
+    interval: Interval,
+    repeat: int,
+    **kwargs: Any,
+) -> tuple[list[float], int]:
+    timings: list[float] = []
+    periods = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        metrics = await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=start_date,
+            end_date=end_date,
+            interval=interval,
+            **kwargs,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+        periods = len(metrics.periods)
+    return timings, periods
+
+
+if __name__ == "__main__":
+    cli()
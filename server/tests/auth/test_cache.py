@@ -0,0 +1,199 @@
+from collections.abc import Iterator
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockerFixture
+
+from polar.auth.cache import (
+    Invalidations,
+    TokenIdentity,
+    personal_access_token_cache,
+    publish_invalidations,
+)
+from polar.auth.scope import Scope
+from polar.config import settings
+from polar.kit.crypto import get_token_hash
+from polar.kit.db.query_stats import record_query_stats
+from polar.kit.utils import utc_now
+from polar.models import PersonalAccessToken, User
+from polar.personal_access_token.service import (
+    personal_access_token as personal_access_token_service,
+)
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker import JobContext, task_hooks
+from tests.fixtures.database import SaveFixture
+
+TOKEN = "polar_pat_123"
+TOKEN_HASH = get_token_hash(TOKEN, secret=settings.SECRET)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Iterator[None]:
+    personal_access_token_cache.clear()
+    yield
+    personal_access_token_cache.clear()
+
+
+async def get_token(session: AsyncSession, redis: Redis) -> TokenIdentity | None:
+    return await personal_access_token_cache.get(
+        session,
+        redis,
+        TOKEN_HASH,
+        lambda s: personal_access_token_service.get_by_token(s, TOKEN),
+    )
+
+
+@pytest_asyncio.fixture
+async def personal_access_token(
+    save_fixture: SaveFixture, user: User
+) -> PersonalAccessToken:
+    personal_access_token = PersonalAccessToken(
+        comment="Test",
+        token=TOKEN_HASH,
+        user_id=user.id,
+        expires_at=utc_now() + timedelta(days=1),
+        scope="openid",
+    )
+    await save_fixture(personal_access_token)
+    return personal_access_token
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestPersonalAccessTokenCache:
+    async def test_not_existing(self, session: AsyncSession, redis: Redis) -> None:
+        assert await get_token(session, redis) is None
+        assert await get_token(session, redis) is None
+
+    async def test_cached(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        personal_access_token: PersonalAccessToken,
+        user: User,
+    ) -> None:
+        session.expunge_all()
+
+        identity = await get_token(session, redis)
+        assert identity is not None
+
+        session.expunge_all()
+
+        with record_query_stats() as stats:
+            identity = await get_token(session, redis)
+
+        assert stats.count == 0
+        assert identity == TokenIdentity(
+            id=personal_access_token.id,
+            subject_type=User,
+            subject_id=user.id,
+            scopes=frozenset({Scope.openid}),
+            expires_at=personal_access_token.expires_at,
+        )
+
+    async def test_subject_loaded_in_session(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        personal_access_token: PersonalAccessToken,
+        user: User,
+    ) -> None:
+        session.expunge_all()
+
+        identity = await get_token(session, redis)
+        assert identity is not None
+
+        session.expunge_all()
+        session_user = await session.get(User, user.id)
+        assert session_user is not None
+        session_user.blocked_at = utc_now()
+
+        identity = await get_token(session, redis)
+        assert identity is not None
+        subject = await identity.get_subject(session)
+        assert subject is session_user
+        assert subject.blocked_at is not None
+
+    async def test_revoked(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        personal_access_token: PersonalAccessToken,
+    ) -> None:
+        session.expunge_all()
+
+        assert await get_token(session, redis) is not None
+
+        token = await personal_access_token_service.get_by_token(session, TOKEN)
+        assert token is not None
+        await personal_access_token_service.delete(session, token)
+        await session.flush()
+
+        assert await get_token(session, redis) is None
+
+    async def test_invalidated_by_other_process(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        personal_access_token: PersonalAccessToken,
+    ) -> None:
+        session.expunge_all()
+
+        assert await get_token(session, redis) is not None
+
+        await publish_invalidations(redis, Invalidations(keys={TOKEN_HASH}))
+
+        with record_query_stats() as stats:
+            assert await get_token(session, redis) is not None
+
+        assert stats.count > 0
+
+    async def test_invalidated_by_worker_job(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        personal_access_token: PersonalAccessToken,
+    ) -> None:
+        @task_hooks
+        async def revoke(ctx: JobContext) -> None:
+            token = await personal_access_token_service.get_by_token(session, TOKEN)
+            assert token is not None
+            await personal_access_token_service.delete(session, token)
+            await session.flush()
+
+        job_context = {
+            "job_id": "JOB_ID",
+            "job_try": 1,
+            "enqueue_time": utc_now(),
+            "score": 0,
+            "logfire_span": MagicMock(),
+            "redis": MagicMock(),
+            "raw_redis": redis,
+        }
+        await revoke(job_context)  # type: ignore[arg-type]
+
+        assert await redis.exists(f"auth:cache:invalidated:key:{TOKEN_HASH}") == 1
+
+    async def test_expired(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        personal_access_token: PersonalAccessToken,
+        mocker: MockerFixture,
+    ) -> None:
+        session.expunge_all()
+
+        assert await get_token(session, redis) is not None
+
+        mocker.patch(
+            "polar.auth.cache.utc_now",
+            return_value=utc_now() + timedelta(days=2),
+        )
+
+        with record_query_stats() as stats:
+            await get_token(session, redis)
+
+        assert stats.count > 0
@@ -5,6 +5,8 @@ import pytest
 
 from polar.auth.models import Anonymous, Subject
 from polar.authz.service import AccessType, Authz
+from polar.kit.db.query_stats import record_query_stats
+from polar.models.external_organization import ExternalOrganization
 from polar.models.issue import Issue
 from polar.models.issue_reward import IssueReward
 from polar.models.organization import Organization
@@ -652,3 +654,86 @@ async def test_can_write_pledge(
                 )
                 is tc.expected
             )
+
+
+@pytest.mark.asyncio
+async def test_filter_readable_repositories(
+    session: AsyncSession,
+    external_organization: ExternalOrganization,
+    external_organization_linked: ExternalOrganization,
+    user: User,
+    user_organization: UserOrganization,
+    save_fixture: SaveFixture,
+) -> None:
+    readable = [
+        await create_repository(save_fixture, external_organization_linked)
+        for _ in range(5)
+    ]
+    not_readable = [
+        await create_repository(save_fixture, external_organization) for _ in range(5)
+    ]
+    public = await create_repository(
+        save_fixture, external_organization, is_private=False
+    )
+    repositories = [*readable, *not_readable, public]
+
+    # then
+    session.expunge_all()
+
+    authz = Authz(session)
+    with record_query_stats() as stats:
+        filtered = await authz.filter_readable(user, repositories)
+
+    assert filtered == [*readable, public]
+    # Memberships and linked organizations
+    assert stats.count == 2
+
+    with record_query_stats() as stats:
+        assert await authz.can(user, AccessType.read, not_readable[0]) is False
+
+    assert stats.count == 0
+
+
+@pytest.mark.asyncio
+async def test_can_many_issues(
+    session: AsyncSession,
+    external_organization: ExternalOrganization,
+    external_organization_linked: ExternalOrganization,
+    user: User,
+    user_organization: UserOrganization,
+    save_fixture: SaveFixture,
+) -> None:
+    repository_linked = await create_repository(
+        save_fixture, external_organization_linked
+    )
+    repository = await create_repository(save_fixture, external_organization)
+    issues = [
+        await create_issue(
+            save_fixture, external_organization_linked, repository_linked
+        )
+        for _ in range(3)
+    ] + [
+        await create_issue(save_fixture, external_organization, repository)
+        for _ in range(3)
+    ]
+
+    # then
+    session.expunge_all()
+
+    with record_query_stats() as stats:
+        assert await Authz(session).can_many(user, AccessType.write, issues) == [
+            True,
+            True,
+            True,
+            False,
+            False,
+            False,
+        ]
+
+    # Memberships, repositories and linked organizations
+    assert stats.count == 3
+
+    assert (
+        await Authz(session).can_many(Anonymous(), AccessType.read, issues)
+        == [False] * 6
+    )
@@ -8,14 +8,15 @@ from httpx import AsyncClient
 from pytest_mock import MockerFixture
 
 from polar.auth.scope import Scope
+from polar.checkout.service import CHECKOUT_CLIENT_SECRET_PREFIX
 from polar.checkout.service import checkout as checkout_service
 from polar.checkout.tax import calculate_tax
 from polar.integrations.stripe.service import StripeService
-from polar.models import Checkout, Product, UserOrganization
+from polar.models import Checkout, CheckoutLink, Product, UserOrganization
 from polar.postgres import AsyncSession
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
-from tests.fixtures.random_objects import create_checkout
+from tests.fixtures.random_objects import create_checkout, create_checkout_link
 
 API_PREFIX = "/v1/checkouts/custom"
 
@@ -42,6 +43,13 @@ async def checkout_open(
     return await create_checkout(save_fixture, price=product_one_time.prices[0])
 
 
+@pytest_asyncio.fixture
+async def checkout_link(
+    save_fixture: SaveFixture, product_one_time: Product
+) -> CheckoutLink:
+    return await create_checkout_link(save_fixture, price=product_one_time.prices[0])
+
+
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
 class TestGet:
@@ -211,6 +219,34 @@ class TestClientGet:
         assert json["id"] == str(checkout_open.id)
         assert "metadata" not in json
 
+    async def test_pending_token(
+        self, client: AsyncClient, checkout_link: CheckoutLink
+    ) -> None:
+        token = checkout_service.create_pending_checkout_token(checkout_link)
+
+        # Only a preview until the first update
+        response = await client.get(f"{API_PREFIX}/client/{token}")
+
+        assert response.status_code == 200
+        json = response.json()
+        assert json["client_secret"] == token
+        assert json["product_price_id"] == str(checkout_link.product_price_id)
+
+        response = await client.patch(
+            f"{API_PREFIX}/client/{token}",
+            json={"customer_email": "customer@example.com"},
+        )
+
+        assert response.status_code == 200
+        json = response.json()
+        assert json["client_secret"].startswith(CHECKOUT_CLIENT_SECRET_PREFIX)
+        assert json["customer_email"] == "customer@example.com"
+
+        response = await client.get(f"{API_PREFIX}/client/{token}")
+
+        assert response.status_code == 200
+        assert response.json()["id"] == json["id"]
+
 
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.checkout.ip_geolocation import IPGeolocationDatabase
+
+
+@pytest.fixture
+def database_path(tmp_path: Path) -> Path:
+    path = tmp_path / "ip-geolocation.mmdb"
+    path.write_bytes(b"v1")
+    return path
+
+
+@pytest.fixture
+def client_class_mock(mocker: MockerFixture) -> MagicMock:
+    mock = MagicMock()
+    mock.return_value.getCountry.return_value = "FR"
+    mocker.patch("polar.checkout.ip_geolocation.ipinfo_db.Client", new=mock)
+    return mock
+
+
+def replace_database(path: Path, content: bytes) -> None:
+    temporary_path = path.with_suffix(".tmp")
+    temporary_path.write_bytes(content)
+    os.replace(temporary_path, path)
+
+
+class TestIPGeolocationDatabase:
+    def test_cached_lookups(
+        self, database_path: Path, client_class_mock: MagicMock
+    ) -> None:
+        database = IPGeolocationDatabase(database_path)
+        client = client_class_mock.return_value
+
+        assert database.get_country("1.1.1.1") == "FR"
+        assert database.get_country("1.1.1.1") == "FR"
+        client.getCountry.assert_called_once_with("1.1.1.1")
+
+        assert database.get_country("8.8.8.8") == "FR"
+        assert client.getCountry.call_count == 2
+
+    def test_cache_maxsize(
+        self, database_path: Path, client_class_mock: MagicMock
+    ) -> None:
+        database = IPGeolocationDatabase(database_path, cache_maxsize=1)
+        client = client_class_mock.return_value
+
+        database.get_country("1.1.1.1")
+        database.get_country("8.8.8.8")
+        database.get_country("1.1.1.1")
+
+        assert client.getCountry.call_count == 3
+
+    def test_reload_if_changed(
+        self, database_path: Path, client_class_mock: MagicMock
+    ) -> None:
+        database = IPGeolocationDatabase(database_path)
+        previous_client = client_class_mock.return_value
+        database.get_country("1.1.1.1")
+
+        assert database.reload_if_changed(force_check=True) is False
+
+        replace_database(database_path, b"v2")
+        client_class_mock.return_value = MagicMock()
+        client_class_mock.return_value.getCountry.return_value = "DE"
+
+        # Not checked before the interval
+        assert database.reload_if_changed() is False
+        assert database.get_country("1.1.1.1") == "FR"
+
+        assert database.reload_if_changed(force_check=True) is True
+        previous_client.close.assert_called_once()
+        assert database.get_country("1.1.1.1") == "DE"
+
+    def test_reload_missing_file(
+        self, database_path: Path, client_class_mock: MagicMock
+    ) -> None:
+        database = IPGeolocationDatabase(database_path, reload_check_interval=0)
+        database_path.unlink()
+
+        assert database.reload_if_changed() is False
+        assert database.get_country("1.1.1.1") == "FR"
+        client_class_mock.return_value.close.assert_not_called()
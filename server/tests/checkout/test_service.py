@@ -9,6 +9,7 @@ import pytest_asyncio
 import stripe as stripe_lib
 from pydantic_core import Url
 from pytest_mock import MockerFixture
+from sqlalchemy import select, update
 
 from polar.auth.models import Anonymous, AuthMethod, AuthSubject
 from polar.checkout.schemas import (
@@ -18,6 +19,8 @@ from polar.checkout.schemas import (
     CheckoutUpdate,
 )
 from polar.checkout.service import (
+    CHECKOUT_CLIENT_SECRET_PREFIX,
+    CHECKOUT_PENDING_TOKEN_PREFIX,
     CheckoutDoesNotExist,
     NoCustomerOnCheckout,
     NoCustomerOnPaymentIntent,
@@ -25,6 +28,7 @@ from polar.checkout.service import (
     NotAFreePrice,
     NotConfirmedCheckout,
     NotOpenCheckout,
+    PaymentError,
     PaymentIntentNotSucceeded,
 )
 from polar.checkout.service import checkout as checkout_service
@@ -1021,6 +1025,161 @@ class TestCheckoutLinkCreate:
         assert checkout.user_metadata == {"key": "value"}
 
 
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetOrCreateFromPendingToken:
+    async def test_archived_product(
+        self,
+        save_fixture: SaveFixture,
+        product_one_time: Product,
+    ) -> None:
+        product_one_time.is_archived = True
+        await save_fixture(product_one_time)
+        checkout_link = await create_checkout_link(
+            save_fixture, price=product_one_time.prices[0]
+        )
+        with pytest.raises(PolarRequestValidationError):
+            checkout_service.create_pending_checkout_token(checkout_link)
+
+    async def test_invalid_token(self, session: AsyncSession) -> None:
+        checkout = await checkout_service.get_or_create_from_pending_token(
+            session, f"{CHECKOUT_PENDING_TOKEN_PREFIX}invalid"
+        )
+        assert checkout is None
+
+    async def test_deleted_checkout_link(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        product_one_time: Product,
+    ) -> None:
+        checkout_link = await create_checkout_link(
+            save_fixture, price=product_one_time.prices[0]
+        )
+        token = checkout_service.create_pending_checkout_token(checkout_link)
+        checkout_link.set_deleted_at()
+        await save_fixture(checkout_link)
+
+        checkout = await checkout_service.get_or_create_from_pending_token(
+            session, token
+        )
+        assert checkout is None
+
+    async def test_valid(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        product_one_time: Product,
+    ) -> None:
+        price = product_one_time.prices[0]
+        checkout_link = await create_checkout_link(
+            save_fixture, price=price, success_url="https://example.com/success"
+        )
+        token = checkout_service.create_pending_checkout_token(
+            checkout_link, "https://example.com"
+        )
+
+        checkout = await checkout_service.get_or_create_from_pending_token(
+            session, token, None, "127.0.0.1"
+        )
+
+        assert checkout is not None
+        assert checkout.client_secret.startswith(CHECKOUT_CLIENT_SECRET_PREFIX)
+        assert checkout.product_price == price
+        assert checkout.embed_origin == "https://example.com"
+        assert checkout.customer_ip_address == "127.0.0.1"
+        assert checkout.success_url == "https://example.com/success"
+
+        same_checkout = await checkout_service.get_or_create_from_pending_token(
+            session, token
+        )
+        assert same_checkout == checkout
+
+        other_token = checkout_service.create_pending_checkout_token(checkout_link)
+        other_checkout = await checkout_service.get_or_create_from_pending_token(
+            session, other_token
+        )
+        assert other_checkout is not None
+        assert other_checkout != checkout
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetOrPreviewFromPendingToken:
+    async def test_invalid_token(self, session: AsyncSession) -> None:
+        checkout = await checkout_service.get_or_preview_from_pending_token(
+            session, f"{CHECKOUT_PENDING_TOKEN_PREFIX}invalid"
+        )
+        assert checkout is None
+
+    async def test_preview(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        product_one_time: Product,
+    ) -> None:
+        price = product_one_time.prices[0]
+        assert isinstance(price, ProductPriceFixed)
+        checkout_link = await create_checkout_link(
+            save_fixture, price=price, success_url="https://example.com/success"
+        )
+        token = checkout_service.create_pending_checkout_token(
+            checkout_link, "https://example.com"
+        )
+
+        preview = await checkout_service.get_or_preview_from_pending_token(
+            session, token
+        )
+
+        assert preview is not None
+        assert preview not in session
+        assert preview.client_secret == token
+        assert preview.product_price == price
+        assert preview.amount == price.price_amount
+        assert preview.embed_origin == "https://example.com"
+        assert preview.customer_ip_address is None
+        assert preview.success_url == "https://example.com/success"
+
+        result = await session.execute(
+            select(Checkout).where(Checkout.product_price_id == price.id)
+        )
+        assert result.scalars().all() == []
+
+        # The ID stays the same, including once the checkout is created
+        other_preview = await checkout_service.get_or_preview_from_pending_token(
+            session, token
+        )
+        assert other_preview is not None
+        assert other_preview.id == preview.id
+
+        checkout = await checkout_service.get_or_create_from_pending_token(
+            session, token
+        )
+        assert checkout is not None
+        assert checkout.id == preview.id
+
+    async def test_created(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        product_one_time: Product,
+    ) -> None:
+        checkout_link = await create_checkout_link(
+            save_fixture, price=product_one_time.prices[0]
+        )
+        token = checkout_service.create_pending_checkout_token(checkout_link)
+        checkout = await checkout_service.get_or_create_from_pending_token(
+            session, token
+        )
+
+        preview = await checkout_service.get_or_preview_from_pending_token(
+            session, token
+        )
+
+        assert checkout is not None
+        assert preview == checkout
+
+
 @pytest.mark.asyncio
 @pytest.mark.skip_db_asserts
 class TestUpdate:
@@ -1304,6 +1463,35 @@ class TestUpdate:
         assert checkout.customer_billing_address is not None
         assert checkout.customer_billing_address.country == "FR"
 
+    async def test_unchanged_tax_inputs(
+        self,
+        session: AsyncSession,
+        calculate_tax_mock: AsyncMock,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        calculate_tax_mock.return_value = 100
+        checkout = await checkout_service.update(
+            session,
+            checkout_one_time_fixed,
+            CheckoutUpdate(
+                customer_billing_address=Address.model_validate({"country": "FR"}),
+            ),
+        )
+        calculate_tax_mock.reset_mock()
+
+        checkout = await checkout_service.update(
+            session,
+            checkout,
+            CheckoutUpdate(
+                customer_name="John Doe",
+                customer_billing_address=Address.model_validate({"country": "FR"}),
+            ),
+        )
+
+        calculate_tax_mock.assert_not_called()
+        assert checkout.tax_amount == 100
+        assert checkout.customer_name == "John Doe"
+
     async def test_ignore_email_update_if_customer_set(
         self,
         session: AsyncSession,
@@ -1604,6 +1792,250 @@ class TestConfirm:
         assert checkout.status == CheckoutStatus.confirmed
         stripe_service_mock.update_customer.assert_called_once()
 
+    async def test_valid_stripe_existing_customer_update_error(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture, stripe_customer_id="STRIPE_CUSTOMER_ID")
+        checkout_one_time_fixed.customer = user
+        checkout_one_time_fixed.customer_email = user.email
+        await save_fixture(checkout_one_time_fixed)
+
+        stripe_service_mock.update_customer.side_effect = stripe_lib.StripeError(
+            "ERROR"
+        )
+
+        with pytest.raises(PaymentError):
+            await checkout_service.confirm(
+                session,
+                checkout_one_time_fixed,
+                CheckoutConfirmStripe.model_validate(
+                    {
+                        "confirmation_token_id": "CONFIRMATION_TOKEN_ID",
+                        "customer_name": "Customer Name",
+                        "customer_billing_address": {"country": "FR"},
+                    }
+                ),
+            )
+
+        stripe_service_mock.create_payment_intent.assert_not_called()
+
+    async def test_valid_stripe_existing_customer_unchanged(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture, stripe_customer_id="STRIPE_CUSTOMER_ID")
+        last_checkout = await create_checkout(
+            save_fixture,
+            price=checkout_one_time_fixed.product_price,
+            status=CheckoutStatus.succeeded,
+            customer=user,
+            payment_processor_metadata={"customer_id": "STRIPE_CUSTOMER_ID"},
+        )
+        last_checkout.customer_email = user.email
+        last_checkout.customer_name = "Customer Name"
+        last_checkout.customer_billing_address = Address.model_validate(
+            {"country": "FR"}
+        )
+        last_checkout.customer_tax_id = ("FR61954506077", TaxIDFormat.eu_vat)
+        await save_fixture(last_checkout)
+        checkout_one_time_fixed.customer = user
+        checkout_one_time_fixed.customer_email = user.email
+        await save_fixture(checkout_one_time_fixed)
+
+        stripe_service_mock.create_payment_intent.return_value = SimpleNamespace(
+            client_secret="CLIENT_SECRET", status="succeeded"
+        )
+
+        checkout = await checkout_service.confirm(
+            session,
+            checkout_one_time_fixed,
+            CheckoutConfirmStripe.model_validate(
+                {
+                    "confirmation_token_id": "CONFIRMATION_TOKEN_ID",
+                    "customer_name": "Customer Name",
+                    "customer_billing_address": {"country": "FR"},
+                    "customer_tax_id": "FR61954506077",
+                }
+            ),
+        )
+
+        assert checkout.status == CheckoutStatus.confirmed
+        stripe_service_mock.update_customer.assert_not_called()
+        stripe_service_mock.create_payment_intent.assert_called_once()
+
+    async def test_valid_stripe_existing_customer_changed_address(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture, stripe_customer_id="STRIPE_CUSTOMER_ID")
+        last_checkout = await create_checkout(
+            save_fixture,
+            price=checkout_one_time_fixed.product_price,
+            status=CheckoutStatus.succeeded,
+            customer=user,
+            payment_processor_metadata={"customer_id": "STRIPE_CUSTOMER_ID"},
+        )
+        last_checkout.customer_email = user.email
+        last_checkout.customer_name = "Customer Name"
+        last_checkout.customer_billing_address = Address.model_validate(
+            {"country": "US"}
+        )
+        last_checkout.customer_tax_id = ("FR61954506077", TaxIDFormat.eu_vat)
+        await save_fixture(last_checkout)
+        checkout_one_time_fixed.customer = user
+        checkout_one_time_fixed.customer_email = user.email
+        await save_fixture(checkout_one_time_fixed)
+
+        stripe_service_mock.create_payment_intent.return_value = SimpleNamespace(
+            client_secret="CLIENT_SECRET", status="succeeded"
+        )
+
+        checkout = await checkout_service.confirm(
+            session,
+            checkout_one_time_fixed,
+            CheckoutConfirmStripe.model_validate(
+                {
+                    "confirmation_token_id": "CONFIRMATION_TOKEN_ID",
+                    "customer_name": "Customer Name",
+                    "customer_billing_address": {"country": "FR"},
+                    "customer_tax_id": "FR61954506077",
+                }
+            ),
+        )
+
+        assert checkout.status == CheckoutStatus.confirmed
+        stripe_service_mock.update_customer.assert_called_once_with(
+            "STRIPE_CUSTOMER_ID", tax_id=None, address={"country": "FR"}
+        )
+
+    async def test_valid_stripe_new_user_customer(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture)
+        checkout_one_time_fixed.customer = user
+        checkout_one_time_fixed.customer_email = user.email
+        await save_fixture(checkout_one_time_fixed)
+
+        stripe_service_mock.create_customer.return_value = SimpleNamespace(
+            id="STRIPE_CUSTOMER_ID"
+        )
+        stripe_service_mock.create_payment_intent.return_value = SimpleNamespace(
+            client_secret="CLIENT_SECRET", status="succeeded"
+        )
+
+        checkout = await checkout_service.confirm(
+            session,
+            checkout_one_time_fixed,
+            CheckoutConfirmStripe.model_validate(
+                {
+                    "confirmation_token_id": "CONFIRMATION_TOKEN_ID",
+                    "customer_name": "Customer Name",
+                    "customer_billing_address": {"country": "FR"},
+                }
+            ),
+        )
+
+        assert checkout.status == CheckoutStatus.confirmed
+        stripe_service_mock.update_customer.assert_not_called()
+        assert checkout.payment_processor_metadata["customer_id"] == (
+            "STRIPE_CUSTOMER_ID"
+        )
+        # The user's own customer is provisioned separately
+        assert user.stripe_customer_id is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestProvisionStripeCustomer:
+    async def test_anonymous(
+        self,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        await checkout_service.provision_stripe_customer(
+            session, checkout_one_time_fixed.id
+        )
+
+        stripe_service_mock.get_or_create_user_customer.assert_not_called()
+
+    async def test_existing_customer(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture, stripe_customer_id="STRIPE_CUSTOMER_ID")
+        checkout_one_time_fixed.customer = user
+        await save_fixture(checkout_one_time_fixed)
+
+        await checkout_service.provision_stripe_customer(
+            session, checkout_one_time_fixed.id
+        )
+
+        stripe_service_mock.get_or_create_user_customer.assert_not_called()
+
+    async def test_new_customer(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture)
+        checkout_one_time_fixed.customer = user
+        await save_fixture(checkout_one_time_fixed)
+
+        await checkout_service.provision_stripe_customer(
+            session, checkout_one_time_fixed.id
+        )
+
+        stripe_service_mock.get_or_create_user_customer.assert_called_once()
+        assert (
+            stripe_service_mock.get_or_create_user_customer.call_args[0][1].id
+            == user.id
+        )
+
+    async def test_concurrently_created_customer(
+        self,
+        save_fixture: SaveFixture,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        checkout_one_time_fixed: Checkout,
+    ) -> None:
+        user = await create_user(save_fixture)
+        checkout_one_time_fixed.customer = user
+        await save_fixture(checkout_one_time_fixed)
+
+        # Simulate another provisioning task saving it in the meantime
+        await session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(stripe_customer_id="STRIPE_CUSTOMER_ID")
+            .execution_options(synchronize_session=False)
+        )
+
+        await checkout_service.provision_stripe_customer(
+            session, checkout_one_time_fixed.id
+        )
+
+        stripe_service_mock.get_or_create_user_customer.assert_not_called()
+
 
 def build_stripe_payment_intent(
     *,
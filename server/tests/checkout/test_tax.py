@@ -1,7 +1,20 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
+import stripe as stripe_lib
 from pydantic_extra_types.country import CountryAlpha2
+from pytest_mock import MockerFixture
 
-from polar.checkout.tax import TaxID, TaxIDFormat, validate_tax_id
+from polar.checkout.tax import (
+    IncompleteTaxLocation,
+    TaxID,
+    TaxIDFormat,
+    calculate_tax,
+    validate_tax_id,
+)
+from polar.kit.address import Address
+from polar.redis import Redis
 
 
 @pytest.mark.parametrize(
@@ -42,3 +55,67 @@ def test_validate_tax_id_valid(
 def test_validate_tax_id_invalid(number: str, country: CountryAlpha2) -> None:
     with pytest.raises(ValueError):
         validate_tax_id(number, country)
+
+
+@pytest.fixture
+def create_tax_calculation_mock(mocker: MockerFixture) -> AsyncMock:
+    mock = AsyncMock(return_value=MagicMock(tax_amount_exclusive=100))
+    mocker.patch("polar.checkout.tax.stripe_service.create_tax_calculation", new=mock)
+    return mock
+
+
+@pytest.mark.asyncio
+class TestCalculateTax:
+    async def test_cached(
+        self, redis: Redis, create_tax_calculation_mock: AsyncMock
+    ) -> None:
+        address = Address.model_validate({"country": "FR"})
+
+        assert (
+            await calculate_tax("usd", 1000, "PRODUCT_ID", address, [], redis=redis)
+            == 100
+        )
+        assert (
+            await calculate_tax("usd", 1000, "PRODUCT_ID", address, [], redis=redis)
+            == 100
+        )
+        create_tax_calculation_mock.assert_awaited_once()
+
+        assert (
+            await calculate_tax("usd", 2000, "PRODUCT_ID", address, [], redis=redis)
+            == 100
+        )
+        assert create_tax_calculation_mock.await_count == 2
+
+    async def test_concurrent_calls(
+        self, redis: Redis, create_tax_calculation_mock: AsyncMock
+    ) -> None:
+        address = Address.model_validate({"country": "FR"})
+
+        results = await asyncio.gather(
+            *(
+                calculate_tax("usd", 1000, "PRODUCT_ID", address, [], redis=redis)
+                for _ in range(5)
+            )
+        )
+
+        assert results == [100] * 5
+        create_tax_calculation_mock.assert_awaited_once()
+
+    async def test_error_not_cached(
+        self, redis: Redis, create_tax_calculation_mock: AsyncMock
+    ) -> None:
+        address = Address.model_validate({"country": "US"})
+        param = "customer_details[address][state]"
+        create_tax_calculation_mock.side_effect = stripe_lib.InvalidRequestError(
+            "ERROR", param, json_body={"error": {"param": param}}
+        )
+
+        with pytest.raises(IncompleteTaxLocation):
+            await calculate_tax("usd", 1000, "PRODUCT_ID", address, [], redis=redis)
+
+        create_tax_calculation_mock.side_effect = None
+        assert (
+            await calculate_tax("usd", 1000, "PRODUCT_ID", address, [], redis=redis)
+            == 100
+        )
@@ -3,7 +3,7 @@ import pytest_asyncio
 from httpx import AsyncClient
 
 from polar.auth.scope import Scope
-from polar.checkout.service import CHECKOUT_CLIENT_SECRET_PREFIX
+from polar.checkout.service import CHECKOUT_PENDING_TOKEN_PREFIX
 from polar.models import CheckoutLink, Product, UserOrganization
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
@@ -197,4 +197,5 @@ class TestRedirect:
         )
 
         assert response.status_code == 307
-        assert CHECKOUT_CLIENT_SECRET_PREFIX in response.headers["location"]
+        assert CHECKOUT_PENDING_TOKEN_PREFIX in response.headers["location"]
+        assert response.headers["RateLimit-Limit"] == "30"
@@ -5,9 +5,11 @@ import pytest_asyncio
 from pydantic import BaseModel, ValidationError
 
 from polar.custom_field.data import (
+    CustomFieldDataSchemaCache,
     build_custom_field_data_schema,
     custom_field_data_models,
 )
+from polar.kit.utils import utc_now
 from polar.models import Organization
 from polar.models.custom_field import CustomFieldType
 from tests.fixtures.database import SaveFixture
@@ -119,6 +121,37 @@ async def test_checkbox_input(
     assert getattr(data, "checkbox1") is True
 
 
+@pytest.mark.skip_db_asserts
+@pytest.mark.asyncio
+async def test_schema_cache(
+    save_fixture: SaveFixture, organization: Organization
+) -> None:
+    text_field = await create_custom_field(
+        save_fixture,
+        type=CustomFieldType.text,
+        slug="text1",
+        organization=organization,
+    )
+    cache = CustomFieldDataSchemaCache(maxsize=2)
+
+    schema = cache.get([(text_field, False)])
+    assert cache.get([(text_field, False)]) is schema
+    assert cache.get([(text_field, True)]) is not schema
+
+    text_field.modified_at = utc_now()
+    updated_schema = cache.get([(text_field, False)])
+    assert updated_schema is not schema
+
+    # Least recently used schema was evicted
+    modified_at = text_field.modified_at
+    text_field.modified_at = None
+    assert cache.get([(text_field, False)]) is not schema
+    text_field.modified_at = modified_at
+
+    cache.invalidate(text_field.id)
+    assert cache.get([(text_field, False)]) is not updated_schema
+
+
 def test_custom_field_data_models() -> None:
     for model in custom_field_data_models:
         assert hasattr(model, "organization"), (
@@ -1,5 +1,6 @@
 import pytest
 import pytest_asyncio
+from pytest_mock import MockerFixture
 
 from polar.custom_field.schemas import CustomFieldUpdateText
 from polar.custom_field.service import custom_field as custom_field_service
@@ -7,7 +8,11 @@ from polar.models import Order, Organization, Product, User
 from polar.models.custom_field import CustomFieldText, CustomFieldType
 from polar.postgres import AsyncSession
 from tests.fixtures.database import SaveFixture
-from tests.fixtures.random_objects import create_custom_field, create_order
+from tests.fixtures.random_objects import (
+    create_custom_field,
+    create_order,
+    create_product,
+)
 
 
 @pytest_asyncio.fixture
@@ -59,3 +64,53 @@ class TestUpdate:
             "foo": "bar",
             "updatedslug": "text1",
         }
+
+    async def test_product_snapshots_invalidated(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        text_field: CustomFieldText,
+    ) -> None:
+        invalidate_mock = mocker.patch(
+            "polar.custom_field.service.product_snapshot_cache.invalidate"
+        )
+        product = await create_product(
+            save_fixture,
+            organization=organization,
+            attached_custom_fields=[(text_field, False)],
+        )
+
+        await custom_field_service.update(
+            session,
+            text_field,
+            CustomFieldUpdateText(type=text_field.type, name="Updated Name"),
+        )
+
+        invalidate_mock.assert_called_once_with(product.id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestDelete:
+    async def test_product_snapshots_invalidated(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        text_field: CustomFieldText,
+    ) -> None:
+        invalidate_mock = mocker.patch(
+            "polar.custom_field.service.product_snapshot_cache.invalidate"
+        )
+        product = await create_product(
+            save_fixture,
+            organization=organization,
+            attached_custom_fields=[(text_field, False)],
+        )
+
+        await custom_field_service.delete(session, text_field)
+
+        invalidate_mock.assert_called_once_with(product.id)
@@ -307,3 +307,35 @@ async def test_get_only_badged_is_badged(
     res = response.json()
 
     assert len(res["data"]) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+@pytest.mark.auth
+async def test_get_many_pledges_within_query_budget(
+    save_fixture: SaveFixture,
+    user: User,
+    organization: Organization,
+    external_organization_linked: ExternalOrganization,
+    repository_linked: Repository,
+    user_organization: UserOrganization,  # makes User a member of Organization
+    pledging_organization: Organization,
+    issue_linked: Issue,
+    client: AsyncClient,
+) -> None:
+    for _ in range(10):
+        await create_pledge(
+            save_fixture,
+            external_organization_linked,
+            repository_linked,
+            issue_linked,
+            pledging_user=await create_user(save_fixture),
+        )
+
+    response = await client.get(f"/v1/dashboard/organization/{organization.id}")
+
+    assert response.status_code == 200
+    res = response.json()
+
+    assert len(res["data"]) == 1
+    assert len(res["data"][0]["pledges"]) == 10
@@ -0,0 +1,120 @@
+from unittest.mock import MagicMock
+
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from polar.auth.models import AuthMethod, AuthSubject
+from polar.auth.scope import Scope
+from polar.export.schemas import SubscriptionsExportParameters
+from polar.export.service import export as export_service
+from polar.kit.utils import generate_uuid
+from polar.models import Organization, User
+from polar.redis import Redis
+from tests.fixtures.auth import AuthSubjectFixture
+
+
+@pytest.fixture(autouse=True)
+def enqueue_job_mock(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.export.service.enqueue_job")
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestGetExport:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get(f"/v1/exports/{generate_uuid()}")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth
+    async def test_not_existing(self, client: AsyncClient) -> None:
+        response = await client.get(f"/v1/exports/{generate_uuid()}")
+
+        assert response.status_code == 404
+
+    @pytest.mark.auth(AuthSubjectFixture(subject="user_second"))
+    async def test_other_subject(
+        self, client: AsyncClient, redis: Redis, user: User
+    ) -> None:
+        job = await export_service.create(
+            redis,
+            AuthSubject(user, set(), AuthMethod.COOKIE),
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        response = await client.get(f"/v1/exports/{job.id}")
+
+        assert response.status_code == 404
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="user", scopes={Scope.articles_write}),
+        AuthSubjectFixture(subject="organization", scopes={Scope.articles_write}),
+    )
+    async def test_insufficient_scopes(
+        self,
+        client: AsyncClient,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+    ) -> None:
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        response = await client.get(f"/v1/exports/{job.id}")
+
+        assert response.status_code == 404
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="user"),
+        AuthSubjectFixture(subject="organization"),
+    )
+    async def test_valid(
+        self,
+        client: AsyncClient,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+    ) -> None:
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        response = await client.get(f"/v1/exports/{job.id}")
+
+        assert response.status_code == 200
+
+        json = response.json()
+        assert json["id"] == str(job.id)
+        assert json["type"] == "subscriptions"
+        assert json["status"] == "pending"
+        assert json["url"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestCreateSubscriptionsExport:
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="user"),
+        AuthSubjectFixture(subject="organization"),
+    )
+    async def test_valid(
+        self, enqueue_job_mock: MagicMock, client: AsyncClient
+    ) -> None:
+        response = await client.post("/v1/subscriptions/export")
+
+        assert response.status_code == 202
+
+        json = response.json()
+        assert json["status"] == "pending"
+        enqueue_job_mock.assert_called_once()
+        assert str(enqueue_job_mock.call_args[1]["export_id"]) == json["id"]
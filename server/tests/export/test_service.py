@@ -0,0 +1,246 @@
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import IO, Any
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.auth.models import AuthMethod, AuthSubject
+from polar.auth.scope import Scope
+from polar.export.schemas import (
+    ExportStatus,
+    PayoutTransactionsExportParameters,
+    SubscriptionsExportParameters,
+)
+from polar.export.service import export as export_service
+from polar.integrations.aws.s3 import S3Service
+from polar.kit.utils import generate_uuid
+from polar.models import Organization, Product, User
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker import JobContext
+from tests.fixtures.auth import AuthSubjectFixture
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_active_subscription
+
+
+@pytest.fixture(autouse=True)
+def enqueue_job_mock(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.export.service.enqueue_job")
+
+
+@pytest.fixture
+def eventstream_publish_mock(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.export.service.eventstream_publish")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestCreate:
+    @pytest.mark.auth
+    async def test_valid(
+        self,
+        enqueue_job_mock: MagicMock,
+        auth_subject: AuthSubject[User],
+        redis: Redis,
+    ) -> None:
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        assert job.status == ExportStatus.pending
+        enqueue_job_mock.assert_called_once_with("export.run", export_id=job.id)
+
+        assert await export_service.get(redis, auth_subject, job.id) == job
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGet:
+    @pytest.mark.auth
+    async def test_other_subject(
+        self, auth_subject: AuthSubject[User], user_second: User, redis: Redis
+    ) -> None:
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        assert (
+            await export_service.get(
+                redis,
+                AuthSubject(user_second, auth_subject.scopes, auth_subject.method),
+                job.id,
+            )
+            is None
+        )
+
+    @pytest.mark.auth
+    async def test_insufficient_scopes(
+        self, auth_subject: AuthSubject[User], redis: Redis
+    ) -> None:
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            PayoutTransactionsExportParameters(payout_id=generate_uuid()),
+            filename="polar-payout.csv",
+            mime_type="text/csv",
+        )
+
+        # A token of the same user that couldn't have created the export
+        token_auth_subject = AuthSubject(
+            auth_subject.subject,
+            {Scope.subscriptions_read},
+            AuthMethod.OAUTH2_ACCESS_TOKEN,
+        )
+        assert await export_service.get(redis, token_auth_subject, job.id) is None
+
+
+@pytest.mark.asyncio
+class TestRun:
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_subscriptions(
+        self,
+        mocker: MockerFixture,
+        eventstream_publish_mock: MagicMock,
+        auth_subject: AuthSubject[Organization],
+        job_context: JobContext,
+        redis: Redis,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        user_second: User,
+        product: Product,
+    ) -> None:
+        await create_active_subscription(
+            save_fixture,
+            product=product,
+            user=user_second,
+            started_at=datetime(2023, 1, 1),
+        )
+
+        # then
+        session.expunge_all()
+
+        uploaded: dict[str, bytes] = {}
+
+        def _upload(data: IO[bytes], *, path: str, mime_type: str) -> None:
+            uploaded[path] = data.read()
+
+        mocker.patch.object(S3Service, "upload", side_effect=_upload)
+
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+        job = await export_service.run(
+            session, job_context["async_sessionmaker"], redis, job.id
+        )
+
+        assert job.status == ExportStatus.succeeded
+        assert job.path is not None
+        lines = uploaded[job.path].decode().splitlines()
+        assert lines[0].startswith("Email,")
+        assert len(lines) == 2
+        assert lines[1].startswith(user_second.email)
+
+        eventstream_publish_mock.assert_called_once()
+        assert eventstream_publish_mock.call_args[0][0] == "export.completed"
+        assert (
+            eventstream_publish_mock.call_args[1]["organization_id"]
+            == auth_subject.subject.id
+        )
+        payload = eventstream_publish_mock.call_args[0][1]
+        assert payload["id"] == str(job.id)
+        assert payload["url"] is not None
+
+        export = export_service.to_schema(job)
+        assert export.url is not None
+        assert export.expires_at is not None
+
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_generate_error(
+        self,
+        mocker: MockerFixture,
+        eventstream_publish_mock: MagicMock,
+        auth_subject: AuthSubject[Organization],
+        job_context: JobContext,
+        redis: Redis,
+        session: AsyncSession,
+    ) -> None:
+        async def _stream_csv(*args: Any, **kwargs: Any) -> AsyncIterator[bytes]:
+            yield b"Email\r\n"
+            raise RuntimeError()
+
+        mocker.patch("polar.export.service.stream_csv", side_effect=_stream_csv)
+        named_temporary_file_spy = mocker.spy(tempfile, "NamedTemporaryFile")
+
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        # then
+        session.expunge_all()
+
+        with pytest.raises(RuntimeError):
+            await export_service.run(
+                session, job_context["async_sessionmaker"], redis, job.id
+            )
+
+        named_temporary_file_spy.assert_called_once()
+        assert not os.path.exists(named_temporary_file_spy.spy_return.name)
+
+        updated_job = await export_service.get(redis, auth_subject, job.id)
+        assert updated_job is not None
+        assert updated_job.status == ExportStatus.failed
+        eventstream_publish_mock.assert_not_called()
+
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_upload_error(
+        self,
+        mocker: MockerFixture,
+        eventstream_publish_mock: MagicMock,
+        auth_subject: AuthSubject[Organization],
+        job_context: JobContext,
+        redis: Redis,
+        session: AsyncSession,
+    ) -> None:
+        mocker.patch.object(S3Service, "upload", side_effect=RuntimeError())
+
+        job = await export_service.create(
+            redis,
+            auth_subject,
+            SubscriptionsExportParameters(),
+            filename="polar-subscribers.csv",
+            mime_type="text/csv",
+        )
+
+        # then
+        session.expunge_all()
+
+        with pytest.raises(RuntimeError):
+            await export_service.run(
+                session, job_context["async_sessionmaker"], redis, job.id
+            )
+
+        updated_job = await export_service.get(redis, auth_subject, job.id)
+        assert updated_job is not None
+        assert updated_job.status == ExportStatus.failed
+        assert export_service.to_schema(updated_job).url is None
+        eventstream_publish_mock.assert_not_called()
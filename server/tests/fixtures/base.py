@@ -9,7 +9,7 @@ from polar.app import app
 from polar.auth.dependencies import get_auth_subject
 from polar.auth.models import AuthSubject, Subject
 from polar.checkout.ip_geolocation import _get_client_dependency
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncSession, get_db_read_session, get_db_session
 from polar.redis import Redis, get_redis
 
 
@@ -21,6 +21,7 @@ async def client(
     redis: Redis,
 ) -> AsyncGenerator[AsyncClient, None]:
     app.dependency_overrides[get_db_session] = lambda: session
+    app.dependency_overrides[get_db_read_session] = lambda: session
     app.dependency_overrides[get_redis] = lambda: redis
     app.dependency_overrides[get_auth_subject] = lambda: auth_subject
     app.dependency_overrides[_get_client_dependency] = lambda: None
@@ -52,4 +53,5 @@ async def client(
         yield client
 
     app.dependency_overrides.pop(get_db_session)
+    app.dependency_overrides.pop(get_db_read_session)
     app.dependency_overrides.pop(get_auth_subject)
@@ -9,7 +9,7 @@ from arq import ArqRedis
 
 from polar.kit.db.postgres import AsyncSession, AsyncSessionMaker
 from polar.kit.utils import utc_now
-from polar.postgres import create_async_engine
+from polar.postgres import create_async_engine, create_read_replica
 from polar.redis import Redis
 from polar.worker import JobContext, PolarWorkerContext
 
@@ -27,6 +27,10 @@ async def job_context(session: AsyncSession, redis: Redis) -> AsyncIterator[JobC
         "raw_redis": redis,
         "async_engine": engine,
         "async_sessionmaker": cast(AsyncSessionMaker, sessionmaker),
+        "async_read_engine": None,
+        "read_replica": create_read_replica(
+            cast(AsyncSessionMaker, sessionmaker), None
+        ),
         "job_id": "fake_job_id",
         "job_try": 1,
         "enqueue_time": utc_now(),
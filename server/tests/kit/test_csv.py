@@ -1,6 +1,9 @@
+import gzip
+from collections.abc import AsyncIterator
+
 import pytest
 
-from polar.kit.csv import get_emails_from_csv
+from polar.kit.csv import CSVStreamingResponse, get_emails_from_csv, stream_csv
 
 
 @pytest.mark.asyncio
@@ -47,3 +50,47 @@ async def test_get_emails_from_csv() -> None:
             "baz,bazexample.com",
         ]
     ) == {"foo@example.com", "bar@example.com"}
+
+
+async def _get_rows(count: int) -> AsyncIterator[tuple[int, str]]:
+    for i in range(count):
+        yield (i, f"row {i}")
+
+
+@pytest.mark.asyncio
+async def test_stream_csv() -> None:
+    chunks = [
+        chunk
+        async for chunk in stream_csv(_get_rows(5), header=("id", "name"), chunk_size=2)
+    ]
+
+    assert len(chunks) == 3
+    assert b"".join(chunks).decode() == (
+        "id,name\r\n0,row 0\r\n1,row 1\r\n2,row 2\r\n3,row 3\r\n4,row 4\r\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_csv_compress() -> None:
+    chunks = [
+        chunk
+        async for chunk in stream_csv(
+            _get_rows(1000), header=("id", "name"), chunk_size=100, compress=True
+        )
+    ]
+
+    content = gzip.decompress(b"".join(chunks)).decode()
+    lines = content.splitlines()
+    assert len(lines) == 1001
+    assert lines[0] == "id,name"
+    assert lines[-1] == "999,row 999"
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_csv_streaming_response_headers(compress: bool) -> None:
+    response = CSVStreamingResponse(
+        _get_rows(1), filename="export.csv", compress=compress
+    )
+
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert ("Content-Encoding" in response.headers) is compress
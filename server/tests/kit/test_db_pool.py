@@ -0,0 +1,61 @@
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from polar.config import settings
+from polar.kit.db.pool import InstrumentedAsyncAdaptedQueuePool
+from polar.kit.db.postgres import create_async_engine
+from tests.fixtures.database import get_database_url
+
+
+@pytest_asyncio.fixture
+async def engine(worker_id: str) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(
+        dsn=get_database_url(worker_id),
+        pool_size=1,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+    )
+    engine.sync_engine.pool._max_overflow = 0  # type: ignore[attr-defined]
+    yield engine
+    await engine.dispose()
+
+
+def get_pool(engine: AsyncEngine) -> InstrumentedAsyncAdaptedQueuePool:
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, InstrumentedAsyncAdaptedQueuePool)
+    return pool
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestInstrumentedAsyncAdaptedQueuePool:
+    async def test_wait_time_listeners(self, engine: AsyncEngine) -> None:
+        pool = get_pool(engine)
+        wait_times: list[float] = []
+        pool.wait_time_listeners.append(wait_times.append)
+
+        async with engine.connect():
+            pass
+
+        assert len(wait_times) == 1
+        assert pool.average_wait_time == pytest.approx(
+            pool.wait_time_smoothing * wait_times[0]
+        )
+
+    async def test_expected_wait_time(self, engine: AsyncEngine) -> None:
+        pool = get_pool(engine)
+        pool.average_wait_time = 2.0
+
+        assert pool.is_saturated() is False
+        assert pool.get_expected_wait_time() == 0.0
+
+        async with engine.connect():
+            pool.average_wait_time = 2.0
+            assert pool.is_saturated() is True
+            assert pool.get_expected_wait_time() == 2.0
+
+            pool.waiting = 1
+            assert pool.get_expected_wait_time() == 4.0
+            pool.waiting = 0
@@ -0,0 +1,175 @@
+import contextlib
+from collections.abc import AsyncIterator
+from typing import cast
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockerFixture
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import DBAPIError
+
+from polar.config import settings
+from polar.kit.db.postgres import (
+    AsyncSession,
+    AsyncSessionMaker,
+    ReadReplica,
+    create_async_engine,
+    get_replication_lag,
+    release_connection,
+)
+from tests.fixtures.database import TestModel, get_database_url
+
+
+@contextlib.asynccontextmanager
+async def get_engine_session(worker_id: str) -> AsyncIterator[AsyncSession]:
+    engine = create_async_engine(
+        dsn=get_database_url(worker_id),
+        pool_size=1,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+    )
+    async with AsyncSession(bind=engine, expire_on_commit=False) as session:
+        yield session
+        await session.rollback()
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def engine_session(worker_id: str) -> AsyncIterator[AsyncSession]:
+    """A session owning its connections, unlike the `session` fixture."""
+    async with get_engine_session(worker_id) as session:
+        yield session
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+async def test_get_replication_lag_primary(session: AsyncSession) -> None:
+    @contextlib.asynccontextmanager
+    async def sessionmaker() -> AsyncIterator[AsyncSession]:
+        yield session
+
+    assert await get_replication_lag(cast(AsyncSessionMaker, sessionmaker)) == 0
+
+
+@pytest.mark.asyncio
+class TestReadReplica:
+    async def test_no_replica(self) -> None:
+        primary = MagicMock()
+        read_replica = ReadReplica(primary, None, max_lag=5, lag_check_interval=5)
+
+        assert await read_replica.get_sessionmaker() is primary
+
+    @pytest.mark.parametrize(
+        ("lag", "use_replica"),
+        [(0.0, True), (5.0, True), (10.0, False), (RuntimeError(), False)],
+    )
+    async def test_lag(
+        self, lag: float | Exception, use_replica: bool, mocker: MockerFixture
+    ) -> None:
+        mocker.patch(
+            "polar.kit.db.postgres.get_replication_lag",
+            side_effect=lag if isinstance(lag, Exception) else None,
+            return_value=lag,
+        )
+        primary, replica = MagicMock(), MagicMock()
+        read_replica = ReadReplica(primary, replica, max_lag=5, lag_check_interval=5)
+
+        sessionmaker = await read_replica.get_sessionmaker()
+
+        assert sessionmaker is (replica if use_replica else primary)
+
+    async def test_lag_check_interval(self, mocker: MockerFixture) -> None:
+        get_replication_lag_mock = mocker.patch(
+            "polar.kit.db.postgres.get_replication_lag", return_value=10.0
+        )
+        monotonic_mock = mocker.patch(
+            "polar.kit.db.postgres.time.monotonic", return_value=100.0
+        )
+        primary, replica = MagicMock(), MagicMock()
+        read_replica = ReadReplica(primary, replica, max_lag=5, lag_check_interval=5)
+
+        assert await read_replica.get_sessionmaker() is primary
+
+        get_replication_lag_mock.return_value = 0.0
+        monotonic_mock.return_value = 104.0
+        assert await read_replica.get_sessionmaker() is primary
+
+        monotonic_mock.return_value = 105.0
+        assert await read_replica.get_sessionmaker() is replica
+        assert get_replication_lag_mock.call_count == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestReleaseConnection:
+    async def test_not_in_transaction(self, engine_session: AsyncSession) -> None:
+        assert await release_connection(engine_session) is True
+
+    async def test_read_only(self, engine_session: AsyncSession) -> None:
+        await engine_session.execute(select(TestModel))
+
+        assert await release_connection(engine_session) is True
+        assert engine_session.in_transaction() is False
+
+        # A new connection is acquired on the next query
+        await engine_session.execute(select(TestModel))
+        assert engine_session.in_transaction() is True
+
+    async def test_flushed_write(self, engine_session: AsyncSession) -> None:
+        engine_session.add(TestModel(id=1))
+        await engine_session.flush()
+
+        assert await release_connection(engine_session) is False
+        assert engine_session.in_transaction() is True
+
+    async def test_pending_write(self, engine_session: AsyncSession) -> None:
+        await engine_session.execute(select(TestModel))
+        engine_session.add(TestModel(id=1))
+
+        assert await release_connection(engine_session) is False
+
+    async def test_executed_write(self, engine_session: AsyncSession) -> None:
+        await engine_session.execute(update(TestModel).values(int_column=1))
+
+        assert await release_connection(engine_session) is False
+
+    async def test_locking_read(
+        self, worker_id: str, engine_session: AsyncSession
+    ) -> None:
+        engine_session.add(TestModel(id=1))
+        await engine_session.commit()
+
+        try:
+            await engine_session.execute(
+                select(TestModel).where(TestModel.id == 1).with_for_update()
+            )
+
+            assert await release_connection(engine_session) is False
+            assert engine_session.in_transaction() is True
+
+            # The row is still locked for the other transactions
+            async with get_engine_session(worker_id) as other_session:
+                with pytest.raises(DBAPIError):
+                    await other_session.execute(
+                        select(TestModel)
+                        .where(TestModel.id == 1)
+                        .with_for_update(nowait=True)
+                    )
+        finally:
+            await engine_session.rollback()
+            await engine_session.execute(delete(TestModel))
+            await engine_session.commit()
+
+    async def test_write_in_previous_transaction(
+        self, engine_session: AsyncSession
+    ) -> None:
+        await engine_session.execute(update(TestModel).values(int_column=1))
+        await engine_session.rollback()
+        await engine_session.execute(select(TestModel))
+
+        assert await release_connection(engine_session) is True
+
+    async def test_not_owned_connection(self, session: AsyncSession) -> None:
+        await session.execute(select(TestModel))
+
+        assert await release_connection(session) is False
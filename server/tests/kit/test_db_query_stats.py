@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import select, text
+
+from polar.kit.db.query_stats import get_query_budget, query_budget, record_query_stats
+from polar.postgres import AsyncSession
+from tests.fixtures.database import TestModel
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+async def test_record_query_stats(session: AsyncSession) -> None:
+    await session.execute(text("SELECT 1"))
+
+    with record_query_stats() as stats:
+        for _ in range(5):
+            await session.execute(select(TestModel))
+        await session.execute(text("SELECT 1"))
+
+    await session.execute(text("SELECT 1"))
+
+    assert stats.count == 6
+    assert stats.duration > 0
+    repeated_statements = stats.get_repeated_statements(threshold=5)
+    assert len(repeated_statements) == 1
+    assert repeated_statements[0][1] == 5
+
+
+def test_query_budget() -> None:
+    @query_budget(10)
+    async def endpoint() -> None: ...
+
+    assert get_query_budget(endpoint) == 10
+    assert get_query_budget(test_query_budget) is None
+    assert get_query_budget(None) is None
@@ -0,0 +1,68 @@
+import asyncio
+from collections.abc import Sequence
+from unittest.mock import MagicMock
+
+import pytest
+
+from polar.kit.loader import DataLoader, get_session_loader
+
+
+class BatchLoadFn:
+    def __init__(self) -> None:
+        self.calls: list[list[int]] = []
+
+    async def __call__(self, keys: Sequence[int]) -> dict[int, str]:
+        self.calls.append(list(keys))
+        return {key: str(key) for key in keys if key > 0}
+
+
+@pytest.mark.asyncio
+class TestDataLoader:
+    async def test_batching(self) -> None:
+        batch_load_fn = BatchLoadFn()
+        loader = DataLoader(batch_load_fn)
+
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), loader.load(1), loader.load(-1)
+        )
+
+        assert list(results) == ["1", "2", "1", None]
+        assert batch_load_fn.calls == [[1, 2, -1]]
+
+    async def test_sequential(self) -> None:
+        batch_load_fn = BatchLoadFn()
+        loader = DataLoader(batch_load_fn)
+
+        assert await loader.load(1) == "1"
+        assert await loader.load(1) == "1"
+        assert batch_load_fn.calls == [[1], [1]]
+
+    async def test_max_batch_size(self) -> None:
+        batch_load_fn = BatchLoadFn()
+        loader = DataLoader(batch_load_fn, max_batch_size=2)
+
+        assert await loader.load_many([1, 2, 3]) == ["1", "2", "3"]
+        assert batch_load_fn.calls == [[1, 2], [3]]
+
+    async def test_error(self) -> None:
+        async def batch_load_fn(keys: Sequence[int]) -> dict[int, str]:
+            raise ValueError()
+
+        loader = DataLoader(batch_load_fn)
+
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_get_session_loader() -> None:
+    session = MagicMock(info={})
+    batch_load_fn = BatchLoadFn()
+
+    loader = get_session_loader(session, "test", batch_load_fn)
+
+    assert get_session_loader(session, "test", BatchLoadFn()) is loader
+    assert loader.batch_load_fn is batch_load_fn
+    assert get_session_loader(session, "other", batch_load_fn) is not loader
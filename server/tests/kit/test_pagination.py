@@ -0,0 +1,160 @@
+from collections.abc import Sequence
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import ColumnElement, Select, UnaryExpression, select
+
+from polar.config import settings
+from polar.kit.pagination import (
+    CursorPaginationParams,
+    InvalidCursor,
+    ListResource,
+    PaginationCountMode,
+    PaginationParams,
+    paginate,
+    paginate_cursor,
+)
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture, TestModel
+
+
+async def _paginate_all(
+    session: AsyncSession,
+    statement: Select[tuple[TestModel]],
+    order_by: Sequence[ColumnElement[Any]],
+    limit: int,
+) -> list[list[int]]:
+    pages: list[list[int]] = []
+    cursor: str | None = None
+    while True:
+        results, cursor = await paginate_cursor(
+            session,
+            statement,
+            order_by=order_by,
+            pagination=CursorPaginationParams(cursor, limit),
+        )
+        pages.append([result.id for result in results])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.asyncio
+class TestPaginate:
+    @pytest.mark.parametrize(
+        ("pagination", "expected_count", "expected_total_count", "expected_capped"),
+        [
+            (PaginationParams(1, 2), 5, 5, False),
+            (PaginationParams(1, 2, PaginationCountMode.capped), 4, 3, True),
+            (PaginationParams(3, 2, PaginationCountMode.capped), 5, 5, False),
+            (PaginationParams(1, 2, PaginationCountMode.none), 2, 2, True),
+            (PaginationParams(3, 2, PaginationCountMode.none), 5, 5, False),
+        ],
+    )
+    async def test_count_mode(
+        self,
+        pagination: PaginationParams,
+        expected_count: int,
+        expected_total_count: int,
+        expected_capped: bool,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        mocker.patch.object(settings, "API_PAGINATION_COUNT_CAP", 3)
+        for id in range(1, 6):
+            await save_fixture(TestModel(id=id))
+
+        # then
+        session.expunge_all()
+
+        statement = select(TestModel).order_by(TestModel.id)
+        results, count = await paginate(session, statement, pagination=pagination)
+
+        assert len(results) == (1 if pagination.page == 3 else 2)
+        assert count == expected_count
+
+        list_resource = ListResource[int].from_paginated_results(
+            [result.id for result in results], count, pagination
+        )
+        assert list_resource.pagination.total_count == expected_total_count
+        assert list_resource.pagination.total_count_capped == expected_capped
+
+
+@pytest.mark.asyncio
+class TestPaginateCursor:
+    @pytest.mark.parametrize(
+        ("order_by", "expected"),
+        [
+            (TestModel.int_column.asc(), [[2, 4], [1, 5], [3, 6]]),
+            (TestModel.int_column.desc(), [[6, 3], [5, 1], [4, 2]]),
+            (TestModel.int_column.desc().nulls_last(), [[3, 5], [1, 4], [2, 6]]),
+            (TestModel.int_column.asc().nulls_first(), [[6, 2], [4, 1], [5, 3]]),
+        ],
+    )
+    async def test_sort_with_nulls(
+        self,
+        order_by: UnaryExpression[Any],
+        expected: list[list[int]],
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        for id, int_column in [(1, 20), (2, 10), (3, 30), (4, 10), (5, 20), (6, None)]:
+            await save_fixture(TestModel(id=id, int_column=int_column))
+
+        # then
+        session.expunge_all()
+
+        statement = select(TestModel)
+
+        assert await _paginate_all(session, statement, [order_by], 2) == expected
+
+    @pytest.mark.parametrize(
+        ("order_by", "expected"),
+        [
+            (TestModel.id.asc(), [[1, 2], [3, 4], [5]]),
+            (TestModel.id.desc(), [[5, 4], [3, 2], [1]]),
+        ],
+    )
+    async def test_sort_not_nullable(
+        self,
+        order_by: UnaryExpression[Any],
+        expected: list[list[int]],
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        for id in range(1, 6):
+            await save_fixture(TestModel(id=id))
+
+        # then
+        session.expunge_all()
+
+        statement = select(TestModel)
+
+        assert await _paginate_all(session, statement, [order_by], 2) == expected
+
+    async def test_last_page_full(
+        self, session: AsyncSession, save_fixture: SaveFixture
+    ) -> None:
+        for id in range(1, 5):
+            await save_fixture(TestModel(id=id))
+
+        # then
+        session.expunge_all()
+
+        statement = select(TestModel)
+
+        assert await _paginate_all(session, statement, [], 2) == [[1, 2], [3, 4]]
+
+    @pytest.mark.skip_db_asserts
+    @pytest.mark.parametrize("cursor", ["INVALID", "WzEsMl0"])
+    async def test_invalid_cursor(self, cursor: str, session: AsyncSession) -> None:
+        statement = select(TestModel)
+
+        with pytest.raises(InvalidCursor):
+            await paginate_cursor(
+                session,
+                statement,
+                order_by=[],
+                pagination=CursorPaginationParams(cursor, 10),
+            )
@@ -0,0 +1,129 @@
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from fastapi import Depends, FastAPI, Response
+from fastapi.responses import RedirectResponse
+from httpx import ASGITransport, AsyncClient
+from pytest_mock import MockerFixture
+from redis import RedisError
+
+from polar.exception_handlers import add_exception_handlers
+from polar.kit.rate_limit import (
+    RateLimit,
+    RateLimiter,
+    RateLimitResult,
+    copy_rate_limit_headers,
+    hit,
+)
+from polar.redis import Redis, get_redis
+
+RATE_LIMIT = RateLimit(limit=3, period=60)
+
+
+@pytest_asyncio.fixture
+async def client(redis: Redis) -> AsyncIterator[AsyncClient]:
+    app = FastAPI(dependencies=[Depends(RateLimiter("test", RATE_LIMIT))])
+    add_exception_handlers(app)
+    app.dependency_overrides[get_redis] = lambda: redis
+
+    @app.get("/")
+    async def endpoint() -> dict[str, bool]:
+        return {"ok": True}
+
+    @app.get("/redirect")
+    async def redirect_endpoint(response: Response) -> RedirectResponse:
+        return copy_rate_limit_headers(response, RedirectResponse("/"))
+
+    transport = ASGITransport(app)  # type: ignore[arg-type]
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+def get_result(allowed: bool) -> RateLimitResult:
+    return RateLimitResult(
+        allowed=allowed,
+        limit=RATE_LIMIT.limit,
+        remaining=2 if allowed else 0,
+        reset=20.0 if allowed else 60.0,
+        retry_after=0.0 if allowed else 19.5,
+    )
+
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    async def test_allowed(self, client: AsyncClient, mocker: MockerFixture) -> None:
+        hit_mock = mocker.patch(
+            "polar.kit.rate_limit.hit", return_value=get_result(True)
+        )
+
+        response = await client.get("/")
+
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Limit"] == "3"
+        assert response.headers["RateLimit-Remaining"] == "2"
+        assert response.headers["RateLimit-Reset"] == "20"
+        assert "Retry-After" not in response.headers
+        assert hit_mock.call_args.args[1] == "test:ip:127.0.0.1"
+
+    async def test_returned_response(
+        self, client: AsyncClient, mocker: MockerFixture
+    ) -> None:
+        mocker.patch("polar.kit.rate_limit.hit", return_value=get_result(True))
+
+        response = await client.get("/redirect")
+
+        assert response.status_code == 307
+        assert response.headers["RateLimit-Limit"] == "3"
+        assert response.headers["RateLimit-Remaining"] == "2"
+
+    async def test_exceeded(self, client: AsyncClient, mocker: MockerFixture) -> None:
+        mocker.patch("polar.kit.rate_limit.hit", return_value=get_result(False))
+
+        response = await client.get("/")
+
+        assert response.status_code == 429
+        assert response.json()["error"] == "RateLimitExceeded"
+        assert response.headers["RateLimit-Remaining"] == "0"
+        assert response.headers["Retry-After"] == "20"
+
+    async def test_redis_error(
+        self, client: AsyncClient, mocker: MockerFixture
+    ) -> None:
+        mocker.patch("polar.kit.rate_limit.hit", side_effect=RedisError())
+
+        response = await client.get("/")
+
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
+
+    async def test_disabled(self, client: AsyncClient, mocker: MockerFixture) -> None:
+        mocker.patch("polar.kit.rate_limit.settings.RATE_LIMIT_ENABLED", False)
+        hit_mock = mocker.patch("polar.kit.rate_limit.hit")
+
+        response = await client.get("/")
+
+        assert response.status_code == 200
+        hit_mock.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestHit:
+    async def test_token_bucket(self, redis: Redis) -> None:
+        for remaining in (2, 1, 0):
+            result = await hit(redis, "key", RATE_LIMIT)
+            assert result.allowed is True
+            assert result.remaining == remaining
+
+        result = await hit(redis, "key", RATE_LIMIT)
+        assert result.allowed is False
+        assert result.remaining == 0
+        assert 0 < result.retry_after <= 20
+
+    async def test_independent_keys(self, redis: Redis) -> None:
+        for _ in range(RATE_LIMIT.limit):
+            await hit(redis, "key", RATE_LIMIT)
+
+        result = await hit(redis, "other_key", RATE_LIMIT)
+        assert result.allowed is True
+        assert result.remaining == RATE_LIMIT.limit - 1
@@ -0,0 +1,157 @@
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from polar.enums import Platforms
+from polar.kit.db.upsert import upsert_many
+from polar.models import Issue
+from polar.postgres import AsyncSession
+from tests.fixtures.database import SaveFixture, TestModel
+
+
+def _get_issue_values(issue: Issue, external_id: int, number: int) -> dict[str, Any]:
+    return {
+        "platform": Platforms.github,
+        "external_id": external_id,
+        "organization_id": issue.organization_id,
+        "repository_id": issue.repository_id,
+        "number": number,
+        "title": f"Issue {number}",
+        "state": Issue.State.CLOSED,
+        "labels": [{"name": "bug"}],
+        "reactions": {"+1": 2},
+        "issue_created_at": datetime(2024, 1, 1, 12, tzinfo=UTC),
+    }
+
+
+@pytest.mark.asyncio
+class TestUpsertMany:
+    @pytest.mark.parametrize(
+        ("chunk_size", "copy_threshold"),
+        [
+            pytest.param(1000, None, id="single statement"),
+            pytest.param(2, None, id="chunked"),
+            pytest.param(1000, 1, id="copy"),
+        ],
+    )
+    async def test_upsert(
+        self,
+        chunk_size: int,
+        copy_threshold: int | None,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+    ) -> None:
+        existing = TestModel(id=1, int_column=1, str_column="EXISTING")
+        await save_fixture(existing)
+
+        # then
+        session.expunge_all()
+
+        results = await upsert_many(
+            session,
+            TestModel,
+            [
+                {"id": id, "int_column": id * 10, "str_column": f"NEW_{id}"}
+                for id in range(1, 6)
+            ],
+            index_elements=[TestModel.id],
+            mutable_keys={"int_column"},
+            chunk_size=chunk_size,
+            copy_threshold=copy_threshold,
+        )
+
+        assert sorted(result.id for result in results) == [1, 2, 3, 4, 5]
+
+        session.expunge_all()
+        statement = select(TestModel).order_by(TestModel.id)
+        models = (await session.execute(statement)).scalars().all()
+
+        assert [model.int_column for model in models] == [10, 20, 30, 40, 50]
+        assert models[0].str_column == "EXISTING"
+        assert models[0].uuid == existing.uuid
+        assert [model.str_column for model in models[1:]] == [
+            "NEW_2",
+            "NEW_3",
+            "NEW_4",
+            "NEW_5",
+        ]
+        # Python-side default was applied
+        assert len({model.uuid for model in models}) == 5
+
+    @pytest.mark.parametrize("copy_threshold", [None, 1])
+    async def test_no_returning(
+        self, copy_threshold: int | None, session: AsyncSession
+    ) -> None:
+        results = await upsert_many(
+            session,
+            TestModel,
+            [{"id": id, "int_column": id} for id in range(1, 4)],
+            index_elements=[TestModel.id],
+            mutable_keys={"int_column"},
+            returning=False,
+            copy_threshold=copy_threshold,
+        )
+
+        assert results == []
+
+        # then
+        session.expunge_all()
+
+        statement = select(TestModel.id).order_by(TestModel.id)
+        assert (await session.execute(statement)).scalars().all() == [1, 2, 3]
+
+    async def test_copy_types(self, session: AsyncSession, issue: Issue) -> None:
+        # COPY bypasses SQLAlchemy: JSONB, enums and timezone-aware datetimes
+        # are processed by hand.
+        values = [
+            _get_issue_values(issue, issue.external_id, issue.number),
+            _get_issue_values(issue, issue.external_id + 1, issue.number + 1),
+        ]
+
+        await upsert_many(
+            session,
+            Issue,
+            values,
+            index_elements=[Issue.external_id],
+            mutable_keys={"title", "state", "labels", "reactions", "issue_created_at"},
+            copy_threshold=1,
+        )
+
+        # then
+        session.expunge_all()
+
+        statement = (
+            select(Issue)
+            .where(Issue.repository_id == issue.repository_id)
+            .order_by(Issue.number)
+        )
+        issues = (await session.execute(statement)).scalars().all()
+
+        assert [i.id for i in issues][0] == issue.id
+        assert [i.title for i in issues] == [
+            f"Issue {issue.number}",
+            f"Issue {issue.number + 1}",
+        ]
+        for i in issues:
+            assert i.state == Issue.State.CLOSED
+            assert i.labels == [{"name": "bug"}]
+            assert i.reactions == {"+1": 2}
+            assert i.issue_created_at == datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+    @pytest.mark.skip_db_asserts
+    async def test_copy_error(self, session: AsyncSession, issue: Issue) -> None:
+        # New external ID, but conflicting with the existing issue number
+        values = [_get_issue_values(issue, issue.external_id + 1, issue.number)]
+
+        with pytest.raises(IntegrityError):
+            await upsert_many(
+                session,
+                Issue,
+                values,
+                index_elements=[Issue.external_id],
+                mutable_keys={"title"},
+                copy_threshold=1,
+            )
@@ -201,6 +201,58 @@ class TestLicenseKeyEndpoints:
         data = response.json()
         assert data["pagination"]["total_count"] == count
 
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="user"),
+        AuthSubjectFixture(subject="organization"),
+    )
+    async def test_list_cursor(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        client: AsyncClient,
+        save_fixture: SaveFixture,
+        user: User,
+        user_organization: UserOrganization,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        for _ in range(2):
+            await TestLicenseKey.create_benefit_and_grant(
+                session,
+                redis,
+                save_fixture,
+                user=user,
+                organization=organization,
+                product=product,
+                properties=BenefitLicenseKeysCreateProperties(
+                    prefix="testing",
+                ),
+            )
+
+        response = await client.get(
+            "/v1/license-keys/cursor",
+            params={"organization_id": str(organization.id), "limit": 1},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) == 1
+        next_cursor = data["pagination"]["next_cursor"]
+        assert next_cursor is not None
+
+        response = await client.get(
+            "/v1/license-keys/cursor",
+            params={
+                "organization_id": str(organization.id),
+                "limit": 1,
+                "cursor": next_cursor,
+            },
+        )
+        assert response.status_code == 200
+        next_data = response.json()
+        assert len(next_data["items"]) == 1
+        assert next_data["items"][0]["id"] != data["items"][0]["id"]
+        assert next_data["pagination"]["next_cursor"] is None
+
     @pytest.mark.auth(
         AuthSubjectFixture(subject="user"),
         AuthSubjectFixture(subject="organization"),
@@ -73,6 +73,53 @@ class TestGetMetrics:
         assert len(json["periods"]) == 12
 
 
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestGetColumnarMetrics:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/metrics/columnar")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth(AuthSubjectFixture(scopes={Scope.metrics_read}))
+    async def test_over_limits(
+        self, client: AsyncClient, user_organization: UserOrganization
+    ) -> None:
+        response = await client.get(
+            "/v1/metrics/columnar",
+            params={
+                "start_date": "2023-01-01",
+                "end_date": "2024-12-31",
+                "interval": "day",
+            },
+        )
+
+        assert response.status_code == 422
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(scopes={Scope.web_default}),
+        AuthSubjectFixture(subject="organization", scopes={Scope.metrics_read}),
+    )
+    async def test_valid(
+        self, client: AsyncClient, user_organization: UserOrganization
+    ) -> None:
+        response = await client.get(
+            "/v1/metrics/columnar",
+            params={
+                "start_date": "2024-01-01",
+                "end_date": "2024-12-31",
+                "interval": "month",
+            },
+        )
+
+        assert response.status_code == 200
+
+        json = response.json()
+        assert len(json["timestamps"]) == 12
+        for slug in json["metrics"]:
+            assert len(json["values"][slug]) == 12
+
+
 @pytest.mark.asyncio
 @pytest.mark.http_auto_expunge
 class TestGetMetricsLimits:
@@ -3,9 +3,11 @@ from typing import NotRequired, TypedDict
 
 import pytest
 import pytest_asyncio
+from pytest_mock import MockerFixture
 
 from polar.auth.models import AuthSubject
 from polar.enums import SubscriptionRecurringInterval
+from polar.metrics.cache import metrics_cache
 from polar.metrics.queries import Interval
 from polar.metrics.service import metrics as metrics_service
 from polar.models import (
@@ -19,6 +21,7 @@ from polar.models import (
 from polar.models.product_price import ProductPriceType
 from polar.models.subscription import SubscriptionStatus
 from polar.postgres import AsyncSession
+from polar.redis import Redis
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import (
@@ -635,3 +638,177 @@ class TestGetMetrics:
         assert feb.renewed_subscriptions_revenue == 0
         assert feb.active_subscriptions == 0
         assert feb.monthly_recurring_revenue == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetMetricsColumnar:
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="user"), AuthSubjectFixture(subject="organization")
+    )
+    async def test_values(
+        self,
+        session: AsyncSession,
+        auth_subject: AuthSubject[User | Organization],
+        user_organization: UserOrganization,
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        metrics = await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            interval=Interval.month,
+        )
+        columnar_metrics = await metrics_service.get_metrics_columnar(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            interval=Interval.month,
+        )
+
+        assert columnar_metrics.timestamps == [
+            period.timestamp for period in metrics.periods
+        ]
+        assert columnar_metrics.values.orders == [3, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+        for slug in metrics.metrics.model_fields:
+            assert getattr(columnar_metrics.values, slug) == [
+                getattr(period, slug) for period in metrics.periods
+            ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetMetricsCache:
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="user"), AuthSubjectFixture(subject="organization")
+    )
+    async def test_open_period_invalidation(
+        self,
+        mocker: MockerFixture,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        user: User,
+        organization: Organization,
+        user_organization: UserOrganization,
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        mocker.patch(
+            "polar.metrics.service.utc_now",
+            return_value=datetime(2024, 6, 15, tzinfo=UTC),
+        )
+        get_periods_spy = mocker.spy(metrics_service, "_query_columns")
+
+        async def _get_metrics() -> list[int]:
+            metrics = await metrics_service.get_metrics(
+                session,
+                auth_subject,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                interval=Interval.month,
+                redis=redis,
+            )
+            assert len(metrics.periods) == 12
+            return [period.orders for period in metrics.periods]
+
+        assert await _get_metrics() == [3, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+        assert get_periods_spy.call_count == 1
+
+        products, _, _ = fixtures
+        await create_order(
+            save_fixture,
+            product=products["one_time_product"],
+            user=user,
+            created_at=datetime(2024, 6, 10, tzinfo=UTC),
+            stripe_invoice_id=None,
+        )
+
+        # Everything is served from cache
+        assert await _get_metrics() == [3, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+        assert get_periods_spy.call_count == 1
+
+        # Only the open periods are recomputed
+        await metrics_cache.invalidate(redis, organization.id)
+        assert await _get_metrics() == [3, 1, 0, 0, 0, 2, 0, 0, 0, 0, 0, 0]
+        assert get_periods_spy.call_count == 2
+        assert get_periods_spy.call_args[1]["start_timestamp"] == datetime(
+            2024, 6, 1, tzinfo=UTC
+        )
+
+    @pytest.mark.auth
+    async def test_closed_range(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        organization: Organization,
+        user_organization: UserOrganization,
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        get_periods_spy = mocker.spy(metrics_service, "_query_columns")
+
+        for _ in range(2):
+            metrics = await metrics_service.get_metrics(
+                session,
+                auth_subject,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                interval=Interval.day,
+                redis=redis,
+            )
+            assert len(metrics.periods) == 366
+            assert metrics.periods[0].orders == 3
+
+        await metrics_cache.invalidate(redis, organization.id)
+        await metrics_service.get_metrics(
+            session,
+            auth_subject,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            interval=Interval.day,
+            redis=redis,
+        )
+
+        assert get_periods_spy.call_count == 1
+
+    @pytest.mark.auth
+    async def test_read_session(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        auth_subject: AuthSubject[User | Organization],
+        user_organization: UserOrganization,
+        fixtures: tuple[dict[str, Product], dict[str, Subscription], dict[str, Order]],
+    ) -> None:
+        mocker.patch(
+            "polar.metrics.service.utc_now",
+            return_value=datetime(2024, 6, 15, tzinfo=UTC),
+        )
+        get_periods_spy = mocker.spy(metrics_service, "_query_columns")
+        read_session = AsyncSession(bind=session.bind)
+
+        for _ in range(2):
+            metrics = await metrics_service.get_metrics(
+                session,
+                auth_subject,
+                start_date=date(2024, 1, 1),
+                end_date=date(2024, 12, 31),
+                interval=Interval.month,
+                redis=redis,
+                read_session=read_session,
+            )
+            orders = [period.orders for period in metrics.periods]
+            assert orders == [3, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+
+        # Closed periods are computed on the read session,
+        # open periods are recomputed on the primary before being cached.
+        assert get_periods_spy.call_count == 2
+        closed_call, open_call = get_periods_spy.call_args_list
+        assert closed_call.args[0] is read_session
+        assert open_call.args[0] is session
+        assert open_call.kwargs["start_timestamp"] == datetime(2024, 6, 1, tzinfo=UTC)
@@ -1,4 +1,5 @@
 import uuid
+from datetime import UTC, datetime
 
 import pytest
 import pytest_asyncio
@@ -65,6 +66,91 @@ class TestListOrders:
         json = response.json()
         assert json["pagination"]["total_count"] == len(orders)
 
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="organization", scopes={Scope.orders_read}),
+    )
+    @pytest.mark.parametrize(
+        ("count", "expected_total_count", "expected_max_page"),
+        [("capped", 1, 1), ("none", 1, 1)],
+    )
+    async def test_count_mode(
+        self,
+        count: str,
+        expected_total_count: int,
+        expected_max_page: int,
+        client: AsyncClient,
+        orders: list[Order],
+    ) -> None:
+        response = await client.get("/v1/orders/", params={"count": count})
+
+        assert response.status_code == 200
+
+        json = response.json()
+        assert len(json["items"]) == len(orders)
+        assert json["pagination"]["total_count"] == expected_total_count
+        assert json["pagination"]["max_page"] == expected_max_page
+        assert json["pagination"]["total_count_capped"] is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestListOrdersCursor:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/orders/cursor")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="organization", scopes={Scope.orders_read}),
+    )
+    async def test_invalid_cursor(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/orders/cursor", params={"cursor": "INVALID"})
+
+        assert response.status_code == 422
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="organization", scopes={Scope.orders_read}),
+    )
+    async def test_organization(
+        self,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        product: Product,
+        user_second: User,
+    ) -> None:
+        orders = [
+            await create_order(
+                save_fixture,
+                product=product,
+                user=user_second,
+                stripe_invoice_id=f"INVOICE_{i}",
+                created_at=datetime(2024, 1, i + 1, tzinfo=UTC),
+            )
+            for i in range(3)
+        ]
+
+        response = await client.get(
+            "/v1/orders/cursor", params={"limit": 2, "sorting": "created_at"}
+        )
+
+        assert response.status_code == 200
+        json = response.json()
+        assert [item["id"] for item in json["items"]] == [
+            str(order.id) for order in orders[:2]
+        ]
+        next_cursor = json["pagination"]["next_cursor"]
+        assert next_cursor is not None
+
+        response = await client.get(
+            "/v1/orders/cursor",
+            params={"limit": 2, "sorting": "created_at", "cursor": next_cursor},
+        )
+
+        assert response.status_code == 200
+        json = response.json()
+        assert [item["id"] for item in json["items"]] == [str(orders[2].id)]
+        assert json["pagination"]["next_cursor"] is None
+
 
 @pytest.mark.asyncio
 @pytest.mark.http_auto_expunge
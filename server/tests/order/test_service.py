@@ -312,10 +312,14 @@ class TestCreateOrderFromStripe:
         assert updated_payment_transaction is not None
         assert updated_payment_transaction.order_id == order.id
 
-        enqueue_job_mock.assert_called_once_with(
+        enqueue_job_mock.assert_any_call(
             "order.discord_notification",
             order_id=order.id,
         )
+        enqueue_job_mock.assert_any_call(
+            "metrics.invalidate_organization",
+            organization_id=product.organization_id,
+        )
 
     async def test_subscription_proration(
         self,
@@ -459,10 +463,14 @@ class TestCreateOrderFromStripe:
         assert updated_payment_transaction is not None
         assert updated_payment_transaction.order_id == order.id
 
-        enqueue_job_mock.assert_called_once_with(
+        enqueue_job_mock.assert_any_call(
             "order.discord_notification",
             order_id=order.id,
         )
+        enqueue_job_mock.assert_any_call(
+            "metrics.invalidate_organization",
+            organization_id=product.organization_id,
+        )
 
     async def test_subscription_applied_balance(
         self, session: AsyncSession, subscription: Subscription, product: Product
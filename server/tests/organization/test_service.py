@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from pydantic import ValidationError
 from pytest_mock import MockerFixture
@@ -5,6 +7,8 @@ from pytest_mock import MockerFixture
 from polar.auth.models import AuthSubject
 from polar.config import settings
 from polar.exceptions import PolarRequestValidationError
+from polar.kit.db.query_stats import record_query_stats
+from polar.kit.utils import utc_now
 from polar.models import Organization, User
 from polar.organization.schemas import OrganizationCreate, OrganizationFeatureSettings
 from polar.organization.service import organization as organization_service
@@ -12,6 +16,32 @@ from polar.postgres import AsyncSession
 from polar.user_organization.service import (
     user_organization as user_organization_service,
 )
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_organization
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetBatched:
+    async def test_batched(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+    ) -> None:
+        blocked_organization = await create_organization(
+            save_fixture, blocked_at=utc_now()
+        )
+
+        with record_query_stats() as stats:
+            results = await asyncio.gather(
+                organization_service.get_batched(session, organization.id),
+                organization_service.get_batched(session, blocked_organization.id),
+                organization_service.get_batched(session, organization.id),
+            )
+
+        assert list(results) == [organization, None, organization]
+        assert stats.count == 1
 
 
 @pytest.mark.asyncio
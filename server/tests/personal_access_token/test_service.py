@@ -13,6 +13,7 @@ from polar.personal_access_token.service import (
     personal_access_token as personal_access_token_service,
 )
 from polar.postgres import AsyncSession
+from polar.redis import Redis
 from tests.fixtures.database import SaveFixture
 
 
@@ -82,3 +83,55 @@ class TestRevokeLeaked:
 
         send_to_user_mock: MagicMock = email_sender_mock.send_to_user
         send_to_user_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestFlushUsage:
+    async def test_no_usage(self, session: AsyncSession, redis: Redis) -> None:
+        assert await personal_access_token_service.flush_usage(session, redis) == 0
+
+    async def test_high_water_mark(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        redis: Redis,
+        user: User,
+    ) -> None:
+        now = utc_now()
+        tokens: list[PersonalAccessToken] = []
+        for i in range(2):
+            personal_access_token = PersonalAccessToken(
+                comment="Test",
+                token=get_token_hash(f"polar_pat_{i}", secret=settings.SECRET),
+                user_id=user.id,
+                scope="openid",
+                last_used_at=now - timedelta(hours=1) if i == 1 else None,
+            )
+            await save_fixture(personal_access_token)
+            tokens.append(personal_access_token)
+
+        first, second = tokens
+        await personal_access_token_service.record_usage(
+            redis, first.id, now - timedelta(minutes=1)
+        )
+        await personal_access_token_service.record_usage(redis, first.id, now)
+        await personal_access_token_service.record_usage(
+            redis, first.id, now - timedelta(minutes=2)
+        )
+        await personal_access_token_service.record_usage(
+            redis, second.id, now - timedelta(hours=2)
+        )
+
+        assert await personal_access_token_service.flush_usage(session, redis) == 2
+
+        session.expunge_all()
+        updated_first = await session.get(PersonalAccessToken, first.id)
+        updated_second = await session.get(PersonalAccessToken, second.id)
+        assert updated_first is not None
+        assert updated_first.last_used_at == now
+        # Older than the already stored value
+        assert updated_second is not None
+        assert updated_second.last_used_at == now - timedelta(hours=1)
+
+        assert await personal_access_token_service.flush_usage(session, redis) == 0
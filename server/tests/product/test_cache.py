@@ -0,0 +1,165 @@
+import uuid
+from collections.abc import Iterator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.kit.db.query_stats import record_query_stats
+from polar.models import Organization, Product
+from polar.postgres import AsyncSession
+from polar.product.cache import (
+    collect_snapshot_invalidations,
+    product_snapshot_cache,
+    publish_snapshot_invalidations,
+)
+from polar.redis import Redis
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Iterator[None]:
+    product_snapshot_cache.clear()
+    yield
+    product_snapshot_cache.clear()
+
+
+async def get_session_product(
+    session: AsyncSession, product: Product, *, expunge: bool = True
+) -> Product:
+    if expunge:
+        session.expunge_all()
+    session_product = await session.get(Product, product.id)
+    assert session_product is not None
+    return session_product
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestProductSnapshotCache:
+    async def test_not_existing(self, session: AsyncSession, redis: Redis) -> None:
+        product = Product(id=uuid.uuid4())
+        assert await product_snapshot_cache.load(session, redis, product) is False
+
+    async def test_cached(
+        self, session: AsyncSession, redis: Redis, product: Product
+    ) -> None:
+        session_product = await get_session_product(session, product)
+        assert await product_snapshot_cache.load(session, redis, session_product)
+
+        session_product = await get_session_product(session, product)
+        with record_query_stats() as stats:
+            assert await product_snapshot_cache.load(session, redis, session_product)
+
+        assert stats.count == 0
+        assert session_product.organization.id == product.organization_id
+        assert session_product.organization in session
+        assert [price.id for price in session_product.prices] == [
+            price.id for price in product.prices
+        ]
+        assert session_product.product_medias == []
+        assert session_product.attached_custom_fields == []
+
+    async def test_session_objects_kept(
+        self, session: AsyncSession, redis: Redis, product: Product
+    ) -> None:
+        session_product = await get_session_product(session, product)
+        await product_snapshot_cache.load(session, redis, session_product)
+
+        session.expunge_all()
+        organization = await session.get(Organization, product.organization_id)
+        assert organization is not None
+        organization.name = "Updated Organization"
+        session_product = await get_session_product(session, product, expunge=False)
+        session_product.name = "Updated Product"
+
+        assert await product_snapshot_cache.load(session, redis, session_product)
+
+        assert session_product.name == "Updated Product"
+        assert session_product.organization is organization
+        assert organization.name == "Updated Organization"
+
+    async def test_snapshot_copied(
+        self, session: AsyncSession, redis: Redis, product: Product
+    ) -> None:
+        session_product = await get_session_product(session, product)
+        organization_name = product.organization.name
+        await product_snapshot_cache.load(session, redis, session_product)
+
+        # Changing the objects of the request session doesn't change the snapshot
+        session_product.organization.name = "Updated Organization"
+
+        session_product = await get_session_product(session, product)
+        with record_query_stats() as stats:
+            assert await product_snapshot_cache.load(session, redis, session_product)
+
+        assert stats.count == 0
+        assert session_product.organization.name == organization_name
+
+    async def test_modified_not_cached(
+        self, session: AsyncSession, redis: Redis, product: Product
+    ) -> None:
+        session_product = await get_session_product(session, product)
+        session_product.name = "Updated Product"
+        assert await product_snapshot_cache.load(session, redis, session_product)
+
+        session_product = await get_session_product(session, product)
+        with record_query_stats() as stats:
+            assert await product_snapshot_cache.load(session, redis, session_product)
+
+        assert stats.count > 0
+
+    async def test_invalidated(
+        self, session: AsyncSession, redis: Redis, product: Product
+    ) -> None:
+        session_product = await get_session_product(session, product)
+        await product_snapshot_cache.load(session, redis, session_product)
+
+        # Simulate another process bumping the version
+        await publish_snapshot_invalidations(redis, {product.id})
+
+        session_product = await get_session_product(session, product)
+        with record_query_stats() as stats:
+            assert await product_snapshot_cache.load(session, redis, session_product)
+
+        assert stats.count > 0
+
+    async def test_expired(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        product: Product,
+        mocker: MockerFixture,
+    ) -> None:
+        session_product = await get_session_product(session, product)
+        await product_snapshot_cache.load(session, redis, session_product)
+
+        mocker.patch("polar.product.cache.PRODUCT_SNAPSHOT_TTL_SECONDS", -1)
+        product_snapshot_cache.evict(product.id)
+        await product_snapshot_cache.load(session, redis, session_product)
+
+        session_product = await get_session_product(session, product)
+        with record_query_stats() as stats:
+            assert await product_snapshot_cache.load(session, redis, session_product)
+
+        assert stats.count > 0
+
+    async def test_invalidate_collected(
+        self, product: Product, mocker: MockerFixture
+    ) -> None:
+        enqueue_job_mock = mocker.patch("polar.product.cache.enqueue_job")
+
+        with collect_snapshot_invalidations() as invalidations:
+            product_snapshot_cache.invalidate(product.id)
+
+        assert invalidations == {product.id}
+        enqueue_job_mock.assert_not_called()
+
+    async def test_invalidate_not_collected(
+        self, product: Product, mocker: MockerFixture
+    ) -> None:
+        enqueue_job_mock = mocker.patch("polar.product.cache.enqueue_job")
+
+        product_snapshot_cache.invalidate(product.id)
+
+        enqueue_job_mock.assert_called_once_with(
+            "product.invalidate_snapshot", product_id=product.id
+        )
@@ -45,3 +45,51 @@ class TestListSubscriptions:
             assert "user" in item
             assert "github_username" in item["user"]
             assert "email" in item["user"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestListSubscriptionsCursor:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/subscriptions/cursor")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth
+    async def test_valid(
+        self,
+        save_fixture: SaveFixture,
+        client: AsyncClient,
+        user: User,
+        user_organization: UserOrganization,
+        product: Product,
+    ) -> None:
+        subscriptions = [
+            await create_active_subscription(
+                save_fixture,
+                product=product,
+                user=user,
+                started_at=datetime(2023, 1, 1),
+                stripe_subscription_id=f"SUBSCRIPTION_{i}",
+            )
+            for i in range(3)
+        ]
+        expected_ids = sorted(
+            (str(subscription.id) for subscription in subscriptions), reverse=True
+        )
+
+        ids: list[str] = []
+        params: dict[str, str | int] = {"limit": 2, "sorting": "-amount"}
+        while True:
+            response = await client.get("/v1/subscriptions/cursor", params=params)
+
+            assert response.status_code == 200
+
+            json = response.json()
+            ids += [item["id"] for item in json["items"]]
+            next_cursor = json["pagination"]["next_cursor"]
+            if next_cursor is None:
+                break
+            params["cursor"] = next_cursor
+
+        assert ids == expected_ids
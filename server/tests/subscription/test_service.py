@@ -27,6 +27,7 @@ from polar.subscription.service import (
 )
 from polar.subscription.service import subscription as subscription_service
 from polar.user.service.user import user as user_service
+from polar.worker import JobContext
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import (
@@ -796,3 +797,45 @@ class TestList:
 
         assert len(results) == 1
         assert count == 1
+
+
+@pytest.mark.asyncio
+class TestStreamExport:
+    @pytest.mark.auth(AuthSubjectFixture(subject="organization"))
+    async def test_organization(
+        self,
+        auth_subject: AuthSubject[Organization],
+        job_context: JobContext,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        user_second: User,
+        product: Product,
+    ) -> None:
+        subscriptions = [
+            await create_active_subscription(
+                save_fixture,
+                product=product,
+                user=user_second,
+                started_at=datetime(2023, 1, day),
+                stripe_subscription_id=f"SUBSCRIPTION_{day}",
+            )
+            for day in range(1, 4)
+        ]
+        await create_subscription(save_fixture, product=product, user=user_second)
+
+        # then
+        session.expunge_all()
+
+        results = [
+            subscription
+            async for subscription in subscription_service.stream_export(
+                job_context["async_sessionmaker"], auth_subject, batch_size=2
+            )
+        ]
+
+        assert [result.id for result in results] == [
+            subscription.id for subscription in reversed(subscriptions)
+        ]
+        for result in results:
+            assert result.user.email == user_second.email
+            assert result.product.name == product.name
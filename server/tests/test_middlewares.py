@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from polar.kit.db.pool import InstrumentedAsyncAdaptedQueuePool
+from polar.kit.db.query_stats import QueryBudgetExceeded, query_budget
+from polar.middlewares import DatabaseAdmissionControlMiddleware, QueryStatsMiddleware
+from polar.postgres import AsyncSession
+
+
+def get_client(expected_wait: float) -> AsyncClient:
+    pool = MagicMock(spec=InstrumentedAsyncAdaptedQueuePool)
+    pool.get_expected_wait_time.return_value = expected_wait
+    pool.checkedout.return_value = 10
+    pool.waiting = 5
+    engine = MagicMock()
+    engine.sync_engine.pool = pool
+
+    async def endpoint(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("OK")
+
+    app: ASGIApp = Starlette(
+        routes=[Route("/", endpoint), Route("/healthz", endpoint)],
+    )
+    app = DatabaseAdmissionControlMiddleware(app, max_expected_wait=5.0)
+
+    async def with_state(scope: Scope, receive: Receive, send: Send) -> None:
+        scope["state"] = {"async_engine": engine}
+        await app(scope, receive, send)
+
+    transport = ASGITransport(with_state)  # type: ignore[arg-type]
+    return AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+class TestDatabaseAdmissionControlMiddleware:
+    async def test_below_threshold(self) -> None:
+        async with get_client(1.0) as client:
+            response = await client.get("/")
+
+        assert response.status_code == 200
+
+    async def test_above_threshold(self) -> None:
+        async with get_client(6.5) as client:
+            response = await client.get("/")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+        assert response.json()["error"] == "ServiceUnavailable"
+
+    async def test_excluded_path(self) -> None:
+        async with get_client(6.5) as client:
+            response = await client.get("/healthz")
+
+        assert response.status_code == 200
+
+
+def get_query_stats_client(session: AsyncSession, budget: int) -> AsyncClient:
+    @query_budget(budget)
+    async def endpoint(request: Request) -> PlainTextResponse:
+        await session.execute(text("SELECT 1"))
+        await session.execute(text("SELECT 1"))
+        return PlainTextResponse("OK")
+
+    app = QueryStatsMiddleware(Starlette(routes=[Route("/", endpoint)]))
+    transport = ASGITransport(app)  # type: ignore[arg-type]
+    return AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestQueryStatsMiddleware:
+    async def test_within_budget(self, session: AsyncSession) -> None:
+        async with get_query_stats_client(session, 2) as client:
+            response = await client.get("/")
+
+        assert response.status_code == 200
+
+    async def test_over_budget(self, session: AsyncSession) -> None:
+        async with get_query_stats_client(session, 1) as client:
+            with pytest.raises(QueryBudgetExceeded):
+                await client.get("/")
@@ -23,6 +23,7 @@ from polar.transaction.service.payout import (
 from polar.transaction.service.payout import (
     payout_transaction as payout_transaction_service,
 )
+from polar.worker import JobContext
 from tests.fixtures.database import SaveFixture
 from tests.transaction.conftest import (
     create_account,
@@ -839,3 +840,53 @@ class TestTriggerStripePayouts:
         enqueue_job_mock.assert_any_call(
             "payout.trigger_stripe_payout", payout_id=payout_3.id
         )
+
+
+@pytest.mark.asyncio
+class TestGetPayoutCSVRows:
+    async def test_valid(
+        self,
+        job_context: JobContext,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        organization: Organization,
+        user: User,
+    ) -> None:
+        account = await create_account(save_fixture, organization, user)
+        payout = Transaction(
+            type=TransactionType.payout,
+            account=account,
+            processor=PaymentProcessor.stripe,
+            currency="usd",
+            amount=-2000,
+            account_currency="usd",
+            account_amount=-2000,
+            tax_amount=0,
+        )
+        await save_fixture(payout)
+        balance_transactions = [
+            await create_balance_transaction(
+                save_fixture, account=account, payout_transaction=payout
+            )
+            for _ in range(3)
+        ]
+
+        # then
+        session.expunge_all()
+
+        rows = [
+            row
+            async for row in payout_transaction_service.get_payout_csv_rows(
+                job_context["async_sessionmaker"],
+                account=account,
+                payout=payout,
+                batch_size=2,
+            )
+        ]
+
+        assert len(rows) == len(balance_transactions)
+        for row, balance_transaction in zip(rows, balance_transactions):
+            assert row[1] == str(payout.id)
+            assert row[2] == str(balance_transaction.id)
+            assert row[5] == 10.0
+            assert row[6] == 20.0
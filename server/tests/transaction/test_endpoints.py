@@ -47,6 +47,42 @@ class TestSearchTransactions:
         assert json["pagination"]["total_count"] == len(readable_user_transactions)
 
 
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestSearchTransactionsCursor:
+    async def test_anonymous(self, client: AsyncClient) -> None:
+        response = await client.get("/v1/transactions/search/cursor")
+
+        assert response.status_code == 401
+
+    @pytest.mark.auth
+    async def test_valid(
+        self,
+        client: AsyncClient,
+        account: Account,
+        user_organization: UserOrganization,
+        readable_user_transactions: list[Transaction],
+        all_transactions: list[Transaction],
+    ) -> None:
+        ids: list[str] = []
+        params: dict[str, str | int] = {"limit": 1}
+        while True:
+            response = await client.get("/v1/transactions/search/cursor", params=params)
+
+            assert response.status_code == 200
+
+            json = response.json()
+            ids += [item["id"] for item in json["items"]]
+            next_cursor = json["pagination"]["next_cursor"]
+            if next_cursor is None:
+                break
+            params["cursor"] = next_cursor
+
+        assert sorted(ids) == sorted(
+            str(transaction.id) for transaction in readable_user_transactions
+        )
+
+
 @pytest.mark.asyncio
 @pytest.mark.http_auto_expunge
 class TestLookupTransaction:
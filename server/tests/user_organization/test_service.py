@@ -0,0 +1,69 @@
+import pytest
+
+from polar.kit.db.query_stats import record_query_stats
+from polar.models import Organization, User, UserOrganization
+from polar.postgres import AsyncSession
+from polar.user_organization.service import (
+    user_organization as user_organization_service,
+)
+from tests.fixtures.database import SaveFixture
+
+
+@pytest.mark.asyncio
+@pytest.mark.skip_db_asserts
+class TestGetOrganizationIds:
+    async def test_cached(
+        self,
+        session: AsyncSession,
+        user: User,
+        organization: Organization,
+        user_organization: UserOrganization,
+    ) -> None:
+        organization_ids = await user_organization_service.get_organization_ids(
+            session, user.id
+        )
+        assert organization_ids == [organization.id]
+
+        with record_query_stats() as stats:
+            assert (
+                await user_organization_service.get_organization_ids(session, user.id)
+                == organization_ids
+            )
+
+        assert stats.count == 0
+
+    async def test_membership_added(
+        self,
+        save_fixture: SaveFixture,
+        session: AsyncSession,
+        user: User,
+        organization: Organization,
+    ) -> None:
+        assert (
+            await user_organization_service.get_organization_ids(session, user.id) == []
+        )
+
+        await save_fixture(
+            UserOrganization(user_id=user.id, organization_id=organization.id)
+        )
+
+        assert await user_organization_service.get_organization_ids(
+            session, user.id
+        ) == [organization.id]
+
+    async def test_membership_removed(
+        self,
+        session: AsyncSession,
+        user: User,
+        organization: Organization,
+        user_organization: UserOrganization,
+    ) -> None:
+        assert await user_organization_service.get_organization_ids(
+            session, user.id
+        ) == [organization.id]
+
+        await user_organization_service.remove_member(session, user.id, organization.id)
+
+        assert (
+            await user_organization_service.get_organization_ids(session, user.id) == []
+        )
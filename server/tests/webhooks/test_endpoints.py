@@ -271,3 +271,38 @@ class TestListWebhookDeliveries:
         json = response.json()
         assert len(json["items"]) == 1
         assert json["items"][0]["id"] == str(webhook_delivery.id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.http_auto_expunge
+class TestListWebhookDeliveriesCursor:
+    @pytest.mark.auth
+    async def test_user_not_member(
+        self,
+        client: AsyncClient,
+        webhook_endpoint_organization: WebhookEndpoint,
+        webhook_delivery: WebhookDelivery,
+    ) -> None:
+        response = await client.get("/v1/webhooks/deliveries/cursor")
+
+        assert response.status_code == 200
+        json = response.json()
+        assert len(json["items"]) == 0
+        assert json["pagination"]["next_cursor"] is None
+
+    @pytest.mark.auth(
+        AuthSubjectFixture(subject="organization", scopes={Scope.webhooks_write})
+    )
+    async def test_organization(
+        self,
+        client: AsyncClient,
+        webhook_endpoint_organization: WebhookEndpoint,
+        webhook_delivery: WebhookDelivery,
+    ) -> None:
+        response = await client.get("/v1/webhooks/deliveries/cursor")
+
+        assert response.status_code == 200
+        json = response.json()
+        assert len(json["items"]) == 1
+        assert json["items"][0]["id"] == str(webhook_delivery.id)
+        assert json["pagination"]["next_cursor"] is None